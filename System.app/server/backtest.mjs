@@ -5,6 +5,7 @@
 
 import duckdb from 'duckdb'
 import { compressTree } from './tree-compressor.mjs'
+import { parquetSource } from './lib/parquet-source.mjs'
 import path from 'path'
 import { fileURLToPath } from 'url'
 
@@ -97,7 +98,7 @@ async function fetchOhlcSeriesUncached(ticker, limit = 20000) {
       Close AS close,
       "Adj Close" AS adjClose,
       Volume AS volume
-    FROM read_parquet('${filePath.replace(/\\/g, '/')}')
+    FROM ${await parquetSource(filePath)}
     WHERE epoch(Date) >= ${BACKTEST_START_EPOCH}
     ORDER BY Date DESC
     LIMIT ${limit}
@@ -256,6 +256,76 @@ router.post('/candles/batch', validate(batchCandlesSchema), asyncHandler(async (
 // Download Jobs
 // ============================================================================
 
+/**
+ * Fold the delta files written by recent-mode downloads into the per-ticker
+ * parquet files (ticker-data/deltas.py). Readers merge deltas until it is done,
+ * so nothing waits on it.
+ */
+function compactDeltasInBackground(onDone) {
+  const scriptPath = path.join(TICKER_DATA_ROOT, 'deltas.py')
+  const child = spawn(PYTHON, ['-u', scriptPath, '--out-dir', PARQUET_DIR], { windowsHide: true })
+
+  child.stdout.on('data', (buf) => {
+    const output = String(buf).trim()
+    if (output) logger.info('Delta compaction', { output })
+  })
+
+  child.on('error', (err) => {
+    logger.warn('Delta compaction failed to start', { error: err.message })
+  })
+
+  child.on('close', (code) => {
+    if (code !== 0) {
+      logger.warn('Delta compaction failed', { code })
+    }
+    onDone?.()
+  })
+}
+
+// One panel store build at a time; a request made meanwhile runs once it finishes
+let panelStoreBuilding = false
+let panelStorePending = false
+
+/**
+ * Recompile the panel store (python/panel_store.py) after a download. The
+ * build runs the data-quality scan over every ticker once and stores the
+ * repaired series and masks, so backtest workers read clean rows instead of
+ * repairing them per request. Workers use the parquet files until it is done.
+ */
+function buildPanelStoreInBackground() {
+  if (process.env.PANEL_STORE === '0') return
+  if (panelStoreBuilding) {
+    panelStorePending = true
+    return
+  }
+  panelStoreBuilding = true
+
+  const scriptPath = path.join(__dirname, '..', '..', 'python', 'panel_store.py')
+  const args = ['-u', scriptPath, PARQUET_DIR]
+  if (process.env.PANEL_STORE_DIR) args.push(process.env.PANEL_STORE_DIR)
+  const child = spawn(PYTHON, args, { windowsHide: true })
+
+  child.stderr.on('data', (buf) => {
+    const output = String(buf).trim()
+    if (output) logger.info('Panel store build', { output })
+  })
+
+  child.on('error', (err) => {
+    logger.warn('Panel store build failed to start', { error: err.message })
+  })
+
+  child.on('close', (code) => {
+    if (code !== 0) {
+      logger.warn('Panel store build failed', { code })
+    }
+    panelStoreBuilding = false
+    if (panelStorePending) {
+      panelStorePending = false
+      buildPanelStoreInBackground()
+    }
+  })
+}
+
 /**
  * POST /api/download - Start a download job
  * Supports three modes: full (all history), recent (last N days), prices (IEX real-time)
@@ -350,6 +420,13 @@ router.post('/download', asyncHandler(async (req, res) => {
   child.on('close', (code) => {
     if (code === 0) {
       completeJob(jobId)
+      // Recent mode appends delta files; fold them into the base files off the request path,
+      // then recompile the panel store from the final files
+      if (mode === 'recent') {
+        compactDeltasInBackground(buildPanelStoreInBackground)
+      } else if (mode === 'full') {
+        buildPanelStoreInBackground()
+      }
     } else {
       completeJob(jobId, `Downloader exited with code ${code}`)
     }
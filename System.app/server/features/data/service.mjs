@@ -5,6 +5,7 @@ import fs from 'node:fs/promises'
 import path from 'node:path'
 import { TICKERS_PATH, PARQUET_DIR } from '../../lib/config.mjs'
 import { getConnection, getPooledConnection } from '../../lib/duckdb.mjs'
+import { parquetSource } from '../../lib/parquet-source.mjs'
 
 /**
  * Normalize a ticker symbol
@@ -134,8 +135,7 @@ export function cacheTickerData(ticker, data, limit) {
  * @returns {Promise<Array>} Array of candle objects
  */
 export async function queryCandles(ticker, limit = 1500) {
-  const parquetPath = getParquetPath(ticker)
-  const fileForDuckdb = formatPathForDuckDB(parquetPath)
+  const source = await parquetSource(getParquetPath(ticker))
 
   const sql = `
     SELECT
@@ -145,7 +145,7 @@ export async function queryCandles(ticker, limit = 1500) {
       "Low"   AS low,
       "Close" AS close,
       "Adj Close" AS adjClose
-    FROM read_parquet('${fileForDuckdb}')
+    FROM ${source}
     WHERE "Open" IS NOT NULL AND "High" IS NOT NULL AND "Low" IS NOT NULL AND "Close" IS NOT NULL
     ORDER BY "Date" DESC
     LIMIT ${limit};
@@ -177,8 +177,7 @@ export async function queryCandles(ticker, limit = 1500) {
  * Query candles using pooled connection (for parallel queries)
  */
 export async function queryCandlesPooled(ticker, limit, poolIndex) {
-  const parquetPath = getParquetPath(ticker)
-  const fileForDuckdb = formatPathForDuckDB(parquetPath)
+  const source = await parquetSource(getParquetPath(ticker))
   const pooledConn = getPooledConnection()
 
   const sql = `
@@ -189,7 +188,7 @@ export async function queryCandlesPooled(ticker, limit, poolIndex) {
       "Low"   AS low,
       "Close" AS close,
       "Adj Close" AS adjClose
-    FROM read_parquet('${fileForDuckdb}')
+    FROM ${source}
     WHERE "Open" IS NOT NULL AND "High" IS NOT NULL AND "Low" IS NOT NULL AND "Close" IS NOT NULL
     ORDER BY "Date" DESC
     LIMIT ${limit}
@@ -8,6 +8,7 @@ import helmet from 'helmet'
 import compression from 'compression'
 import duckdb from 'duckdb'
 import { encrypt, decrypt } from './utils/crypto.mjs'
+import { parquetSource } from './lib/parquet-source.mjs'
 import { validateDisplayName } from './utils/profanity-filter.mjs'
 import { seedAdminUser } from './seed-admin.mjs'
 import * as scheduler from './scheduler.mjs'
@@ -138,7 +139,6 @@ async function preloadParquetData() {
     for (const ticker of tickers) {
       try {
         const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-        const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
 
         // Create a table for this ticker and load data from parquet
         // Sanitize ticker name for table (same as Python sanitizer)
@@ -165,7 +165,7 @@ async function preloadParquetData() {
 
         const createSql = `
           CREATE TABLE ${tableName} AS
-          SELECT * FROM read_parquet('${fileForDuckdb}')
+          SELECT * FROM ${await parquetSource(parquetPath)}
         `
 
         await new Promise((resolve, reject) => {
@@ -204,7 +204,6 @@ async function loadTickerIntoMemory(ticker) {
 
   try {
     const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-    const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
     const tableName = `ticker_${ticker.replace(/[^A-Z0-9]/g, '_')}`
 
     // Check if file exists
@@ -222,7 +221,7 @@ async function loadTickerIntoMemory(ticker) {
     // Create table from parquet
     const createSql = `
       CREATE TABLE ${tableName} AS
-      SELECT * FROM read_parquet('${fileForDuckdb}')
+      SELECT * FROM ${await parquetSource(parquetPath)}
     `
 
     await new Promise((resolve, reject) => {
@@ -1099,7 +1098,7 @@ app.get('/api/candles/:ticker', async (req, res) => {
 
   // Query directly from parquet file on disk (production-ready, no memory preload needed)
   const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-  const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
+  const source = await parquetSource(parquetPath)
 
   // Check if parquet file exists
   try {
@@ -1118,7 +1117,7 @@ app.get('/api/candles/:ticker', async (req, res) => {
       "Low"   AS low,
       "Close" AS close,
       "Adj Close" AS adjClose
-    FROM read_parquet('${fileForDuckdb}')
+    FROM ${source}
     WHERE "Open" IS NOT NULL AND "High" IS NOT NULL AND "Low" IS NOT NULL AND "Close" IS NOT NULL
     ORDER BY "Date" DESC
     LIMIT ${limit};
@@ -1204,7 +1203,7 @@ async function preloadAllTickersIntoCache() {
       const promises = batch.map(async (ticker, idx) => {
         const pooledConn = connectionPool[idx % POOL_SIZE]
         const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-        const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
+        const source = await parquetSource(parquetPath)
 
         const sql = `
           SELECT
@@ -1214,7 +1213,7 @@ async function preloadAllTickersIntoCache() {
             "Low"   AS low,
             "Close" AS close,
             "Adj Close" AS adjClose
-          FROM read_parquet('${fileForDuckdb}')
+          FROM ${source}
           WHERE "Open" IS NOT NULL AND "High" IS NOT NULL AND "Low" IS NOT NULL AND "Close" IS NOT NULL
           ORDER BY "Date" DESC
           LIMIT ${PRELOAD_LIMIT}
@@ -1344,7 +1343,7 @@ app.post('/api/candles/batch', async (req, res) => {
     const promises = tickersToFetch.map(async (ticker, i) => {
       const pooledConn = connectionPool[i % POOL_SIZE]
       const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-      const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
+      const source = await parquetSource(parquetPath)
       const sql = `
         SELECT
           epoch_ms("Date") AS ts_ms,
@@ -1353,7 +1352,7 @@ app.post('/api/candles/batch', async (req, res) => {
           "Low"   AS low,
           "Close" AS close,
           "Adj Close" AS adjClose
-        FROM read_parquet('${fileForDuckdb}')
+        FROM ${source}
         WHERE "Open" IS NOT NULL AND "High" IS NOT NULL AND "Low" IS NOT NULL AND "Close" IS NOT NULL
         ORDER BY "Date" DESC
         LIMIT ${limit}
@@ -2165,10 +2164,10 @@ async function getLatestTickerDataDate() {
     // Query the first available ticker for max date
     const sampleTicker = parquetTickers[0]
     const parquetPath = path.join(PARQUET_DIR, `${sampleTicker}.parquet`)
-    const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
+    const source = await parquetSource(parquetPath)
 
     const result = await new Promise((resolve, reject) => {
-      conn.all(`SELECT MAX(Date) as max_date FROM read_parquet('${fileForDuckdb}')`, (err, rows) => {
+      conn.all(`SELECT MAX(Date) as max_date FROM ${source}`, (err, rows) => {
         if (err) reject(err)
         else resolve(rows)
       })
@@ -4,6 +4,7 @@
 import duckdb from 'duckdb'
 import path from 'node:path'
 import { PARQUET_DIR, DUCKDB_POOL_SIZE } from './config.mjs'
+import { parquetSource } from './parquet-source.mjs'
 
 // In-memory DuckDB database
 const db = new duckdb.Database(':memory:')
@@ -72,7 +73,6 @@ export async function loadTickerIntoMemory(ticker) {
   }
 
   const parquetPath = path.join(PARQUET_DIR, `${ticker}.parquet`)
-  const fileForDuckdb = parquetPath.replace(/\\/g, '/').replace(/'/g, "''")
   const tableName = `ticker_${ticker.replace(/[^A-Z0-9]/g, '_')}`
 
   try {
@@ -91,7 +91,7 @@ export async function loadTickerIntoMemory(ticker) {
     // Create table from parquet
     const createSql = `
       CREATE TABLE ${tableName} AS
-      SELECT * FROM read_parquet('${fileForDuckdb}')
+      SELECT * FROM ${await parquetSource(parquetPath)}
     `
 
     await new Promise((resolve, reject) => {
@@ -0,0 +1,60 @@
+// server/lib/parquet-source.mjs
+// DuckDB FROM-clause for a ticker's parquet file plus its appended deltas
+
+import fs from 'node:fs/promises'
+import path from 'node:path'
+
+// Rows appended since a ticker's parquet file was written live in
+// <parquet_dir>/_deltas/<TICKER>/*.parquet (see ticker-data/deltas.py)
+const DELTAS_DIR = '_deltas'
+
+function quote(filePath) {
+  return `'${filePath.replace(/\\/g, '/').replace(/'/g, "''")}'`
+}
+
+/**
+ * Delta files that extend a ticker's parquet file, oldest first.
+ * Only deltas newer than the base file count: rewriting the base (compaction
+ * or a full download) supersedes every delta written before it.
+ */
+export async function listDeltaFiles(parquetPath) {
+  const dir = path.join(path.dirname(parquetPath), DELTAS_DIR, path.basename(parquetPath, '.parquet'))
+  let names
+  try {
+    names = (await fs.readdir(dir)).filter((n) => n.endsWith('.parquet')).sort()
+  } catch {
+    return []
+  }
+  if (names.length === 0) return []
+
+  let baseMtime
+  try {
+    baseMtime = (await fs.stat(parquetPath, { bigint: true })).mtimeNs
+  } catch {
+    return []
+  }
+
+  const live = []
+  for (const name of names) {
+    try {
+      const st = await fs.stat(path.join(dir, name), { bigint: true })
+      if (st.mtimeNs > baseMtime) live.push(path.join(dir, name))
+    } catch {
+      // Removed by compaction meanwhile
+    }
+  }
+  return live
+}
+
+/**
+ * SQL to use after FROM for a ticker's data: read_parquet('<file>'), or a
+ * de-duplicated union with its deltas when rows were appended since
+ */
+export async function parquetSource(parquetPath) {
+  const deltas = await listDeltaFiles(parquetPath)
+  if (deltas.length === 0) {
+    return `read_parquet(${quote(parquetPath)})`
+  }
+  const files = [parquetPath, ...deltas].map(quote).join(', ')
+  return `(SELECT DISTINCT ON ("Date") * FROM read_parquet([${files}], union_by_name = true))`
+}
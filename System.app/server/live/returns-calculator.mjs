@@ -6,6 +6,7 @@
  */
 
 import { getLatestPrices } from './broker-alpaca.mjs'
+import { parquetSource } from '../lib/parquet-source.mjs'
 
 /**
  * Calculate the daily return for a set of allocations
@@ -70,7 +71,7 @@ export async function getPriceChanges(db, tickers, fromDate, toDate) {
       // Use DuckDB to query the parquet file
       const query = `
         SELECT date, close
-        FROM read_parquet('ticker-data/data/ticker_data_parquet/${ticker}.parquet')
+        FROM ${await parquetSource(`ticker-data/data/ticker_data_parquet/${ticker}.parquet`)}
         WHERE date >= '${fromDate}' AND date <= '${toDate}'
         ORDER BY date
       `
@@ -4,9 +4,12 @@
  */
 
 import { spawn } from 'child_process'
+import net from 'net'
 import path from 'path'
 import { fileURLToPath } from 'url'
 import os from 'os'
+import { PROTOCOL_BINARY, PROTOCOL_JSON, FrameReader, decodeResult, encodeFrame } from './workerProtocol.mjs'
+import { AffinityScheduler } from './taskScheduler.mjs'
 
 const __filename = fileURLToPath(import.meta.url)
 const __dirname = path.dirname(__filename)
@@ -16,7 +19,8 @@ export class WorkerPool {
     this.parquetDir = parquetDir
     this.numWorkers = numWorkers || Math.max(1, os.cpus().length - 1)
     this.workers = []
-    this.taskQueue = []
+    // Queued branches grouped by the tickers they read (routed to the worker holding them)
+    this.taskQueue = new AffinityScheduler()
     this.results = []
     this.errors = []
     this.activeWorkers = 0
@@ -28,6 +32,17 @@ export class WorkerPool {
     this.onComplete = null
     this.onError = null
     this.cancelled = false
+    this.isShutdown = false
+    // Wire protocol asked for in the init message (PYWORKER_PROTOCOL=json for readable debugging)
+    this.protocol = process.env.PYWORKER_PROTOCOL === PROTOCOL_JSON ? PROTOCOL_JSON : PROTOCOL_BINARY
+    // Branches sent per request (see processNextTask)
+    this.batchSize = Math.max(1, parseInt(process.env.PYWORKER_BATCH || '8', 10) || 1)
+    // Fork workers from a pre-loaded zygote (worker_zygote.py): on by default on Linux,
+    // PYWORKER_ZYGOTE=1 forces it on (macOS), PYWORKER_ZYGOTE=0 spawns every worker
+    this.useZygote = process.env.PYWORKER_ZYGOTE
+      ? process.env.PYWORKER_ZYGOTE === '1'
+      : process.platform === 'linux'
+    this.zygote = null
   }
 
   /**
@@ -36,110 +51,312 @@ export class WorkerPool {
   start() {
     console.log(`[WorkerPool] Starting with ${this.numWorkers} workers`)
     this.cancelled = false
+    this.isShutdown = false
     this.completedTasks = 0
     this.passingBranches = 0
     this.failedBranches = 0
     this.startTime = Date.now()
 
+    if (this.useZygote) {
+      this.startZygote()
+    }
     for (let i = 0; i < this.numWorkers; i++) {
       this.spawnWorker(i)
     }
   }
 
   /**
-   * Spawn a single persistent Python worker
+   * Init message of every worker (pre-load metadata and shared memory)
+   */
+  workerConfig() {
+    return {
+      parquetDir: this.parquetDir,
+      preloadTickers: this.preloadTickers || [],
+      preloadGroups: this.preloadGroups || [],
+      sharedMemoryMetadata: this.sharedMemoryMetadata || null,
+      sharedIndicatorMetadata: this.sharedIndicatorMetadata || null,
+      protocol: this.protocol
+    }
+  }
+
+  /**
+   * Start the zygote that pre-loads once and forks the workers
+   * zygote.ready resolves false if it fails, and workers are spawned instead
+   */
+  startZygote() {
+    const python = spawn('python', [path.join(__dirname, 'worker_zygote.py')])
+    const zygote = { process: python, alive: true, ready: null }
+    this.zygote = zygote
+
+    zygote.ready = new Promise((resolve) => {
+      let buffer = ''
+      python.stdout.on('data', (data) => {
+        buffer += data.toString()
+        let newlineIndex
+        while ((newlineIndex = buffer.indexOf('\n')) !== -1) {
+          const line = buffer.slice(0, newlineIndex)
+          buffer = buffer.slice(newlineIndex + 1)
+          try {
+            const response = JSON.parse(line)
+            if (response.status === 'ready') {
+              console.log(`[WorkerPool] Zygote ready (pid ${response.pid})`)
+              resolve(true)
+            } else if (response.error) {
+              console.error('[WorkerPool] Zygote error:', response.error)
+            }
+          } catch (error) {
+            console.error('[WorkerPool] Zygote parse error:', error)
+          }
+        }
+      })
+
+      python.on('close', (code) => {
+        zygote.alive = false
+        console.log(`[WorkerPool] Zygote exited with code ${code}`)
+        resolve(false)
+      })
+
+      python.on('error', (error) => {
+        zygote.alive = false
+        console.error('[WorkerPool] Zygote error:', error)
+        resolve(false)
+      })
+    })
+
+    // Forked workers log through the zygote's stderr
+    python.stderr.on('data', (data) => {
+      console.error('[Zygote]', data.toString().trim())
+    })
+
+    python.stdin.on('error', () => {}) // Reported by 'close'
+    python.stdin.write(JSON.stringify(this.workerConfig()) + '\n')
+  }
+
+  /**
+   * Start a persistent Python worker: forked from the zygote when it runs,
+   * otherwise a new process
    */
-  spawnWorker(workerId) {
+  async spawnWorker(workerId) {
+    if (this.zygote && await this.zygote.ready && this.zygote.alive && !this.isShutdown) {
+      this.forkWorker(workerId)
+      return
+    }
+
     const pythonScript = path.join(__dirname, 'persistent_worker.py')
 
     // Spawn persistent Python process
     const python = spawn('python', [pythonScript])
+    const worker = this.attachWorker(workerId, python, python.stdin, python.stdout)
+
+    python.stderr.on('data', (data) => {
+      // Show stderr output to see pre-loading progress
+      console.error(`[Worker ${workerId}]`, data.toString().trim())
+    })
+
+    python.on('close', (code) => {
+      console.log(`[WorkerPool] Worker ${workerId} exited with code ${code}`)
+      this.detachWorker(worker, new Error(`Worker exited with code ${code}`))
+    })
+
+    python.on('error', (error) => {
+      console.error(`[WorkerPool] Worker ${workerId} error:`, error)
+      for (const pending of worker.pending.splice(0)) {
+        pending.reject(error)
+      }
+    })
+
+    // Send initialization config (with optional pre-load metadata and shared memory)
+    python.stdin.write(JSON.stringify(this.workerConfig()) + '\n')
+  }
+
+  /**
+   * Fork a worker from the zygote; it connects back over its own Unix socket
+   */
+  forkWorker(workerId) {
+    const socketPath = path.join(os.tmpdir(), `pyworker-${process.pid}-${workerId}-${Date.now()}.sock`)
+    const server = net.createServer()
+    const requested = Date.now()
+
+    server.once('connection', (socket) => {
+      server.close() // Removes the socket file
+      const worker = this.attachWorker(workerId, null, socket, socket)
+      console.log(`[WorkerPool] Worker ${workerId} forked in ${Date.now() - requested}ms`)
+
+      socket.on('close', () => {
+        console.log(`[WorkerPool] Worker ${workerId} exited`)
+        this.detachWorker(worker, new Error('Worker exited'))
+
+        // A worker lost mid-run is replaced by a fresh fork (milliseconds, caches already warm)
+        if (!this.isShutdown && !this.cancelled && this.zygote?.alive) {
+          console.log(`[WorkerPool] Replacing worker ${workerId}`)
+          this.spawnWorker(workerId)
+        }
+      })
+
+      socket.on('error', (error) => {
+        console.error(`[WorkerPool] Worker ${workerId} error:`, error)
+      })
+
+      socket.write(JSON.stringify(this.workerConfig()) + '\n')
+    })
 
+    server.on('error', (error) => {
+      console.error(`[WorkerPool] Worker ${workerId} socket error, spawning instead:`, error)
+      this.zygote = null
+      this.spawnWorker(workerId)
+    })
+
+    server.listen(socketPath, () => {
+      this.zygote.process.stdin.write(JSON.stringify({ command: 'fork', workerId, socket: socketPath }) + '\n')
+    })
+  }
+
+  /**
+   * Stop routing work to a worker whose process is gone
+   */
+  detachWorker(worker, error) {
+    worker.ready = false
+    this.taskQueue.release(worker.id)
+    for (const pending of worker.pending.splice(0)) {
+      pending.reject(error)
+    }
+  }
+
+  /**
+   * Register a worker and parse its replies
+   * child is the child process when spawned (null when forked), input and
+   * output are the streams its requests and replies go through
+   */
+  attachWorker(workerId, child, input, output) {
     const worker = {
       id: workerId,
       busy: false,
-      process: python,
-      buffer: '',
+      process: child,
+      input,
+      buffer: Buffer.alloc(0),
+      frames: new FrameReader(),
+      protocol: PROTOCOL_JSON,
       ready: false,
-      currentResolve: null,
-      currentReject: null
+      pending: [],
+      memoryRequests: [],
+      // Tickers and indicators this worker has cached (reported by the worker, see taskScheduler.mjs)
+      warmTickers: new Set(),
+      warmIndicators: new Set()
     }
 
-    // Handle stdout (line-buffered JSON responses)
-    python.stdout.on('data', (data) => {
-      worker.buffer += data.toString()
+    const handleResponse = (response) => {
+      // The worker sends its warm set whenever it changed
+      if (response.warmTickers) {
+        worker.warmTickers = new Set(response.warmTickers)
+        delete response.warmTickers
+      }
 
-      // Process complete lines
-      let newlineIndex
-      while ((newlineIndex = worker.buffer.indexOf('\n')) !== -1) {
-        const line = worker.buffer.substring(0, newlineIndex)
-        worker.buffer = worker.buffer.substring(newlineIndex + 1)
+      // Handle ready signal (names the protocol of every later message)
+      if (response.status === 'ready') {
+        worker.ready = true
+        worker.protocol = response.protocol === PROTOCOL_BINARY ? PROTOCOL_BINARY : PROTOCOL_JSON
+        console.log(`[WorkerPool] Worker ${workerId} ready (${worker.protocol})`)
+        this.processNextTask(worker)
+        return
+      }
 
-        try {
-          const response = JSON.parse(line)
+      // Handle memory usage report (see getMemoryUsage)
+      if (response.memory) {
+        const resolveMemory = worker.memoryRequests.shift()
+        if (resolveMemory) {
+          resolveMemory({ workerId, ...response.memory })
+        }
+        return
+      }
 
-          // Handle ready signal
-          if (response.status === 'ready') {
-            worker.ready = true
-            console.log(`[WorkerPool] Worker ${workerId} ready`)
-            this.processNextTask(worker)
-            continue
-          }
+      // Handle branch result (results arrive in the order the branches were sent)
+      const pending = worker.pending.shift()
+      if (pending) {
+        pending.resolve(response)
+      }
+    }
 
-          // Handle branch result
-          if (worker.currentResolve) {
-            worker.currentResolve(response)
-            worker.currentResolve = null
-            worker.currentReject = null
-          }
-        } catch (error) {
-          console.error(`[WorkerPool] Worker ${workerId} JSON parse error:`, error)
-          if (worker.currentReject) {
-            worker.currentReject(error)
-            worker.currentResolve = null
-            worker.currentReject = null
-          }
-        }
+    const handleParseError = (error) => {
+      console.error(`[WorkerPool] Worker ${workerId} ${worker.protocol} parse error:`, error)
+      const pending = worker.pending.shift()
+      if (pending) {
+        pending.reject(error)
       }
-    })
+    }
 
-    python.stderr.on('data', (data) => {
-      // Show stderr output to see pre-loading progress
-      console.error(`[Worker ${workerId}]`, data.toString().trim())
-    })
+    // Handle stdout: JSON lines up to the ready reply, then JSON lines or binary frames
+    output.on('data', (data) => {
+      if (worker.protocol === PROTOCOL_JSON) {
+        worker.buffer = Buffer.concat([worker.buffer, data])
 
-    python.on('close', (code) => {
-      console.log(`[WorkerPool] Worker ${workerId} exited with code ${code}`)
-      if (worker.currentReject) {
-        worker.currentReject(new Error(`Worker exited with code ${code}`))
+        // Process complete lines
+        let newlineIndex
+        while (worker.protocol === PROTOCOL_JSON && (newlineIndex = worker.buffer.indexOf(0x0a)) !== -1) {
+          const line = worker.buffer.subarray(0, newlineIndex).toString()
+          worker.buffer = worker.buffer.subarray(newlineIndex + 1)
+
+          let response
+          try {
+            response = JSON.parse(line)
+          } catch (error) {
+            handleParseError(error)
+            continue
+          }
+          handleResponse(response)
+        }
+        if (worker.protocol === PROTOCOL_JSON) {
+          return
+        }
+
+        // Switched to binary: anything after the ready line is already framed
+        data = worker.buffer
+        worker.buffer = Buffer.alloc(0)
       }
-    })
 
-    python.on('error', (error) => {
-      console.error(`[WorkerPool] Worker ${workerId} error:`, error)
-      if (worker.currentReject) {
-        worker.currentReject(error)
+      worker.frames.push(data)
+      let frame
+      while ((frame = worker.frames.next()) !== null) {
+        let response
+        try {
+          response = decodeResult(frame)
+        } catch (error) {
+          handleParseError(error)
+          continue
+        }
+        handleResponse(response)
       }
     })
 
-    this.workers.push(worker)
+    // A replacement takes over its predecessor's slot
+    const index = this.workers.findIndex((existing) => existing.id === workerId)
+    if (index >= 0) {
+      this.workers[index] = worker
+    } else {
+      this.workers.push(worker)
+    }
+    return worker
+  }
 
-    // Send initialization config (with optional pre-load metadata and shared memory)
-    const config = {
-      parquetDir: this.parquetDir,
-      preloadTickers: this.preloadTickers || [],
-      preloadIndicators: this.preloadIndicators || {},
-      sharedMemoryMetadata: this.sharedMemoryMetadata || null
+  /**
+   * Send a request to a worker in its protocol
+   * Before the ready reply that is the protocol asked for, which the worker
+   * switches to as soon as it is ready
+   */
+  sendToWorker(worker, message) {
+    const protocol = worker.ready ? worker.protocol : this.protocol
+    if (protocol === PROTOCOL_BINARY) {
+      worker.input.write(encodeFrame(message))
+    } else {
+      worker.input.write(JSON.stringify(message) + '\n')
     }
-    python.stdin.write(JSON.stringify(config) + '\n')
   }
 
   /**
    * Add tasks to the queue
    */
   addTasks(tasks) {
-    this.taskQueue.push(...tasks)
-    this.totalTasks = this.taskQueue.length + this.completedTasks
+    this.taskQueue.add(tasks)
+    this.totalTasks = this.taskQueue.size + this.completedTasks
   }
 
   /**
@@ -423,6 +640,10 @@ export class WorkerPool {
   /**
    * Run batch optimization to pre-load tickers and pre-compute indicators
    * This gives 10-100x speedup by sharing cached data across all branches
+   *
+   * The optimizer keeps its shared memory arenas until this pool replies that
+   * it adopted them; otherwise (or if the pool goes away) it unlinks them, so
+   * arenas named after this long-lived process never outlive their use.
    */
   async runBatchOptimization(branches) {
     return new Promise((resolve) => {
@@ -434,45 +655,36 @@ export class WorkerPool {
 
         let stdoutData = ''
         let stderrData = ''
+        let replied = false
+
+        // Tell the optimizer whether its arenas were adopted (it unlinks them if not)
+        const reply = (adopted) => {
+          if (replied) return
+          replied = true
+          python.stdin.end(JSON.stringify({ adopted }) + '\n')
+        }
 
         python.stdout.on('data', (data) => {
           stdoutData += data.toString()
+          if (!replied && stdoutData.includes('\n')) {
+            reply(this.adoptBatchResult(stdoutData))
+          }
         })
 
         python.stderr.on('data', (data) => {
           stderrData += data.toString()
         })
 
+        python.stdin.on('error', () => {}) // Optimizer exited before reading the reply
+
         python.on('close', (code) => {
+          replied = true
           if (code !== 0) {
             console.error(`[WorkerPool] Batch optimizer failed (code ${code})`)
             console.error('[WorkerPool] stderr:', stderrData)
             resolve(null) // Continue without optimization
             return
           }
-
-          try {
-            if (stdoutData.trim()) {
-              const result = JSON.parse(stdoutData)
-              if (result.tickers_loaded && result.indicators_computed) {
-                console.log(`[WorkerPool] ✓ Batch optimization complete:`, result.analysis)
-                console.log(`[WorkerPool] ✓ Estimated speedup: ${result.speedup_estimate}`)
-
-                // Store pre-load metadata for workers
-                this.preloadTickers = result.analysis?.tickers || []
-                this.preloadIndicators = result.analysis?.indicators || {}
-
-                // Store shared memory metadata if available
-                if (result.shared_memory_created && result.shared_memory_metadata) {
-                  console.log(`[WorkerPool] ✓ Shared memory created for ${Object.keys(result.shared_memory_metadata).length} tickers`)
-                  this.sharedMemoryMetadata = result.shared_memory_metadata
-                }
-              }
-            }
-          } catch (error) {
-            console.error('[WorkerPool] Failed to parse batch optimizer results:', error)
-          }
-
           resolve(true)
         })
 
@@ -481,18 +693,19 @@ export class WorkerPool {
           resolve(null)
         })
 
-        // Send input data
+        // Send input data (one line; the optimizer then waits for the reply)
         const input = {
           branches: branches.map(b => ({
             branchId: b.branchId,
             tree: b.tree,
             options: b.options
           })),
-          parquetDir: this.parquetDir
+          parquetDir: this.parquetDir,
+          // Shared memory arenas are named after this process so stale ones can be swept if it dies
+          ownerPid: process.pid
         }
 
-        python.stdin.write(JSON.stringify(input))
-        python.stdin.end()
+        python.stdin.write(JSON.stringify(input) + '\n')
 
       } catch (error) {
         console.error('[WorkerPool] runBatchOptimization error:', error)
@@ -501,6 +714,46 @@ export class WorkerPool {
     })
   }
 
+  /**
+   * Take over the batch optimizer's pre-load metadata
+   * Returns whether the shared memory arenas were adopted (workers read and
+   * eventually unlink them)
+   */
+  adoptBatchResult(output) {
+    try {
+      if (!output.trim()) return false
+      const result = JSON.parse(output)
+      if (!result.tickers_loaded || !result.indicators_computed) return false
+
+      console.log(`[WorkerPool] ✓ Batch optimization complete:`, result.analysis)
+      console.log(`[WorkerPool] ✓ Estimated speedup: ${result.speedup_estimate}`)
+
+      // Store pre-load metadata for workers
+      this.preloadTickers = result.analysis?.tickers || []
+      this.preloadGroups = result.indicator_groups || [] // Alignment groups: indicators on the series branches read
+
+      // History length per ticker sets each branch's cost estimate
+      this.taskQueue.setTickerBars(result.ticker_bars)
+
+      // Store shared memory metadata if available
+      if (result.shared_memory_created && result.shared_memory_metadata) {
+        console.log(`[WorkerPool] ✓ Shared memory arena created for ${Object.keys(result.shared_memory_metadata.tickers).length} tickers`)
+        this.sharedMemoryMetadata = result.shared_memory_metadata
+      }
+
+      // Store indicator arena metadata (workers read pre-computed indicators zero-copy)
+      if (result.shared_indicator_metadata) {
+        const arena = result.shared_indicator_metadata
+        console.log(`[WorkerPool] ✓ Shared indicator arena: ${Object.keys(arena.entries).length} arrays (${(arena.size / 1024 / 1024).toFixed(1)} MB)`)
+        this.sharedIndicatorMetadata = arena
+      }
+      return true
+    } catch (error) {
+      console.error('[WorkerPool] Failed to parse batch optimizer results:', error)
+      return false
+    }
+  }
+
   /**
    * Try to vectorize parameter sweeps
    */
@@ -612,23 +865,45 @@ export class WorkerPool {
       return
     }
 
-    // Skip if worker not ready yet
-    if (!worker.ready) {
+    if (this.taskQueue.size === 0) {
+      // No more tasks
+      this.checkCompletion()
       return
     }
 
-    if (this.taskQueue.length === 0) {
-      // No more tasks
-      this.checkCompletion()
+    // Skip if worker not ready yet (or gone)
+    if (!worker.ready) {
       return
     }
 
-    const task = this.taskQueue.shift()
+    // Several branches per request (fewer round trips), but never more than an
+    // even share of what is left so the last branches still spread over all workers.
+    // They come from the group of branches this worker already has the data for.
+    const share = Math.ceil(this.taskQueue.size / this.numWorkers)
+    const tasks = this.taskQueue.take(worker, Math.max(1, Math.min(this.batchSize, share)))
     worker.busy = true
     this.activeWorkers++
 
+    // Results arrive one by one: record each as soon as it is in
+    const results = this.runPythonBatch(tasks, worker)
+    for (let i = 0; i < tasks.length; i++) {
+      await this.recordTaskResult(worker, tasks[i], results[i])
+    }
+
+    worker.busy = false
+    this.activeWorkers--
+
+    // Process next task
+    this.processNextTask(worker)
+  }
+
+  /**
+   * Record the result (or failure) of one branch and report progress
+   */
+  async recordTaskResult(worker, task, resultPromise) {
     try {
-      const result = await this.runPythonBacktest(task, worker)
+      const result = await resultPromise
+      this.taskQueue.observe(worker, task, result.elapsedMs)
 
       if (result.error) {
         // Backtest failed
@@ -660,12 +935,14 @@ export class WorkerPool {
       }
 
       this.completedTasks++
+      const etaMs = this.taskQueue.eta(this.numWorkers)
 
       // Log throughput every 100 tasks
       if (this.completedTasks % 100 === 0 || this.completedTasks === this.totalTasks) {
         const elapsed = (Date.now() - this.startTime) / 1000
         const throughput = this.completedTasks / elapsed
-        console.log(`[WorkerPool] Progress: ${this.completedTasks}/${this.totalTasks} (${throughput.toFixed(1)} branches/sec, ${this.passingBranches} passing, ${this.failedBranches} failed)`)
+        const eta = etaMs === null ? '' : `, ETA ${(etaMs / 1000).toFixed(1)}s`
+        console.log(`[WorkerPool] Progress: ${this.completedTasks}/${this.totalTasks} (${throughput.toFixed(1)} branches/sec, ${this.passingBranches} passing, ${this.failedBranches} failed${eta})`)
       }
 
       // Report progress
@@ -674,7 +951,8 @@ export class WorkerPool {
           completed: this.completedTasks,
           total: this.totalTasks,
           passing: this.passingBranches,
-          failed: this.failedBranches
+          failed: this.failedBranches,
+          etaMs
         })
       }
     } catch (error) {
@@ -689,43 +967,43 @@ export class WorkerPool {
         this.onError(error)
       }
     }
-
-    worker.busy = false
-    this.activeWorkers--
-
-    // Process next task
-    this.processNextTask(worker)
   }
 
   /**
-   * Run Python backtester for a single branch using persistent worker
+   * Run Python backtester for a batch of branches using persistent worker
+   * Returns one promise per branch, resolved in order as its result arrives
    */
-  runPythonBacktest(task, worker) {
-    return new Promise((resolve, reject) => {
-      // Set up promise callbacks on worker
-      worker.currentResolve = resolve
-      worker.currentReject = reject
-
-      // Debug: Log options for first task
-      if (this.completedTasks === 0 && this.activeWorkers === 1) {
-        console.log('[WorkerPool] First task options:', JSON.stringify(task.options, null, 2))
-      }
+  runPythonBatch(tasks, worker) {
+    const results = tasks.map(() => new Promise((resolve, reject) => {
+      worker.pending.push({ resolve, reject })
+    }))
+    // Rejections are handled when each result is awaited in turn
+    results.forEach((result) => result.catch(() => {}))
+
+    // Debug: Log options for first task
+    if (this.completedTasks === 0 && this.activeWorkers === 1) {
+      console.log('[WorkerPool] First task options:', JSON.stringify(tasks[0].options, null, 2))
+    }
 
-      // Send task to persistent worker via stdin
-      const taskJson = JSON.stringify({
+    // Send the batch to the persistent worker via stdin (one request, one result per branch)
+    const request = {
+      tasks: tasks.map((task) => ({
         branchId: task.branchId,
         tree: task.tree,
         options: task.options
-      })
+      }))
+    }
 
-      try {
-        worker.process.stdin.write(taskJson + '\n')
-      } catch (error) {
-        resolve({
+    try {
+      this.sendToWorker(worker, request)
+    } catch (error) {
+      for (const pending of worker.pending.splice(-tasks.length)) {
+        pending.resolve({
           error: `Failed to send task to worker: ${error.message}`
         })
       }
-    })
+    }
+    return results
   }
 
   /**
@@ -737,6 +1015,12 @@ export class WorkerPool {
       const throughput = this.completedTasks / elapsed
       console.log(`[WorkerPool] ✓ COMPLETE: ${this.completedTasks} branches in ${elapsed.toFixed(2)}s (${throughput.toFixed(1)} branches/sec)`)
       console.log(`[WorkerPool] Results: ${this.passingBranches} passing, ${this.failedBranches} failed`)
+      console.log(`[WorkerPool] Scheduling: ${JSON.stringify(this.taskQueue.getStats())}`)
+
+      // Workers are idle now: stop them so the shared memory arenas are released
+      if (this.workers.length > 0) {
+        this.shutdown()
+      }
 
       if (this.onComplete) {
         this.onComplete({
@@ -756,23 +1040,82 @@ export class WorkerPool {
   cancel() {
     console.log('[WorkerPool] Cancelling...')
     this.cancelled = true
-    this.taskQueue = []
+    this.taskQueue.clear()
+    this.shutdown()
   }
 
   /**
    * Shutdown all workers
    */
   shutdown() {
+    if (this.isShutdown) {
+      return
+    }
+    this.isShutdown = true
     console.log('[WorkerPool] Shutting down workers...')
+
+    // One live worker also unlinks the shared memory arenas (dead workers stay listed)
+    const releaser = this.workers.find(worker => worker.ready)
     for (const worker of this.workers) {
       try {
-        // Send shutdown command
-        worker.process.stdin.write(JSON.stringify({ command: 'shutdown' }) + '\n')
-        worker.process.stdin.end()
+        const command = { command: 'shutdown', releaseSharedMemory: worker === releaser }
+        this.sendToWorker(worker, command)
+        worker.input.end()
       } catch (error) {
         // Worker already dead
       }
     }
+    if (!releaser) {
+      this.unlinkSharedMemory()
+    }
+
+    // Forked workers keep running without the zygote until their shutdown
+    if (this.zygote) {
+      this.zygote.process.stdin.end()
+      this.zygote = null
+    }
+  }
+
+  /**
+   * Unlink the adopted shared memory arenas when no worker is left to do it
+   * (the segments are named after this process, so the stale sweep would
+   * only remove them once the server exits)
+   */
+  unlinkSharedMemory() {
+    const names = [this.sharedMemoryMetadata, this.sharedIndicatorMetadata]
+      .filter(Boolean)
+      .map(metadata => metadata.shm_name)
+    if (names.length === 0) return
+
+    console.log(`[WorkerPool] No live worker to release shared memory, unlinking ${names.join(', ')}`)
+    const script = 'import sys\nfrom shared_memory_manager import unlink_shared_segment\nfor name in sys.argv[1:]: unlink_shared_segment(name)'
+    const python = spawn('python', ['-c', script, ...names], { cwd: __dirname, stdio: 'ignore' })
+    python.on('error', (error) => {
+      console.error('[WorkerPool] Failed to unlink shared memory:', error)
+    })
+  }
+
+  /**
+   * Ask every running worker for its cache memory usage (bytes per cache, RSS)
+   * Busy workers answer after their current branch
+   */
+  getMemoryUsage(timeoutMs = 5000) {
+    const requests = this.workers
+      .filter(worker => worker.ready && !this.isShutdown)
+      .map(worker => new Promise((resolve) => {
+        const timer = setTimeout(() => resolve({ workerId: worker.id, error: 'timeout' }), timeoutMs)
+        worker.memoryRequests.push((usage) => {
+          clearTimeout(timer)
+          resolve(usage)
+        })
+        try {
+          this.sendToWorker(worker, { command: 'memory' })
+        } catch (error) {
+          clearTimeout(timer)
+          resolve({ workerId: worker.id, error: error.message })
+        }
+      }))
+    return Promise.all(requests)
   }
 
   /**
@@ -784,9 +1127,10 @@ export class WorkerPool {
       completed: this.completedTasks,
       passing: this.passingBranches,
       failed: this.failedBranches,
-      pending: this.taskQueue.length,
+      pending: this.taskQueue.size,
       active: this.activeWorkers,
       percentage: this.totalTasks > 0 ? (this.completedTasks / this.totalTasks) * 100 : 0,
+      etaMs: this.taskQueue.eta(this.numWorkers),
     }
   }
 }
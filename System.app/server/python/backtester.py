@@ -4,13 +4,17 @@ Python backtester for Atlas Forge - High-performance tree-based strategy backtes
 Processes flowchart trees with parallel worker pool for massive speedup
 """
 
+import os
 import sys
 import json
-import pandas as pd
+import hashlib
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
+from signal_cache import SignalCache, compare_series, normalize_comparator
+from price_quality import QUALITY_DTYPE, QUALITY_MISSING, QUALITY_UNFILLED, forward_fill, quality_counts, scan_prices
+from synthetic_tickers import build_ratio_columns, expand_tickers, parse_ratio_ticker
 
 # Import optimized metrics (Numba JIT-compiled for 10-100x speedup)
 try:
@@ -22,9 +26,16 @@ except ImportError:
 
 # Import optimized data loader and indicator cache (1000x+ speedup)
 try:
-    from optimized_dataloader import get_global_cache
+    from optimized_dataloader import get_global_cache, parquet_data_version, ticker_data_version, read_price_parquet, adjustment_factors
     from indicator_cache import IndicatorCache
+    from indicator_store import IndicatorStore
     from result_cache import get_global_result_cache
+    from tree_hash import node_hashes
+    from subtree_memo import SubtreeMemo, MISS
+    from panel_cache import PanelCache
+    from panel_store import PanelStore
+    from indicator_cache import series_fingerprint
+    from compact_mode import COMPACT_ENABLED, PrecisionGuard
     CACHE_AVAILABLE = True
 except ImportError:
     CACHE_AVAILABLE = False
@@ -34,6 +45,60 @@ except ImportError:
 BACKTEST_START_DATE = '1993-01-01'
 MIN_DATES = 3
 
+# Most recent rows of a ticker a backtest reads (about 79 years of daily bars).
+# The parquet path truncates to this; the panel store holds every row, so a
+# ticker with more rows is aligned from parquet to give the same window.
+MAX_TICKER_ROWS = 20000
+
+# Aligned price fields: (db key, parquet column)
+PRICE_FIELDS = (
+    ('open', 'Open'),
+    ('high', 'High'),
+    ('low', 'Low'),
+    ('close', 'Close'),
+    ('adjClose', 'Adj Close'),
+    ('volume', 'Volume'),
+    ('adjFactor', 'Adj Factor'),
+)
+
+# Price series indicators can be computed on (run option indicatorPrice)
+INDICATOR_PRICES = ('close', 'adjClose')
+
+
+def _fill_aligned(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Finish a ticker's columns aligned to a date axis
+
+    Values were repaired at load time (price_quality.scan_prices), so only the
+    dates the ticker has no row on are filled, from the previous date. Dates
+    before its first row stay NaN (never back-filled from later prices) and
+    are flagged UNFILLED in 'quality'.
+    """
+    filled = {key: forward_fill(values) for key, values in columns.items() if key != 'quality'}
+    quality = np.array(columns['quality'], dtype=QUALITY_DTYPE)
+    quality[np.isnan(filled['close'])] |= QUALITY_UNFILLED
+    filled['quality'] = quality
+    return filled
+
+
+def _gate_allocation(allocation: Dict[str, float], quality: Dict[str, np.ndarray], idx: int) -> Dict[str, float]:
+    """
+    Drop positions in tickers that have no price yet at a bar
+
+    Position tickers may start later than the indicator tickers that set the
+    date axis; until their first row they are NaN and flagged UNFILLED, and
+    their weight stays in cash.
+    """
+    gated = {t: w for t, w in allocation.items() if t not in quality or not quality[t][idx] & QUALITY_UNFILLED}
+    return gated if len(gated) < len(allocation) else allocation
+
+
+def _tail(columns: Dict[str, np.ndarray], limit: int) -> Dict[str, np.ndarray]:
+    """Keep the most recent `limit` rows of a column dict"""
+    if limit and limit < len(columns['time']):
+        return {key: values[-limit:] for key, values in columns.items()}
+    return columns
+
 
 class Backtester:
     """High-performance backtester for flowchart-based strategies"""
@@ -44,56 +109,92 @@ class Backtester:
 
         # Initialize indicator cache for vectorized pre-computation
         if CACHE_AVAILABLE:
-            self.indicator_cache = IndicatorCache(max_cache_size=2000)
+            self.indicator_cache = IndicatorCache(store=IndicatorStore.from_env(str(self.parquet_dir)))
             self.use_global_price_cache = True
         else:
             self.indicator_cache = None
             self.use_global_price_cache = False
 
+        # Subtree allocation memo shared by all branches this backtester runs
+        if CACHE_AVAILABLE and os.environ.get('SUBTREE_MEMO', '1') != '0':
+            self.subtree_memo = SubtreeMemo()
+        else:
+            self.subtree_memo = None
+
+        # Aligned price columns shared by all branches this backtester runs
+        if CACHE_AVAILABLE and os.environ.get('PANEL_CACHE', '1') != '0':
+            self.panel_cache = PanelCache()
+        else:
+            self.panel_cache = None
+
+        # Compiled calendar-aligned price matrices (None if not built, see panel_store.py)
+        self.panel_store = PanelStore.from_env(str(self.parquet_dir)) if CACHE_AVAILABLE else None
+
+        # Evaluated condition signals shared by all branches this backtester runs
+        if CACHE_AVAILABLE and os.environ.get('SIGNAL_CACHE', '1') != '0':
+            self.signal_cache = SignalCache()
+        else:
+            self.signal_cache = None
+
+        # Float64 re-check of signals evaluated on float32 arrays (compact mode only)
+        self.precision_guard = PrecisionGuard() if CACHE_AVAILABLE and COMPACT_ENABLED else None
+        self.precision_flags = set()  # Flagged conditions of the current run
+
         # Shared memory reader (set by persistent_worker if available)
         self.shared_memory_reader = None
 
-    def load_ticker_data(self, ticker: str, limit: int = 20000) -> pd.DataFrame:
-        """Load OHLC data from parquet file (with optimized caching)"""
+    def load_ticker_data(self, ticker: str, limit: int = MAX_TICKER_ROWS) -> Dict[str, np.ndarray]:
+        """
+        Load a ticker's price columns (with optimized caching)
+
+        Returns:
+            Dict with 'time' (Unix seconds, sorted), repaired OHLCV arrays keyed
+            open/high/low/close/adjClose/volume and 'quality' flags (see
+            price_quality); empty dict if unavailable
+        """
         # OPTIMIZATION: Use shared memory if available (zero-copy, 2-3x speedup)
         if self.shared_memory_reader:
             try:
                 ticker_data = self.shared_memory_reader.get_ticker_data(ticker)
                 if ticker_data:
-                    # Convert NumPy arrays back to DataFrame
-                    df = pd.DataFrame({
-                        'Date': pd.to_datetime(ticker_data['dates'], unit='s'),
-                        'Open': ticker_data['open'],
-                        'High': ticker_data['high'],
-                        'Low': ticker_data['low'],
-                        'Close': ticker_data['close'],
-                        'Volume': ticker_data['volume']
-                    })
-                    df['time'] = ticker_data['dates']
-                    return df.tail(limit) if limit < len(df) else df
+                    columns = {key: values for key, values in ticker_data.items() if key != 'dates'}
+                    columns['time'] = ticker_data['dates']
+                    return _tail(columns, limit)
             except Exception as e:
                 # Fall back to regular cache if shared memory fails
                 print(f"[WARNING] Shared memory failed for {ticker}, using cache: {e}", file=sys.stderr)
 
-        # Use global price cache if available (5000x faster for warm loads)
+        # Use global price cache if available (read-only views, no pandas on warm loads)
         if self.use_global_price_cache and CACHE_AVAILABLE:
             try:
                 cache = get_global_cache(str(self.parquet_dir))
-                return cache.get_ticker_data(ticker, limit)
+                return cache.get_ticker_arrays(ticker, limit)
+            except FileNotFoundError:
+                return {}
             except Exception as e:
                 print(f"[WARNING] Global cache failed, falling back: {e}", file=sys.stderr)
 
         # Fallback to local cache
         if ticker in self.price_cache:
-            df = self.price_cache[ticker]
-            return df.tail(limit) if limit < len(df) else df
+            return _tail(self.price_cache[ticker], limit)
+
+        # Ratio tickers are built from their components (see synthetic_tickers)
+        ratio = parse_ratio_ticker(ticker)
+        if ratio:
+            numerator, denominator = (self.load_ticker_data(t, limit=0) for t in ratio)
+            if not numerator or not denominator:
+                return {}
+            self.price_cache[ticker] = build_ratio_columns(numerator, denominator)
+            return _tail(self.price_cache[ticker], limit)
 
         parquet_file = self.parquet_dir / f"{ticker}.parquet"
         if not parquet_file.exists():
-            return pd.DataFrame()
+            return {}
 
         try:
-            df = pd.read_parquet(parquet_file)
+            import pandas as pd  # Only this uncached fallback needs pandas (keeps it out of fast starts)
+
+            df = read_price_parquet(parquet_file) if CACHE_AVAILABLE else pd.read_parquet(parquet_file)
 
             # Ensure Date column is datetime
             if 'Date' in df.columns:
@@ -105,25 +206,60 @@ class Backtester:
             # Sort by date
             df = df.sort_values('Date')
 
-            # Add timestamp column (Unix epoch in seconds)
-            df['time'] = df['Date'].astype(np.int64) // 10**9
+            # Convert to columns keyed like the shared-memory arena (time = Unix seconds)
+            columns = {'time': df['Date'].values.astype('datetime64[ns]').astype(np.int64) // 10**9}
+            for key, field in PRICE_FIELDS:
+                if field in df.columns:
+                    columns[key] = df[field].values.astype(np.float64)
+            repaired, columns['quality'] = scan_prices(columns)
+            columns.update(repaired)
+            if CACHE_AVAILABLE and 'close' in columns:
+                columns['adjFactor'] = adjustment_factors(columns['close'], columns.get('adjClose'))
 
             # Cache it
-            self.price_cache[ticker] = df
+            self.price_cache[ticker] = columns
 
-            return df.tail(limit) if limit < len(df) else df
+            return _tail(columns, limit)
         except Exception as e:
             print(f"Error loading {ticker}: {e}", file=sys.stderr)
-            return pd.DataFrame()
+            return {}
+
+    def get_data_version(self, ticker: str) -> Optional[str]:
+        """Get the version of a ticker's source data (keys indicator/result caches)"""
+        if self.shared_memory_reader:
+            version = self.shared_memory_reader.get_data_version(ticker)
+            if version is not None:
+                return version
+        if self.use_global_price_cache and CACHE_AVAILABLE:
+            return get_global_cache(str(self.parquet_dir)).get_data_version(ticker)
+        if CACHE_AVAILABLE:
+            return ticker_data_version(self.parquet_dir, ticker)
+        return None
+
+    def get_tree_data_version(self, tickers: List[str], indicator_tickers: List[str]) -> str:
+        """
+        Combined version of every ticker a tree reads (keys the result cache)
+
+        Changes whenever any of the tickers' source data is rewritten, so cached
+        results computed on older data are never served.
+        """
+        parts = [f"{t}={self.get_data_version(t)}" for t in sorted(set(tickers) | set(indicator_tickers))]
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
 
     def build_price_database(self, tickers: List[str], indicator_tickers: List[str]) -> Dict:
         """Build aligned price database for all tickers"""
+        # OPTIMIZATION: Read aligned rows straight from the compiled panel store
+        if self.panel_store is not None:
+            served, db = self._build_from_panel_store(tickers, indicator_tickers)
+            if served:
+                return db
+
         # Load all ticker data
         ticker_data = {}
         for ticker in tickers:
-            df = self.load_ticker_data(ticker)
-            if len(df) > 0:
-                ticker_data[ticker] = df
+            columns = self.load_ticker_data(ticker)
+            if columns and len(columns['time']) > 0:
+                ticker_data[ticker] = columns
 
         if not ticker_data:
             return None
@@ -136,60 +272,113 @@ class Backtester:
         # Get common dates (dates present in all intersection tickers)
         common_dates = None
         for ticker in intersection_tickers:
-            dates = set(ticker_data[ticker]['time'].values)
-            if common_dates is None:
-                common_dates = dates
-            else:
-                common_dates = common_dates.intersection(dates)
+            times = ticker_data[ticker]['time']
+            common_dates = np.unique(times) if common_dates is None else np.intersect1d(common_dates, times)
 
-        if not common_dates or len(common_dates) < MIN_DATES:
+        if common_dates is None or len(common_dates) < MIN_DATES:
             return None
 
-        # Sort dates
-        dates = sorted(list(common_dates))
-
         # Enforce 1993 minimum year to avoid unreliable pre-1993 data
-        min_timestamp = pd.Timestamp('1993-01-01').value // 10**9  # Convert to Unix timestamp
-        dates = [d for d in dates if d >= min_timestamp]
+        min_timestamp = int(np.datetime64(BACKTEST_START_DATE, 's').astype(np.int64))  # Unix timestamp
+        dates = common_dates[common_dates >= min_timestamp]
 
-        if not dates or len(dates) < MIN_DATES:
+        if len(dates) < MIN_DATES:
             return None
 
-        # Build aligned arrays for each ticker
+        versions = {ticker: self.get_data_version(ticker) for ticker in ticker_data}
+
+        # OPTIMIZATION: Reuse columns aligned for earlier branches (same or wider date axis)
+        columns = {}
+        if self.panel_cache is not None:
+            anchored = {t for t, data in ticker_data.items() if self._has_complete_row(data, dates[0])}
+            columns = self.panel_cache.lookup(dates, versions, anchored)
+
+        aligned = {}
+        for ticker, data in ticker_data.items():
+            if ticker not in columns:
+                aligned[ticker] = self._align_ticker(data, dates)
+        if self.panel_cache is not None:
+            self.panel_cache.store(dates, aligned, versions)
+        columns.update(aligned)
+
+        return self._assemble_db(dates, {t: columns[t] for t in ticker_data}, versions, intersection_tickers)
+
+    def _build_from_panel_store(self, tickers: List[str], indicator_tickers: List[str]) -> Tuple[bool, Optional[Dict]]:
+        """
+        Build the aligned price database from the panel store
+
+        Returns:
+            (served, db): served is False when any requested ticker is missing
+            from the store, was compiled from an older data version or has
+            more than MAX_TICKER_ROWS rows, in which case the caller aligns
+            from the parquet data instead
+
+        Ratio tickers are not compiled: their components must be in the
+        store, and the ratio columns (built once and cached by the price
+        cache) are aligned to the store's dates.
+        """
+        store = self.panel_store
+        versions = {}
+        for ticker in tickers:
+            version = self.get_data_version(ticker)
+            if version is None:
+                continue  # No source data (skipped by the parquet path too)
+            ratio = parse_ratio_ticker(ticker)
+            components = {t: self.get_data_version(t) for t in ratio} if ratio else {ticker: version}
+            for component, component_version in components.items():
+                if not store.is_fresh(component, component_version) or store.row_count(component) > MAX_TICKER_ROWS:
+                    return False, None
+            if all(store.row_count(component) > 0 for component in components):
+                versions[ticker] = version
+
+        if not versions:
+            return False, None
+
+        # A ratio has a row wherever both components do
+        intersection_tickers = [t for t in indicator_tickers if t in versions] or list(versions)
+        days = store.common_days(expand_tickers(intersection_tickers))
+        dates = np.asarray(store.calendar[days])
+        if len(dates) < MIN_DATES:
+            return True, None
+
+        columns = {}
+        for ticker in versions:
+            if parse_ratio_ticker(ticker):
+                columns[ticker] = self._align_ticker(self.load_ticker_data(ticker), dates)
+            else:
+                columns[ticker] = _fill_aligned(store.aligned(ticker, days))
+        return True, self._assemble_db(dates, columns, versions, intersection_tickers)
+
+    def _assemble_db(self, dates: np.ndarray, columns: Dict[str, Dict[str, np.ndarray]],
+                     versions: Dict[str, Optional[str]], trim_tickers: List[str]) -> Dict:
+        """
+        Collect aligned columns into a price database and trim leading rows
+
+        Only trim_tickers (the tickers indicators read) must have a close on
+        the first row. Position tickers may have shorter history and stay NaN
+        (flagged UNFILLED) before their data starts, so a late position
+        ticker does not shorten the backtest.
+        """
         db = {
-            'dates': np.array(dates),
+            'dates': dates,
             'open': {},
             'high': {},
             'low': {},
             'close': {},
             'adjClose': {},
-            'volume': {}
+            'volume': {},
+            'adjFactor': {},
+            'quality': {},
+            'versions': versions
         }
 
-        for ticker, df in ticker_data.items():
-            # Create a mapping from time to row
-            df_indexed = df.set_index('time')
+        for ticker, fields in columns.items():
+            for key, values in fields.items():
+                db[key][ticker] = values
 
-            # Align to common dates (fill with NaN for missing dates)
-            for field in ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']:
-                key = field.replace(' ', '').replace('Close', 'Close')
-                if key == 'AdjClose':
-                    key = 'adjClose'
-                else:
-                    key = key.lower()
-
-                col_name = field
-                if col_name in df_indexed.columns:
-                    # Reindex and forward-fill any NaN values
-                    reindexed = df_indexed.reindex(dates)[col_name]
-                    values = reindexed.ffill().bfill().values  # Forward & backward fill
-                    db[key][ticker] = values
-                else:
-                    db[key][ticker] = np.full(len(dates), np.nan)
-
-        # Remove leading rows where all tickers have NaN in close prices
+        # Remove leading rows where any indicator ticker has NaN in close prices
         valid_mask = np.ones(len(dates), dtype=bool)
-        for ticker in db['close']:
+        for ticker in [t for t in trim_tickers if t in db['close']] or list(db['close']):
             valid_mask &= ~np.isnan(db['close'][ticker])
 
         if valid_mask.any():
@@ -197,12 +386,40 @@ class Backtester:
             if first_valid > 0:
                 # Trim to first valid date
                 db['dates'] = db['dates'][first_valid:]
-                for key in ['open', 'high', 'low', 'close', 'adjClose', 'volume']:
+                for key in ['open', 'high', 'low', 'close', 'adjClose', 'volume', 'adjFactor', 'quality']:
                     for ticker in db[key]:
                         db[key][ticker] = db[key][ticker][first_valid:]
 
         return db
 
+    def _align_ticker(self, data: Dict[str, np.ndarray], dates: np.ndarray) -> Dict[str, np.ndarray]:
+        """Align one ticker's OHLCV columns and quality flags to a date axis (see _fill_aligned)"""
+        times = data['time']
+        pos = np.minimum(np.searchsorted(times, dates), max(len(times) - 1, 0))
+        present = times[pos] == dates if len(times) else np.zeros(len(dates), dtype=bool)
+
+        columns = {}
+        for key, _ in PRICE_FIELDS:
+            if key in data:
+                # float64 even from a compact arena, so equity and metrics never accumulate in float32
+                columns[key] = np.where(present, data[key][pos].astype(np.float64, copy=False), np.nan)
+            else:
+                columns[key] = np.full(len(dates), np.nan)
+        flags = data['quality'][pos] if 'quality' in data else 0
+        columns['quality'] = np.where(present, flags, QUALITY_MISSING)
+        return _fill_aligned(columns)
+
+    def _has_complete_row(self, data: Dict[str, np.ndarray], timestamp: int) -> bool:
+        """Whether a ticker has a row with no missing OHLCV values at a timestamp"""
+        times = data['time']
+        pos = int(np.searchsorted(times, timestamp))
+        if pos >= len(times) or times[pos] != timestamp:
+            return False
+        for key, _ in PRICE_FIELDS:
+            if key in data and np.isnan(data[key][pos]):
+                return False
+        return True
+
     def split_dates(self, dates: np.ndarray, strategy: str, chronological_date: Optional[str] = None) -> Tuple[set, set]:
         """Split dates into IS and OOS sets"""
         is_dates = set()
@@ -295,10 +512,30 @@ class Backtester:
 
     def run_backtest(self, tree: Dict, options: Dict) -> Dict:
         """Run backtest on strategy tree"""
+        # Collect tickers from tree
+        tickers = self.collect_tickers(tree)
+        indicator_tickers = self.collect_indicator_tickers(tree)
+
+        # Ratio tickers in conditions are loaded as series of their own
+        tickers.extend(t for t in indicator_tickers if parse_ratio_ticker(t) and t not in tickers)
+
+        # Always include SPY
+        if 'SPY' not in tickers:
+            tickers.append('SPY')
+        if 'SPY' not in indicator_tickers:
+            indicator_tickers.append('SPY')
+
         # OPTIMIZATION: Check result cache first (2-5x speedup for duplicate trees)
+        data_version = ''
+        hashes = None
+        used_tickers = set(tickers) | set(indicator_tickers)
         if CACHE_AVAILABLE:
+            # Structural hash of every node: root keys the result cache, subtrees key the memo
+            hashes = node_hashes(tree)
+            data_version = self.get_tree_data_version(tickers, indicator_tickers)
             result_cache = get_global_result_cache()
-            cached_result = result_cache.get(tree, options)
+            cached_result = result_cache.get(tree, options, data_version, tree_hash=hashes[id(tree)],
+                                             tickers=used_tickers)
             if cached_result is not None:
                 # Cache hit! Return cached result immediately
                 return cached_result
@@ -310,23 +547,19 @@ class Backtester:
         # Debug: Log split config
         print(f'[DEBUG] splitConfig received: {json.dumps(split_config)}', file=sys.stderr, flush=True)
 
-        # Collect tickers from tree
-        tickers = self.collect_tickers(tree)
-        indicator_tickers = self.collect_indicator_tickers(tree)
-
-        # Always include SPY
-        if 'SPY' not in tickers:
-            tickers.append('SPY')
-        if 'SPY' not in indicator_tickers:
-            indicator_tickers.append('SPY')
-
         # Build price database
         db = self.build_price_database(tickers, indicator_tickers)
         if db is None or len(db['dates']) < MIN_DATES:
             raise ValueError('Not enough overlapping price data')
 
+        indicator_price = options.get('indicatorPrice', 'close')
+        if indicator_price not in INDICATOR_PRICES:
+            raise ValueError(f'Unsupported indicatorPrice: {indicator_price}')
+        db['indicatorPrice'] = indicator_price
+
         # Run simulation
-        equity_curve, allocations = self.simulate(tree, db, mode, cost_bps)
+        self.precision_flags = set()
+        equity_curve, allocations = self.simulate(tree, db, mode, cost_bps, hashes)
 
         # Calculate metrics
         metrics = self.calculate_metrics(equity_curve, db, mode, allocations=allocations)
@@ -376,10 +609,23 @@ class Backtester:
             'allocations': allocations
         }
 
+        # Bars of the backtest that were repaired or left unfilled, per ticker (see price_quality)
+        data_quality = {t: quality_counts(q) for t, q in db['quality'].items() if q.any()}
+        if data_quality:
+            result['dataQuality'] = data_quality
+
+        # Compact mode: conditions whose float32 signal differed from float64 (float64 was used)
+        if self.precision_guard is not None:
+            result['precisionFlags'] = len(self.precision_flags)
+            if self.precision_flags:
+                print(f"[Backtester] Warning: {len(self.precision_flags)} conditions of this branch "
+                      f"differ in float32, used float64 signals", file=sys.stderr)
+
         # OPTIMIZATION: Cache result for future lookups (2-5x speedup for duplicates)
         if CACHE_AVAILABLE:
             result_cache = get_global_result_cache()
-            result_cache.set(tree, options, result)
+            result_cache.set(tree, options, result, data_version, tree_hash=hashes[id(tree)],
+                             tickers=used_tickers)
 
         return result
 
@@ -431,13 +677,15 @@ class Backtester:
 
         return list(set(tickers))
 
-    def simulate(self, tree: Dict, db: Dict, mode: str, cost_bps: float) -> Tuple[List, List]:
+    def simulate(self, tree: Dict, db: Dict, mode: str, cost_bps: float,
+                 hashes: Optional[Dict[int, str]] = None) -> Tuple[List, List]:
         """Simulate strategy execution with proper portfolio tracking"""
         dates = db['dates']
         close_prices = db['close']
 
         equity = 10000.0
         holdings = {}  # Current holdings: {ticker: shares}
+        cash = 0.0  # Weight of tickers without a price yet, held alongside the holdings
         prev_allocation = {}
 
         equity_curve = []
@@ -449,6 +697,9 @@ class Backtester:
         # This prevents recalculating RSI/SMA/etc thousands of times (10-100x speedup)
         shared_indicator_cache = {}
 
+        # OPTIMIZATION 3: Reuse allocation series of subtrees shared with earlier branches
+        memo_keys = self.subtree_memo.begin_run(tree, db, hashes) if self.subtree_memo else None
+
         # OPTIMIZATION 2: Early termination for failing branches (1.5-2x speedup)
         # Track peak equity and check for catastrophic failures every N bars
         peak_equity = equity
@@ -457,11 +708,12 @@ class Backtester:
 
         for i in range(len(dates)):
             # Evaluate tree to get target allocation
-            allocation = self.evaluate_tree(tree, db, i, shared_indicator_cache)
+            target = self.evaluate_tree(tree, db, i, shared_indicator_cache, memo_keys)
+            allocation = _gate_allocation(target, db['quality'], i)
             allocations.append(allocation)
 
             # Calculate current portfolio value from holdings
-            portfolio_value = 0.0
+            portfolio_value = cash
             for ticker, shares in holdings.items():
                 if ticker in close_prices and i < len(close_prices[ticker]):
                     current_price = close_prices[ticker][i]
@@ -488,9 +740,11 @@ class Backtester:
 
                 holdings = new_holdings
                 prev_allocation = allocation.copy()
+                idle_weight = sum(target.values()) - sum(allocation.values()) if allocation is not target else 0.0
+                cash = current_equity * idle_weight if holdings else 0.0
 
             # Calculate final equity for this bar based on current holdings
-            final_equity = 0.0
+            final_equity = cash
             for ticker, shares in holdings.items():
                 if ticker in close_prices and i < len(close_prices[ticker]):
                     current_price = close_prices[ticker][i]
@@ -530,22 +784,36 @@ class Backtester:
 
         return equity_curve, allocations
 
-    def evaluate_tree(self, node: Dict, db: Dict, idx: int, shared_indicator_cache: Dict = None) -> Dict:
+    def evaluate_tree(self, node: Dict, db: Dict, idx: int, shared_indicator_cache: Dict = None,
+                      memo_keys: Optional[Dict[int, Tuple]] = None) -> Dict:
         """Evaluate tree at given date index"""
         # Create evaluation context
         ctx = {
             'db': db,
             'idx': idx,
             'indicator_cache': shared_indicator_cache if shared_indicator_cache is not None else {},  # Reuse cache across bars
-            'altExit_state': {}  # Stateful tracking for altExit nodes
+            'altExit_state': {},  # Stateful tracking for altExit nodes
+            'memo_keys': memo_keys or {}  # Subtrees whose allocation series are memoized
         }
         return self.evaluate_node(ctx, node)
 
     def evaluate_node(self, ctx: Dict, node: Dict) -> Dict:
-        """Recursively evaluate a single node"""
+        """Recursively evaluate a single node (memoized for subtrees shared across branches)"""
         if not node:
             return {}
 
+        memo_key = ctx['memo_keys'].get(id(node)) if ctx.get('memo_keys') else None
+        if memo_key is None:
+            return self._dispatch_node(ctx, node)
+
+        allocation = self.subtree_memo.lookup(memo_key, ctx['idx'])
+        if allocation is MISS:
+            allocation = self._dispatch_node(ctx, node)
+            self.subtree_memo.record(memo_key, ctx['idx'], allocation)
+        return allocation
+
+    def _dispatch_node(self, ctx: Dict, node: Dict) -> Dict:
+        """Evaluate a node by kind"""
         kind = node.get('kind', '')
 
         if kind == 'position':
@@ -864,16 +1132,37 @@ class Backtester:
         return self._eval_conditions(ctx, conditions, 'and')
 
     def _eval_condition(self, ctx: Dict, cond: Dict) -> Optional[bool]:
-        """Evaluate a single condition"""
+        """Evaluate a single condition (one bit of its pre-evaluated signal)"""
+        local_key = ('signal', id(cond))
+        if local_key in ctx['indicator_cache']:
+            signal = ctx['indicator_cache'][local_key]
+        else:
+            signal = self._condition_signal(ctx, cond)
+            ctx['indicator_cache'][local_key] = signal
+
+        if signal is None:
+            return None
+        return signal.at(ctx['idx'])
+
+    def _condition_signal(self, ctx: Dict, cond: Dict):
+        """
+        Evaluate a condition over every bar of the db
+
+        Args:
+            ctx: Evaluation context
+            cond: Condition dict
+
+        Returns:
+            Packed Signal, or None if a ticker has no data
+        """
         metric = cond.get('metric', 'Relative Strength Index')
         ticker = cond.get('ticker', 'SPY').upper().strip()
         window = int(cond.get('window', 14))
         threshold = float(cond.get('threshold', 0))
-        comparator = cond.get('comparator', 'lt')
+        comparator = normalize_comparator(cond.get('comparator', 'lt'))
 
-        # Get metric value
-        left_val = self._metric_at(ctx, ticker, metric, window)
-        if left_val is None:
+        db = ctx['db']
+        if ticker not in db['close']:
             return None
 
         # Handle expanded conditions (comparing two indicators)
@@ -881,58 +1170,78 @@ class Backtester:
             right_ticker = cond.get('rightTicker', 'SPY').upper().strip()
             right_metric = cond.get('rightMetric', metric)
             right_window = int(cond.get('rightWindow', window))
-
-            right_val = self._metric_at(ctx, right_ticker, right_metric, right_window)
-            if right_val is None:
+            if right_ticker not in db['close']:
                 return None
-
-            # Compare two indicators
-            if comparator == 'gt':
-                return left_val > right_val
-            elif comparator == 'lt':
-                return left_val < right_val
-            elif comparator == 'crossAbove':
-                # Check if left crossed above right (simplified - just check current values)
-                return left_val > right_val
-            elif comparator == 'crossBelow':
-                return left_val < right_val
-            else:
-                return left_val < right_val
+            rhs = (right_ticker, right_metric, right_window)
+            tickers = (ticker, right_ticker)
         else:
-            # Compare to threshold
-            if comparator == 'gt':
-                return left_val > threshold
-            elif comparator == 'lt':
-                return left_val < threshold
-            elif comparator == 'crossAbove':
-                return left_val > threshold
-            elif comparator == 'crossBelow':
-                return left_val < threshold
-            else:
-                return left_val < threshold
+            rhs = threshold
+            tickers = (ticker,)
+
+        key = None
+        if self.signal_cache is not None:
+            versions = db.get('versions', {})
+            fingerprints = tuple(
+                series_fingerprint(db['close'][t], db['dates'], versions.get(t)) for t in tickers
+            )
+            key = (ticker, metric, window, comparator, rhs, fingerprints, db.get('indicatorPrice', 'close'))
+            signal = self.signal_cache.get(key)
+            if signal is not None:
+                if self.precision_guard is not None and key in self.precision_guard.flagged:
+                    self.precision_flags.add(key)
+                return signal
+
+        left = self._metric_series(ctx, ticker, metric, window)
+        right = self._metric_series(ctx, *rhs) if isinstance(rhs, tuple) else rhs
+        signal = compare_series(left, comparator, right)
+
+        if self.precision_guard is not None:
+            guard_key = key if key is not None else (ticker, metric, window, comparator, rhs)
+            signal = self.precision_guard.verify(
+                guard_key, signal, left, comparator, right,
+                lambda: self._reference_operands(ctx, ticker, metric, window, rhs)
+            )
+            if guard_key in self.precision_guard.flagged:
+                self.precision_flags.add(guard_key)
+
+        if key is not None:
+            self.signal_cache.put(key, signal)
+        return signal
 
     def _metric_at(self, ctx: Dict, ticker: str, metric: str, window: int) -> Optional[float]:
-        """Get metric value for ticker at current index (with optimized caching)"""
+        """Get metric value for ticker at current index (None before it is defined, e.g. pre-listing)"""
+        values = self._metric_series(ctx, ticker, metric, window)
+        if values is None:
+            return None
+
         idx = ctx['idx']
+        if idx >= len(values) or not np.isfinite(values[idx]):
+            return None  # Ranking drops it, as backtest.mjs does with null values
+        return float(values[idx])
+
+    def _metric_series(self, ctx: Dict, ticker: str, metric: str, window: int) -> Optional[np.ndarray]:
+        """Get the full metric series for ticker (with optimized caching)"""
         db = ctx['db']
 
         # Check if we have price data for this ticker
         if ticker not in db['close']:
             return None
 
-        prices = db['close'][ticker]
+        series_name, prices = self.indicator_series(db, ticker)
 
         # Check local per-bar cache first (fastest)
         cache_key = f"{ticker}:{metric}:{window}"
-        if cache_key in ctx['indicator_cache']:
-            values = ctx['indicator_cache'][cache_key]
-            return values[idx] if idx < len(values) else None
+        values = ctx['indicator_cache'].get(cache_key)
+        if values is not None:
+            return values
 
         # Try global indicator cache (vectorized pre-computed values)
-        values = None
         if self.indicator_cache and CACHE_AVAILABLE:
             try:
-                values = self.indicator_cache.get_indicator(ticker, metric, window, prices)
+                values = self.indicator_cache.get_indicator(
+                    series_name, metric, window, prices,
+                    dates=db['dates'], data_version=db.get('versions', {}).get(ticker)
+                )
             except Exception:
                 pass  # Fall back to local calculation
 
@@ -949,10 +1258,66 @@ class Backtester:
                 values = prices
 
         # Cache it in local per-bar cache
-        if values is not None:
-            ctx['indicator_cache'][cache_key] = values
-            return values[idx] if idx < len(values) else None
+        ctx['indicator_cache'][cache_key] = values
+        return values
+
+    def indicator_series(self, db: Dict, ticker: str) -> Tuple[str, np.ndarray]:
+        """
+        Price series a ticker's indicators are computed on
+
+        With indicatorPrice 'adjClose' the close is multiplied by the ticker's
+        adjustment factors (once per db) and named '<ticker>@adjClose', so its
+        indicator cache, store and arena entries never mix with raw-close ones.
+
+        Returns:
+            (series name for cache keys, prices)
+        """
+        if db.get('indicatorPrice', 'close') == 'close':
+            return ticker, db['close'][ticker]
+
+        adjusted = db.setdefault('adjusted', {})
+        prices = adjusted.get(ticker)
+        if prices is None:
+            prices = db['close'][ticker] * db['adjFactor'][ticker]
+            adjusted[ticker] = prices
+        return f"{ticker}@adjClose", prices
+
+    def _reference_operands(self, ctx: Dict, ticker: str, metric: str, window: int, rhs) -> Tuple:
+        """
+        Condition operands recomputed in float64 (compact mode accuracy guard)
+
+        Prices come from the float64 price cache when the db was aligned from
+        a compact shared arena, so the reference is free of float32 rounding.
+
+        Returns:
+            (left, right) series; left is None if the prices are unavailable
+        """
+        left = self._reference_series(ctx, ticker, metric, window)
+        right = self._reference_series(ctx, *rhs) if isinstance(rhs, tuple) else rhs
+        if right is None:
+            return None, None
+        return left, right
+
+    def _reference_series(self, ctx: Dict, ticker: str, metric: str, window: int) -> Optional[np.ndarray]:
+        """Metric series computed in float64 without touching any cache"""
+        db = ctx['db']
+        prices = np.asarray(self.indicator_series(db, ticker)[1], dtype=np.float64)
+
+        reader = self.shared_memory_reader
+        if reader is not None and reader.compact and self.use_global_price_cache:
+            try:
+                data = get_global_cache(str(self.parquet_dir)).get_ticker_arrays(ticker, MAX_TICKER_ROWS)
+            except Exception:
+                return None
+            if not data or len(data['time']) == 0:
+                return None
+            aligned = self._align_ticker(data, db['dates'])
+            prices = aligned['close']
+            if db.get('indicatorPrice', 'close') == 'adjClose':
+                prices = prices * aligned['adjFactor']
 
+        if self.indicator_cache is not None:
+            return self.indicator_cache.compute(metric, window, prices)
         return None
 
     def calculate_metrics(self, equity_curve: List, db: Dict, mode: str, indices: Optional[List[int]] = None, allocations: Optional[List] = None) -> Dict:
@@ -1171,6 +1536,11 @@ def main():
             print(json.dumps({'error': 'Missing required parameters'}))
             sys.exit(1)
 
+        # One backtest spends less time in the kernels than numba takes to load
+        # them; run them as plain Python (PY_FAST_START=0 keeps them compiled)
+        from jit_kernels import fast_start
+        fast_start()
+
         # Run backtest
         backtester = Backtester(parquet_dir)
         result = backtester.run_backtest(tree, options)
@@ -3,13 +3,109 @@ Batch-level optimization for parallel backtesting
 Pre-loads tickers and pre-computes indicators across all branches for massive speedup
 """
 
+import os
 import sys
 import json
 from typing import Dict, List, Set, Tuple, Optional
 from pathlib import Path
-from indicator_cache import SharedIndicatorCache
-from optimized_dataloader import get_global_cache
-from shared_memory_manager import SharedPriceData
+from backtester import MAX_TICKER_ROWS, Backtester
+from indicator_cache import IndicatorCache, indicator_key_id
+from indicator_store import IndicatorStore
+from optimized_dataloader import DEFAULT_BLOCK_TICKERS, PRICE_FIELDS, get_global_cache
+from shared_memory_manager import SharedPriceData, SharedArena, sweep_stale_segments
+from synthetic_tickers import expand_tickers, parse_ratio_ticker
+
+# Upper bound on the shared indicator arena (override with SHARED_INDICATOR_MB)
+SHARED_INDICATOR_MAX_BYTES = int(os.environ.get('SHARED_INDICATOR_MB', '512')) * 1024 * 1024
+
+# Pre-load and share the whole universe while its price columns are estimated to fit
+# in this many bytes; larger universes run out-of-core (override with IN_CORE_UNIVERSE_MB)
+IN_CORE_MAX_BYTES = int(os.environ.get('IN_CORE_UNIVERSE_MB', '4096')) * 1024 * 1024
+
+# Bytes one bar of a ticker holds in memory: float64 price fields, adjustment factor
+# and time, plus a uint8 quality flag
+BYTES_PER_BAR = (len(PRICE_FIELDS) + 2) * 8 + 1
+
+
+def alignment_blocks(groups: Dict[Tuple, Set[Tuple[str, str, int]]],
+                     block_tickers: int = DEFAULT_BLOCK_TICKERS):
+    """
+    Split alignment groups into blocks reading at most block_tickers tickers
+
+    Yields:
+        Tuple (group items, tickers the block reads); a group reading more
+        tickers than that gets a block of its own
+    """
+    block, tickers = [], set()
+    for signature, requests in sorted(groups.items()):
+        needed = set(expand_tickers(signature[0]))
+        if block and len(tickers | needed) > block_tickers:
+            yield block, tickers
+            block, tickers = [], set()
+        block.append((signature, requests))
+        tickers |= needed
+    if block:
+        yield block, tickers
+
+
+def aligned_indicators(backtester: Backtester, indicator_cache: IndicatorCache, groups):
+    """
+    Compute (or find) each requested indicator on its group's aligned series
+
+    The series and cache key are exactly those Backtester._metric_at uses for
+    a branch of the group, so the entries are hits at run time.
+
+    Args:
+        backtester: Builds the aligned price databases
+        indicator_cache: Cache (and store) the arrays go through
+        groups: Items of BatchOptimizer._group_branches_by_alignment()
+
+    Yields:
+        Tuple (cache key, values), once per key
+    """
+    seen = set()
+    for (tickers, indicator_tickers, indicator_price), requests in groups:
+        db = backtester.build_price_database(list(tickers), list(indicator_tickers))
+        if db is None:
+            continue
+        db['indicatorPrice'] = indicator_price
+
+        for ticker, metric, window in sorted(requests):
+            if ticker not in db['close']:
+                continue
+
+            series_name, prices = backtester.indicator_series(db, ticker)
+            data_version = db['versions'].get(ticker)
+            key = indicator_cache.make_key(series_name, metric, window, prices, db['dates'], data_version)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            values = indicator_cache.get_indicator(series_name, metric, window, prices, db['dates'], data_version)
+            if values is not None:
+                yield key, values
+
+
+def groups_to_json(groups: Dict[Tuple, Set[Tuple[str, str, int]]]) -> List[Dict]:
+    """Alignment groups as JSON (the pool hands them to workers as preloadGroups)"""
+    return [
+        {
+            'tickers': list(tickers),
+            'indicatorTickers': list(indicator_tickers),
+            'indicatorPrice': indicator_price,
+            'indicators': [list(request) for request in sorted(requests)]
+        }
+        for (tickers, indicator_tickers, indicator_price), requests in sorted(groups.items())
+    ]
+
+
+def groups_from_json(data: List[Dict]) -> Dict[Tuple, Set[Tuple[str, str, int]]]:
+    """Inverse of groups_to_json"""
+    groups = {}
+    for group in data or []:
+        signature = (tuple(group['tickers']), tuple(group['indicatorTickers']), group.get('indicatorPrice', 'close'))
+        groups.setdefault(signature, set()).update((t, m, int(w)) for t, m, w in group['indicators'])
+    return groups
 
 
 class BatchOptimizer:
@@ -18,17 +114,39 @@ class BatchOptimizer:
 
     Optimizations:
     1. Extract all unique tickers from all branches → pre-load ONCE
-    2. Extract all unique indicators → pre-compute ONCE
+    2. Extract all unique indicators → pre-compute ONCE on the aligned series
+       each branch will actually see, packed into one shared-memory arena
     3. Share cached data across all worker processes
+
+    A universe larger than the price cache holds (out-of-core mode) is never
+    loaded as a whole: tickers are read in blocks as they are needed,
+    pre-computed indicators spill to the memory-mapped indicator store, and
+    no price arena is built (it would hold the whole universe in RAM), so
+    workers read prices on demand from the panel store or parquet.
     """
 
-    def __init__(self, parquet_dir: str):
+    def __init__(self, parquet_dir: str, owner_pid: Optional[int] = None):
+        """
+        Initialize batch optimizer
+
+        Args:
+            parquet_dir: Path to parquet data directory
+            owner_pid: Long-lived process that owns the shared memory arenas
+                       (the Node server); defaults to this process
+        """
         self.parquet_dir = Path(parquet_dir)
+        self.owner_pid = owner_pid
         self.unique_tickers: Set[str] = set()
         self.unique_indicators: Dict[str, Set[int]] = {}  # {indicator_name: set(periods)}
+        self.branch_trees: List[Dict] = []
+        self.branch_prices: List[str] = []  # indicatorPrice option of each branch
         self.price_cache = None
         self.indicator_cache = None
         self.shared_memory_manager = None
+        self.shared_indicator_metadata = None
+        self.indicator_arena = None
+        self.indicator_groups: Dict[Tuple, Set[Tuple[str, str, int]]] = {}
+        self.out_of_core = False
 
     def analyze_branches(self, branches: List[Dict]) -> Dict:
         """
@@ -45,6 +163,9 @@ class BatchOptimizer:
         for branch in branches:
             tree = branch.get('tree')
             if tree:
+                self.branch_trees.append(tree)
+                self.branch_prices.append((branch.get('options') or {}).get('indicatorPrice', 'close'))
+
                 # Extract tickers
                 tickers = self._extract_tickers_from_tree(tree)
                 self.unique_tickers.update(tickers)
@@ -59,6 +180,14 @@ class BatchOptimizer:
         # Always include SPY as default
         self.unique_tickers.add('SPY')
 
+        # Universe too large to hold in memory: stream it in blocks instead of loading it
+        universe_bytes = self._estimate_universe_bytes()
+        self.out_of_core = universe_bytes > IN_CORE_MAX_BYTES
+        if self.out_of_core:
+            print(f"[BatchOptimizer] Universe needs ~{universe_bytes / 1024 / 1024:.0f} MB of prices "
+                  f"(in-core limit {IN_CORE_MAX_BYTES / 1024 / 1024:.0f} MB): running out-of-core, "
+                  f"no shared arenas", file=sys.stderr, flush=True)
+
         total_indicators = sum(len(periods) for periods in self.unique_indicators.values())
 
         analysis = {
@@ -66,7 +195,8 @@ class BatchOptimizer:
             'tickers': sorted(list(self.unique_tickers)),
             'indicator_count': total_indicators,
             'indicators': {k: sorted(list(v)) for k, v in self.unique_indicators.items()},
-            'branch_count': len(branches)
+            'branch_count': len(branches),
+            'out_of_core': self.out_of_core
         }
 
         print(f"[BatchOptimizer] Found {len(self.unique_tickers)} unique tickers", file=sys.stderr, flush=True)
@@ -91,12 +221,14 @@ class BatchOptimizer:
             # Get global cache instance
             cache = get_global_cache(str(self.parquet_dir))
 
-            # Pre-load all tickers
-            for ticker in self.unique_tickers:
-                try:
-                    cache.get_ticker_data(ticker, limit=20000)
-                except Exception as e:
-                    print(f"[BatchOptimizer] Warning: Failed to load {ticker}: {e}", file=sys.stderr, flush=True)
+            if self.out_of_core:
+                print(f"[BatchOptimizer] Out-of-core: streaming tickers in blocks of {DEFAULT_BLOCK_TICKERS}",
+                      file=sys.stderr, flush=True)
+                self.price_cache = cache
+                return True
+
+            # Pre-load all tickers (one parallel scan per block of cold tickers)
+            cache.preload(self.unique_tickers)
 
             cache_stats = cache.get_cache_info()
             print(f"[BatchOptimizer] ✓ Pre-loaded tickers. Cache: {cache_stats}", file=sys.stderr, flush=True)
@@ -110,36 +242,55 @@ class BatchOptimizer:
 
     def precompute_indicators(self) -> bool:
         """
-        Pre-compute all unique indicators for all tickers
+        Pre-compute every indicator the branches evaluate and pack them into a shared arena
+
+        Branches are grouped by the tickers that determine their date alignment,
+        so each indicator is computed on exactly the aligned series (and under
+        exactly the cache key) that Backtester._metric_at will look up. In
+        out-of-core mode they are written to the indicator store instead (see
+        _spill_indicators).
 
         Returns:
             True if successful
         """
-        if not self.unique_indicators or not self.price_cache:
+        if not self.branch_trees or not self.price_cache:
             print("[BatchOptimizer] No indicators to pre-compute or cache not initialized", file=sys.stderr, flush=True)
             return False
 
         try:
             print(f"[BatchOptimizer] Pre-computing indicators...", file=sys.stderr, flush=True)
 
-            # Create shared indicator cache
-            self.indicator_cache = SharedIndicatorCache()
+            store = IndicatorStore.from_env(str(self.parquet_dir))
+            backtester = Backtester(str(self.parquet_dir))
+            groups = self._group_branches_by_alignment(backtester)
+            self.indicator_groups = groups
+            if self.out_of_core:
+                return self._spill_indicators(backtester, groups, store)
 
-            # Build price data dict
-            price_data = {}
-            for ticker in self.unique_tickers:
-                try:
-                    df = self.price_cache.get_ticker_data(ticker, limit=20000)
-                    if len(df) > 0 and 'Close' in df.columns:
-                        price_data[ticker] = df['Close'].values
-                except Exception as e:
-                    print(f"[BatchOptimizer] Warning: Failed to get prices for {ticker}: {e}", file=sys.stderr, flush=True)
+            # Indicator cache backed by the on-disk store, so reruns only open files
+            self.indicator_cache = IndicatorCache(store=store)
 
-            # Pre-compute all indicators
-            self.indicator_cache.precompute_all(price_data, self.unique_indicators)
+            arena = SharedArena(kind='ind', owner_pid=self.owner_pid)
+            arena_bytes = 0
+            skipped = 0
+
+            for key, values in aligned_indicators(backtester, self.indicator_cache, groups.items()):
+                if arena_bytes + values.nbytes > SHARED_INDICATOR_MAX_BYTES:
+                    skipped += 1
+                    continue
+                arena.add(indicator_key_id(key), values)
+                arena_bytes += int(values.nbytes)
+
+            if skipped:
+                print(f"[BatchOptimizer] Warning: Arena budget reached, {skipped} indicators left to workers", file=sys.stderr, flush=True)
+
+            self.shared_indicator_metadata = arena.build()
+            self.indicator_arena = arena
 
             stats = self.indicator_cache.get_stats()
-            print(f"[BatchOptimizer] ✓ Pre-computed indicators. Stats: {stats}", file=sys.stderr, flush=True)
+            print(f"[BatchOptimizer] ✓ Pre-computed {len(groups)} alignment groups into shared arena "
+                  f"({len(self.shared_indicator_metadata['entries']) if self.shared_indicator_metadata else 0} arrays, "
+                  f"{arena_bytes / 1024 / 1024:.1f} MB). Stats: {stats}", file=sys.stderr, flush=True)
 
             return True
 
@@ -147,6 +298,60 @@ class BatchOptimizer:
             print(f"[BatchOptimizer] Error pre-computing indicators: {e}", file=sys.stderr, flush=True)
             return False
 
+    def _spill_indicators(self, backtester: Backtester, groups: Dict[Tuple, Set[Tuple[str, str, int]]],
+                          store: Optional[IndicatorStore]) -> bool:
+        """
+        Out-of-core mode: compute indicators block by block into the indicator store
+
+        Alignment groups are taken in blocks that read at most
+        DEFAULT_BLOCK_TICKERS tickers. A block's price columns are dropped
+        before the next block is read, and computed arrays go straight to the
+        memory-mapped store (nothing is kept in RAM or packed into an arena),
+        where workers find them under the same keys.
+
+        Returns:
+            True if successful (False without a store to spill to)
+        """
+        if store is None:
+            print("[BatchOptimizer] Indicator store disabled: out-of-core indicators are left to workers",
+                  file=sys.stderr, flush=True)
+            return False
+
+        self.indicator_cache = IndicatorCache(max_bytes=0, store=store)
+        backtester.panel_cache = None  # Do not keep aligned columns of earlier blocks either
+
+        written = 0
+        blocks = 0
+        for block, tickers in alignment_blocks(groups):
+            written += sum(1 for _ in aligned_indicators(backtester, self.indicator_cache, block))
+            # SPY aligns every group, keep it loaded
+            self.price_cache.invalidate_tickers(tickers - {'SPY'})
+            blocks += 1
+
+        print(f"[BatchOptimizer] ✓ Pre-computed {len(groups)} alignment groups in {blocks} blocks into the "
+              f"indicator store ({written} arrays). Stats: {store.get_stats()}", file=sys.stderr, flush=True)
+        return True
+
+    def _group_branches_by_alignment(self, backtester: Backtester) -> Dict[Tuple, Set[Tuple[str, str, int]]]:
+        """
+        Group indicator requests by the ticker sets that fix a branch's aligned dates
+        (and the price field its indicators are computed on)
+
+        Returns:
+            {(tickers, indicator_tickers, indicator_price): {(ticker, metric, window), ...}}
+        """
+        groups: Dict[Tuple, Set[Tuple[str, str, int]]] = {}
+        for tree, indicator_price in zip(self.branch_trees, self.branch_prices):
+            # Same ticker lists (including the implicit SPY and ratio tickers) as Backtester.run_backtest
+            indicator_tickers = set(backtester.collect_indicator_tickers(tree)) | {'SPY'}
+            tickers = set(backtester.collect_tickers(tree)) | {'SPY'} | {t for t in indicator_tickers if parse_ratio_ticker(t)}
+            signature = (tuple(sorted(tickers)), tuple(sorted(indicator_tickers)), indicator_price)
+
+            requests = groups.setdefault(signature, set())
+            requests.update(self._extract_metric_requests(tree, backtester))
+
+        return groups
+
     def create_shared_memory(self) -> bool:
         """
         Create shared memory blocks for all tickers (zero-copy across workers)
@@ -158,22 +363,34 @@ class BatchOptimizer:
             print("[BatchOptimizer] Cannot create shared memory: no tickers loaded", file=sys.stderr, flush=True)
             return False
 
+        if self.out_of_core:
+            print("[BatchOptimizer] Out-of-core universe: no price arena, workers load prices on demand",
+                  file=sys.stderr, flush=True)
+            return False
+
         try:
             print(f"[BatchOptimizer] Creating shared memory for {len(self.unique_tickers)} tickers...", file=sys.stderr, flush=True)
 
             # Create shared memory manager
-            self.shared_memory_manager = SharedPriceData()
+            self.shared_memory_manager = SharedPriceData(owner_pid=self.owner_pid)
 
-            # Load each ticker into shared memory
+            # Queue each ticker's columns, then copy them all into one arena
             for ticker in self.unique_tickers:
                 try:
                     df = self.price_cache.get_ticker_data(ticker, limit=20000)
                     if len(df) > 0:
-                        self.shared_memory_manager.load_ticker_to_shared_memory(ticker, df)
+                        self.shared_memory_manager.load_ticker_to_shared_memory(
+                            ticker, df, self.price_cache.get_data_version(ticker)
+                        )
                 except Exception as e:
                     print(f"[BatchOptimizer] Warning: Failed to share {ticker}: {e}", file=sys.stderr, flush=True)
 
-            print(f"[BatchOptimizer] ✓ Created shared memory blocks", file=sys.stderr, flush=True)
+            metadata = self.shared_memory_manager.build()
+            if metadata is None:
+                return False
+
+            print(f"[BatchOptimizer] ✓ Created shared memory arena {metadata['shm_name']} "
+                  f"({len(metadata['tickers'])} tickers, {metadata['size'] / 1024 / 1024:.1f} MB)", file=sys.stderr, flush=True)
             return True
 
         except Exception as e:
@@ -190,6 +407,9 @@ class BatchOptimizer:
         Returns:
             Optimization summary
         """
+        # Remove arenas left behind by owners that crashed
+        sweep_stale_segments()
+
         # Analyze branches
         analysis = self.analyze_branches(branches)
 
@@ -211,9 +431,66 @@ class BatchOptimizer:
             'indicators_computed': indicators_computed,
             'shared_memory_created': shared_memory_created,
             'shared_memory_metadata': shared_memory_metadata,
+            'shared_indicator_metadata': self.shared_indicator_metadata,
+            'indicator_groups': groups_to_json(self.indicator_groups),
+            'ticker_bars': self._ticker_bars(),
             'speedup_estimate': self._estimate_speedup(analysis)
         }
 
+    def release_shared_memory(self):
+        """
+        Hand the shared memory arenas off to the workers
+
+        Until this is called the arenas are removed automatically if this process
+        exits, so call it only once the pool confirmed it adopted the metadata.
+        Afterwards the first worker unlinks them on shutdown (or
+        sweep_stale_segments() does once the owner process is gone).
+        """
+        if self.shared_memory_manager:
+            self.shared_memory_manager.release()
+        if self.indicator_arena:
+            self.indicator_arena.release()
+
+    def cleanup_shared_memory(self):
+        """Unlink the arenas now (the pool did not adopt them)"""
+        if self.shared_memory_manager:
+            self.shared_memory_manager.cleanup()
+        if self.indicator_arena:
+            self.indicator_arena.cleanup()
+
+    def _estimate_universe_bytes(self) -> int:
+        """
+        Estimate the memory the universe's price columns take once loaded
+
+        Bar counts come from the parquet footers (no data is read); ratio
+        tickers count through their components.
+
+        Returns:
+            Estimated bytes (tickers without a readable file count as 0)
+        """
+        import pyarrow.parquet as pq
+
+        total = 0
+        for ticker in expand_tickers(self.unique_tickers):
+            try:
+                rows = pq.ParquetFile(self.parquet_dir / f"{ticker}.parquet").metadata.num_rows
+            except (OSError, ValueError):
+                continue
+            total += min(rows, MAX_TICKER_ROWS) * BYTES_PER_BAR
+        return total
+
+    def _ticker_bars(self) -> Dict[str, int]:
+        """Bars of every pre-loaded ticker (the pool estimates each branch's date span from them)"""
+        if self.out_of_core or not self.price_cache:
+            return {}
+        bars = {}
+        for ticker in sorted(self.unique_tickers):
+            try:
+                bars[ticker] = len(self.price_cache.get_ticker_arrays(ticker)['time'])
+            except Exception:
+                continue
+        return bars
+
     def _estimate_speedup(self, analysis: Dict) -> str:
         """Estimate speedup from optimizations"""
         ticker_count = analysis['ticker_count']
@@ -314,10 +591,76 @@ class BatchOptimizer:
         return indicators
 
 
+    def _extract_metric_requests(self, node: Dict, backtester: Backtester) -> Set[Tuple[str, str, int]]:
+        """
+        Recursively extract every (ticker, metric, window) the backtester will evaluate
+
+        Mirrors the defaults used by Backtester's node evaluators so the
+        pre-computed arrays match the lookups made at run time.
+        """
+        requests = set()
+
+        def add_conditions(conditions):
+            for cond in conditions or []:
+                try:
+                    metric = cond.get('metric', 'Relative Strength Index')
+                    window = int(cond.get('window', 14))
+                    requests.add((cond.get('ticker', 'SPY').upper().strip(), metric, window))
+                    if cond.get('expanded'):
+                        requests.add((
+                            cond.get('rightTicker', 'SPY').upper().strip(),
+                            cond.get('rightMetric', metric),
+                            int(cond.get('rightWindow', window))
+                        ))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+
+        kind = node.get('kind')
+        try:
+            if kind == 'indicator':
+                add_conditions(node.get('conditions'))
+            elif kind == 'altExit':
+                add_conditions(node.get('entryConditions'))
+                add_conditions(node.get('exitConditions'))
+            elif kind == 'numbered':
+                for item in node.get('numbered', {}).get('items', []):
+                    add_conditions(item.get('conditions'))
+            elif kind == 'scaling':
+                requests.add((
+                    node.get('scaleTicker', 'SPY').upper().strip(),
+                    node.get('scaleMetric', 'Relative Strength Index'),
+                    int(node.get('scaleWindow', 14))
+                ))
+            elif kind == 'function':
+                metric = node.get('metric', 'Relative Strength Index')
+                window = int(node.get('window', 10))
+                for child in node.get('children', {}).get('next', []):
+                    if child:
+                        for ticker in backtester._collect_position_tickers(child):
+                            requests.add((ticker, metric, window))
+        except (ValueError, TypeError, AttributeError):
+            pass
+
+        # Recurse into children
+        if node.get('children'):
+            for children in node['children'].values():
+                if isinstance(children, list):
+                    for child in children:
+                        if child:
+                            requests.update(self._extract_metric_requests(child, backtester))
+                elif children:
+                    requests.update(self._extract_metric_requests(children, backtester))
+
+        return requests
+
+
 def optimize_batch(branches: List[Dict], parquet_dir: str) -> Dict:
     """
     Convenience function to run batch optimization
 
+    Shared memory arenas stay owned by the calling process and are removed
+    when it exits; use BatchOptimizer.release_shared_memory() to hand them off.
+
     Args:
         branches: List of branch objects
         parquet_dir: Path to parquet data directory
@@ -333,17 +676,31 @@ if __name__ == '__main__':
     # Test batch optimizer
     print("Testing batch optimizer...", file=sys.stderr, flush=True)
 
-    # Example: Read branches from stdin
+    # Protocol (JSON lines on stdin/stdout):
+    #   -> {"branches": [...], "parquetDir": ..., "ownerPid": ...}
+    #   <- optimize_batch() result
+    #   -> {"adopted": true} once the pool took over the arenas (EOF counts as false)
+    optimizer = None
     try:
-        input_data = json.loads(sys.stdin.read())
+        input_data = json.loads(sys.stdin.readline())
         branches = input_data.get('branches', [])
         parquet_dir = input_data.get('parquetDir', '../data/parquet')
 
-        result = optimize_batch(branches, parquet_dir)
+        optimizer = BatchOptimizer(parquet_dir, owner_pid=input_data.get('ownerPid'))
+        result = optimizer.optimize_batch(branches)
         # Output ONLY the JSON result to stdout (no extra messages!)
         print(json.dumps(result), flush=True)
 
+        # The arenas outlive this process only if the pool adopted their metadata
+        reply = sys.stdin.readline()
+        if reply.strip() and json.loads(reply).get('adopted'):
+            optimizer.release_shared_memory()
+        else:
+            optimizer.cleanup_shared_memory()
+
     except Exception as e:
+        if optimizer is not None:
+            optimizer.cleanup_shared_memory()
         # Send error to stderr and valid JSON error to stdout
         print(f"[BatchOptimizer] ERROR: {e}", file=sys.stderr, flush=True)
         print(json.dumps({'error': str(e)}), flush=True)
@@ -0,0 +1,177 @@
+"""
+Opt-in compact storage for price and indicator arrays (COMPACT_FLOAT32=1)
+Cached indicator arrays and the shared-memory price arena hold float32 values,
+and the arena stores dates as int32 day indices, so a worker fits twice the
+universe in the same memory. Everything computed from them (aligned price
+columns, equity curves, metrics) stays float64.
+
+Condition signals are the one place where float32 rounding can change a
+result: a value that sits right at a threshold may land on the other side of
+it. PrecisionGuard re-evaluates such conditions in float64 and flags them.
+"""
+
+import os
+import sys
+import numpy as np
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from signal_cache import Signal, compare_series
+
+# Store cached indicators and the shared price arena as float32 (off by default)
+COMPACT_ENABLED = os.environ.get('COMPACT_FLOAT32', '0') == '1'
+
+COMPACT_DTYPE = np.dtype(np.float32)
+DAY_DTYPE = np.dtype(np.int32)
+SECONDS_PER_DAY = 86400
+
+# Bars whose operands differ by less than this fraction of their magnitude (at
+# least 1.0, so values near zero use an absolute margin) are re-checked in
+# float64. Covers float32 rounding of prices and of the indicators computed
+# from them (override with COMPACT_TOLERANCE).
+DEFAULT_TOLERANCE = float(os.environ.get('COMPACT_TOLERANCE', '1e-4'))
+
+
+def to_compact(values: np.ndarray) -> np.ndarray:
+    """float32 copy of a floating-point array (other dtypes are returned as is)"""
+    values = np.asarray(values)
+    if values.dtype.kind == 'f' and values.dtype != COMPACT_DTYPE:
+        return values.astype(COMPACT_DTYPE)
+    return values
+
+
+def to_day_index(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Convert Unix seconds at midnight UTC to int32 days since the epoch
+
+    Raises:
+        ValueError: If a timestamp is not a whole day
+    """
+    days, rest = np.divmod(np.asarray(timestamps, dtype=np.int64), SECONDS_PER_DAY)
+    if rest.any():
+        raise ValueError("Timestamps are not whole days")
+    return days.astype(DAY_DTYPE)
+
+
+def from_day_index(days: np.ndarray) -> np.ndarray:
+    """Convert int32 day indices back to int64 Unix seconds"""
+    return days.astype(np.int64) * SECONDS_PER_DAY
+
+
+def near_threshold(left: np.ndarray, right, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    """
+    Bars where rounding could flip a comparison between left and right
+
+    Args:
+        left: Left-hand series
+        right: Threshold (float) or right-hand series of the same length
+        tolerance: Relative margin (see DEFAULT_TOLERANCE)
+
+    Returns:
+        Boolean array (NaN bars are never ambiguous: they compare False either way)
+    """
+    left = np.asarray(left, dtype=np.float64)
+    right = np.asarray(right, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        scale = np.maximum(np.maximum(np.abs(left), np.abs(right)), 1.0)
+        return np.abs(left - right) <= tolerance * scale
+
+
+class PrecisionGuard:
+    """
+    Verifies condition signals evaluated on float32 series
+
+    Most signals have no bar near the threshold and pass with one vectorized
+    check. Otherwise the float64 series are computed and compared; if any bar
+    differs the float64 signal is used instead and the condition is flagged.
+    """
+
+    def __init__(self, tolerance: float = DEFAULT_TOLERANCE):
+        """
+        Initialize guard
+
+        Args:
+            tolerance: Relative margin that triggers a float64 re-check
+        """
+        self.tolerance = tolerance
+        self.flagged: Set[Tuple] = set()
+        self.checked = 0
+        self.rechecked = 0
+        self.mismatches = 0
+
+    def verify(self, key: Tuple, signal: Signal, left: np.ndarray, comparator: str, right,
+               reference: Callable[[], Tuple[Optional[np.ndarray], object]]) -> Signal:
+        """
+        Check a signal against its float64 result
+
+        Args:
+            key: Condition key (recorded in flagged on a mismatch)
+            signal: Signal evaluated on the compact series
+            left: Left-hand series the signal was evaluated on
+            comparator: Normalized comparator
+            right: Threshold or right-hand series
+            reference: Returns the float64 (left, right) operands; left is None if unavailable
+
+        Returns:
+            The signal to use (the float64 one if they differ)
+        """
+        self.checked += 1
+        length = signal.length
+        if isinstance(right, np.ndarray):
+            right = right[:length]
+        if not near_threshold(left[:length], right, self.tolerance).any():
+            return signal
+
+        self.rechecked += 1
+        ref_left, ref_right = reference()
+        if ref_left is None:
+            return signal
+
+        expected = compare_series(ref_left, comparator, ref_right)
+        if expected.length == signal.length and expected.bits == signal.bits:
+            return signal
+
+        self.mismatches += 1
+        self.flagged.add(key)
+        return expected
+
+    def get_stats(self) -> Dict:
+        """Get guard statistics"""
+        return {
+            'tolerance': self.tolerance,
+            'checked': self.checked,
+            'rechecked': self.rechecked,
+            'mismatches': self.mismatches
+        }
+
+
+if __name__ == '__main__':
+    # Test day indices, ambiguity detection and the float64 fallback
+    times = np.array([0, 86400, 86400 * 20000], dtype=np.int64)
+    assert np.array_equal(from_day_index(to_day_index(times)), times)
+    try:
+        to_day_index(times + 3600)
+        raise AssertionError("Intraday timestamps must be rejected")
+    except ValueError:
+        pass
+
+    values = np.array([29.0, 30.000001, 31.0, np.nan])
+    assert near_threshold(values, 30.0).tolist() == [False, True, False, False]
+    assert to_compact(values).dtype == COMPACT_DTYPE and to_compact(times).dtype == np.int64
+
+    guard = PrecisionGuard()
+    far = np.array([10.0, 50.0, 90.0])
+    signal = compare_series(to_compact(far), 'lt', 30.0)
+    assert guard.verify(('far',), signal, to_compact(far), 'lt', 30.0, lambda: (far, 30.0)) is signal
+    assert guard.rechecked == 0, "Clear-cut signals need no float64 pass"
+
+    # 30.0000001 rounds to exactly 30.0 in float32, flipping "> 30"
+    close = np.array([30.0000001, 50.0])
+    compact = to_compact(close)
+    signal = compare_series(compact, 'gt', 30.0)
+    checked = guard.verify(('close',), signal, compact, 'gt', 30.0, lambda: (close, 30.0))
+    assert signal.to_bools().tolist() == [False, True]
+    assert checked.to_bools().tolist() == [True, True], "float64 signal should replace the compact one"
+    assert guard.mismatches == 1 and ('close',) in guard.flagged
+
+    print(f"✓ Compact mode test passed", file=sys.stderr)
+    print(f"  Stats: {guard.get_stats()}", file=sys.stderr)
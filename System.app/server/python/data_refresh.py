@@ -0,0 +1,208 @@
+"""
+Hot reload of ticker data in long-lived workers
+Between tasks, a persistent worker compares the data version of every ticker
+it holds (price cache and shared arena) with the version of its parquet file
+now. Only tickers whose file was rewritten or got new deltas are dropped from
+the caches and re-read, so a nightly download needs no pool restart and every
+unaffected price frame, indicator, signal and result stays warm.
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Set
+
+from optimized_dataloader import get_global_cache, ticker_data_version
+from result_cache import get_global_result_cache
+from panel_store import PanelStore
+
+# Minimum seconds between two checks (override with DATA_REFRESH_SECONDS, 0 disables)
+DEFAULT_INTERVAL = float(os.environ.get('DATA_REFRESH_SECONDS', '10'))
+
+
+class DataRefresher:
+    """
+    Detects changed tickers and invalidates them in a backtester's caches
+
+    A check costs one stat per held ticker (plus a directory listing for
+    tickers with deltas), so it is throttled to one per interval rather than
+    run before every task. Every cache keys its entries by data version, so a
+    stale entry is never served even between checks once the ticker has been
+    re-read; invalidation makes the re-read happen and frees the dead entries.
+    """
+
+    def __init__(self, backtester, interval: float = DEFAULT_INTERVAL):
+        """
+        Initialize refresher
+
+        Args:
+            backtester: Backtester whose caches (and the process-wide price
+                and result caches) are kept current
+            interval: Minimum seconds between two checks
+        """
+        self.backtester = backtester
+        self.interval = interval
+        self.last_check = time.monotonic()
+        self.checks = 0
+        self.changed = 0
+        self.reloaded = 0
+        self.store_reopened = 0
+
+    @classmethod
+    def from_env(cls, backtester) -> Optional['DataRefresher']:
+        """Create the refresher for this worker (DATA_REFRESH_SECONDS=0 disables it)"""
+        if DEFAULT_INTERVAL <= 0:
+            return None
+        return cls(backtester)
+
+    def held_versions(self) -> List[tuple]:
+        """(ticker, version) of every ticker held in the price cache or the shared arena"""
+        held = []
+        bt = self.backtester
+        if bt.use_global_price_cache:
+            held.extend(get_global_cache(str(bt.parquet_dir)).loaded_versions().items())
+        reader = bt.shared_memory_reader
+        if reader is not None:
+            held.extend((ticker, reader.get_data_version(ticker)) for ticker in list(reader.tickers))
+        return held
+
+    def find_changed(self) -> Set[str]:
+        """Tickers whose parquet data changed (or disappeared) since they were loaded"""
+        parquet_dir = self.backtester.parquet_dir
+        current: Dict[str, Optional[str]] = {}
+        changed = set()
+        for ticker, version in self.held_versions():
+            if ticker not in current:
+                current[ticker] = ticker_data_version(parquet_dir, ticker)
+            if current[ticker] != version:
+                changed.add(ticker)
+        return changed
+
+    def check(self, force: bool = False) -> Set[str]:
+        """
+        Invalidate and reload changed tickers (at most once per interval)
+
+        Args:
+            force: Check even if the interval has not passed
+
+        Returns:
+            Tickers that were invalidated
+        """
+        now = time.monotonic()
+        if not force and now - self.last_check < self.interval:
+            return set()
+        self.last_check = now
+        self.checks += 1
+
+        self._reopen_panel_store()
+        changed = self.find_changed()
+        if changed:
+            freed = self.invalidate(changed)
+            reloaded = self.reload(changed)
+            print(f"[DataRefresh] {len(changed)} tickers changed ({', '.join(sorted(changed)[:10])}"
+                  f"{', ...' if len(changed) > 10 else ''}): freed {freed / 1024 / 1024:.1f} MB, "
+                  f"reloaded {reloaded}", file=sys.stderr, flush=True)
+        return changed
+
+    def invalidate(self, tickers: Set[str]) -> int:
+        """
+        Drop the given tickers from every cache
+
+        Returns:
+            Bytes freed in the byte-accounted caches
+        """
+        bt = self.backtester
+        self.changed += len(tickers)
+        freed = 0
+        if bt.use_global_price_cache:
+            freed += get_global_cache(str(bt.parquet_dir)).invalidate_tickers(tickers)
+        for ticker in tickers:
+            bt.price_cache.pop(ticker, None)
+        if bt.shared_memory_reader is not None:
+            bt.shared_memory_reader.invalidate_tickers(tickers)
+        for cache in (bt.indicator_cache, bt.panel_cache, bt.signal_cache):
+            if cache is not None:
+                freed += cache.invalidate_tickers(tickers)
+        if bt.subtree_memo is not None:
+            bt.subtree_memo.invalidate_tickers(tickers)
+        freed += get_global_result_cache().invalidate_tickers(tickers)
+        return freed
+
+    def reload(self, tickers: Set[str]) -> int:
+        """Re-read the tickers that still have data (one bulk scan), return the number read"""
+        bt = self.backtester
+        if not bt.use_global_price_cache:
+            return 0
+        present = [t for t in tickers if (bt.parquet_dir / f"{t}.parquet").exists()]
+        reloaded = get_global_cache(str(bt.parquet_dir)).preload(present)
+        self.reloaded += reloaded
+        return reloaded
+
+    def _reopen_panel_store(self):
+        """Switch to a newly activated panel store build (or to one built since start)"""
+        bt = self.backtester
+        store = bt.panel_store
+        if store is not None and store.is_active():
+            return
+        reopened = PanelStore.from_env(str(bt.parquet_dir))
+        if reopened is not None:
+            bt.panel_store = reopened
+            self.store_reopened += 1
+
+    def get_stats(self) -> Dict:
+        """Get refresh statistics"""
+        return {
+            'interval': self.interval,
+            'checks': self.checks,
+            'changed': self.changed,
+            'reloaded': self.reloaded,
+            'store_reopened': self.store_reopened
+        }
+
+
+if __name__ == '__main__':
+    # Test that only the rewritten ticker is invalidated and reloaded
+    import tempfile
+    import numpy as np
+    import pandas as pd
+    from pathlib import Path
+
+    os.environ['PANEL_STORE'] = '0'
+    os.environ['INDICATOR_STORE'] = '0'
+    os.environ['RESULT_STORE'] = '0'
+    from backtester import Backtester
+
+    with tempfile.TemporaryDirectory() as tmp:
+        days = pd.bdate_range('2000-01-03', periods=300)
+        for ticker, base in (('SPY', 100.0), ('QQQ', 50.0)):
+            pd.DataFrame({'Date': days, 'Close': base + np.arange(len(days)) % 7,
+                          'Volume': 1e6}).to_parquet(Path(tmp) / f'{ticker}.parquet', index=False)
+
+        tree = {'kind': 'indicator', 'conditions': [{'ticker': 'QQQ', 'metric': 'Relative Strength Index',
+                                                     'window': 10, 'comparator': 'lt', 'threshold': 50}],
+                'children': {'then': [{'kind': 'position', 'positions': ['QQQ']}],
+                             'else': [{'kind': 'position', 'positions': ['SPY']}]}}
+        opts = {'mode': 'CC', 'costBps': 0, 'splitConfig': {'enabled': False}}
+        bt = Backtester(tmp)
+        refresher = DataRefresher(bt, interval=0)
+        before = bt.run_backtest(tree, opts)
+        assert refresher.check() == set(), "Nothing changed yet"
+
+        # Rewrite QQQ: a new version must be picked up without restarting
+        time.sleep(0.01)
+        pd.DataFrame({'Date': days, 'Close': 50.0 + np.arange(len(days)) % 11,
+                      'Volume': 1e6}).to_parquet(Path(tmp) / 'QQQ.parquet', index=False)
+        spy_columns = get_global_cache(tmp).get_ticker_arrays('SPY')
+        assert refresher.check() == {'QQQ'}
+        assert refresher.reloaded == 1
+        assert get_global_cache(tmp).get_ticker_arrays('SPY')['close'] is not None
+        assert np.shares_memory(get_global_cache(tmp).get_ticker_arrays('SPY')['close'], spy_columns['close']), \
+            "Unchanged tickers stay cached"
+        assert all(k[0] != 'QQQ' for k in bt.indicator_cache.cache), "QQQ indicators were dropped"
+
+        after = bt.run_backtest(tree, opts)
+        assert after['equityCurve'] != before['equityCurve'], "Result reflects the new data"
+        assert refresher.check() == set()
+
+    print(f"✓ Data refresh test passed", file=sys.stderr)
+    print(f"  Stats: {refresher.get_stats()}", file=sys.stderr)
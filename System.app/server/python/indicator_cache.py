@@ -3,10 +3,12 @@ Vectorized indicator pre-computation with caching
 Calculates indicators across multiple periods in one pass for massive speedup
 """
 
+import os
 import sys
+import time
 import numpy as np
-import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
 from functools import lru_cache
 
 # Import Numba-optimized indicators for 10-100x speedup
@@ -23,26 +25,95 @@ try:
 except ImportError:
     USE_NUMBA = False
 
+from compact_mode import COMPACT_ENABLED, to_compact
+
+# Default byte budget for cached indicator arrays (override with INDICATOR_CACHE_MB)
+DEFAULT_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MB', '256')) * 1024 * 1024
+
+
+def series_fingerprint(prices: np.ndarray, dates: Optional[np.ndarray] = None,
+                       data_version: Optional[str] = None) -> Tuple:
+    """
+    Cheap fingerprint of the series an indicator is computed on
+
+    Two branches with different date intersections produce different aligned
+    arrays for the same ticker, so the cache key must identify the input series,
+    not just the ticker. Length plus first/last timestamp pins down the aligned
+    window; data_version changes whenever the source parquet is rewritten.
+
+    Args:
+        prices: Input price array
+        dates: Aligned Unix timestamps (optional; falls back to first/last price)
+        data_version: Version string of the source data (optional)
+
+    Returns:
+        Hashable fingerprint tuple
+    """
+    n = len(prices)
+    if dates is not None and len(dates) > 0:
+        return (n, int(dates[0]), int(dates[-1]), data_version)
+    if n > 0:
+        return (n, float(prices[0]), float(prices[-1]), data_version)
+    return (0, None, None, data_version)
+
+
+def indicator_key_id(key: Tuple) -> str:
+    """
+    Flatten an IndicatorCache key into a string (shared-memory arena lookups)
+
+    Args:
+        key: Key from IndicatorCache.make_key()
+
+    Returns:
+        String key that round-trips through JSON
+    """
+    ticker, indicator, period, fingerprint = key
+    return '|'.join(str(part) for part in (ticker, indicator, period) + tuple(fingerprint))
+
 
 class IndicatorCache:
     """
     Pre-computes indicators across multiple periods and caches results
     Example: Calculate RSI(5), RSI(10), ..., RSI(200) in one vectorized operation
+
+    Entries are keyed by (ticker, indicator, period, series fingerprint) and kept
+    in LRU order; the least recently used arrays are evicted once the total size
+    exceeds max_bytes. Lookups fall through to an attached shared-memory arena
+    and then to the on-disk store before computing. In compact mode computed
+    arrays are stored and returned as float32 (see compact_mode.py).
     """
 
-    def __init__(self, max_cache_size: int = 1000):
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_cache_size: Optional[int] = None,
+                 store=None, compact: bool = COMPACT_ENABLED):
         """
         Initialize indicator cache
 
         Args:
-            max_cache_size: Maximum number of cached indicator arrays
+            max_bytes: Maximum total size of cached indicator arrays in bytes
+            max_cache_size: Optional cap on the number of cached arrays
+            store: Optional IndicatorStore used as a persistent second tier
+            compact: Keep computed arrays as float32
         """
-        self.cache: Dict[str, np.ndarray] = {}
+        self.store = store
+        self.compact = compact
+        self.shared = None  # SharedArenaReader attached by persistent_worker
+        self.shared_hits = 0
+        self.cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self.last_used: Dict[Tuple, float] = {}  # time.monotonic() of each entry's last use
+        self.max_bytes = max_bytes
         self.max_cache_size = max_cache_size
+        self.current_bytes = 0
         self.hit_count = 0
         self.miss_count = 0
+        self.evict_count = 0
 
-    def get_indicator(self, ticker: str, indicator: str, period: int, prices: np.ndarray) -> Optional[np.ndarray]:
+    def make_key(self, ticker: str, indicator: str, period: int, prices: np.ndarray,
+                 dates: Optional[np.ndarray] = None, data_version: Optional[str] = None) -> Tuple:
+        """Build the content-addressed cache key for an indicator request"""
+        return (ticker, indicator, int(period), series_fingerprint(prices, dates, data_version))
+
+    def get_indicator(self, ticker: str, indicator: str, period: int, prices: np.ndarray,
+                      dates: Optional[np.ndarray] = None, data_version: Optional[str] = None) -> Optional[np.ndarray]:
         """
         Get indicator values for a specific ticker, indicator type, and period
 
@@ -51,20 +122,59 @@ class IndicatorCache:
             indicator: Indicator name (e.g., 'RSI', 'SMA', 'EMA')
             period: Period/window for the indicator
             prices: Price data (close prices)
+            dates: Timestamps aligned with prices (used for the cache key)
+            data_version: Version of the source data (used for the cache key)
 
         Returns:
             NumPy array of indicator values, or None if calculation fails
         """
-        cache_key = f"{ticker}:{indicator}:{period}"
+        cache_key = self.make_key(ticker, indicator, period, prices, dates, data_version)
 
         # Check cache
-        if cache_key in self.cache:
+        values = self.cache.get(cache_key)
+        if values is not None:
             self.hit_count += 1
-            return self.cache[cache_key]
+            self.cache.move_to_end(cache_key)
+            self.last_used[cache_key] = time.monotonic()
+            return values
+
+        # Shared-memory arena built by BatchOptimizer: zero-copy view, not counted against max_bytes
+        if self.shared is not None:
+            values = self.shared.get(indicator_key_id(cache_key))
+            if values is not None:
+                self.shared_hits += 1
+                return values
 
         self.miss_count += 1
 
-        # Calculate indicator
+        # Second tier: memory-mapped array written by any worker (or a previous run)
+        if self.store is not None:
+            values = self.store.get(cache_key)
+            if values is not None:
+                self.put(cache_key, values)
+                return values
+
+        values = self.compute(indicator, period, prices)
+        if values is not None:
+            if self.compact:
+                values = to_compact(values)
+            self.put(cache_key, values)
+            if self.store is not None:
+                self.store.put(cache_key, values)
+
+        return values
+
+    def attach_shared(self, reader):
+        """
+        Serve lookups from a shared-memory indicator arena
+
+        Args:
+            reader: SharedArenaReader whose keys come from indicator_key_id()
+        """
+        self.shared = reader
+
+    def compute(self, indicator: str, period: int, prices: np.ndarray) -> Optional[np.ndarray]:
+        """Calculate an indicator without touching the cache"""
         values = None
         if indicator == 'RSI' or indicator == 'Relative Strength Index':
             values = self._calculate_rsi(prices, period)
@@ -83,13 +193,36 @@ class IndicatorCache:
             # Unknown indicator - return prices
             values = prices
 
-        # Cache it (with size limit)
-        if values is not None and len(self.cache) < self.max_cache_size:
-            self.cache[cache_key] = values
-
         return values
 
-    def precompute_periods(self, ticker: str, indicator: str, periods: List[int], prices: np.ndarray):
+    def put(self, cache_key: Tuple, values: np.ndarray):
+        """
+        Insert an array and evict least recently used entries over the byte budget
+
+        Args:
+            cache_key: Key from make_key()
+            values: Indicator array to cache
+        """
+        nbytes = int(values.nbytes)
+        if nbytes > self.max_bytes:
+            return  # Never cache an array that alone exceeds the budget
+
+        old = self.cache.pop(cache_key, None)
+        if old is not None:
+            self.current_bytes -= int(old.nbytes)
+
+        self.cache[cache_key] = values
+        self.last_used[cache_key] = time.monotonic()
+        self.current_bytes += nbytes
+
+        while self.cache and (
+            self.current_bytes > self.max_bytes
+            or (self.max_cache_size is not None and len(self.cache) > self.max_cache_size)
+        ):
+            self.evict_lru()
+
+    def precompute_periods(self, ticker: str, indicator: str, periods: List[int], prices: np.ndarray,
+                           dates: Optional[np.ndarray] = None, data_version: Optional[str] = None):
         """
         Pre-compute indicator for multiple periods at once (vectorized)
 
@@ -98,30 +231,84 @@ class IndicatorCache:
             indicator: Indicator name
             periods: List of periods to compute
             prices: Price data
+            dates: Timestamps aligned with prices
+            data_version: Version of the source data
         """
         for period in periods:
-            cache_key = f"{ticker}:{indicator}:{period}"
-            if cache_key not in self.cache:
-                values = self.get_indicator(ticker, indicator, period, prices)
-                if values is not None and len(self.cache) < self.max_cache_size:
-                    self.cache[cache_key] = values
+            self.get_indicator(ticker, indicator, period, prices, dates, data_version)
+
+    def invalidate_tickers(self, tickers: Set[str]) -> int:
+        """
+        Drop every array computed from the given tickers' prices
+
+        Args:
+            tickers: Ticker symbols (adjusted series '<TICKER>@adjClose' included)
+
+        Returns:
+            Bytes freed
+        """
+        freed = 0
+        for key in [k for k in self.cache if k[0].split('@', 1)[0] in tickers]:
+            values = self.cache.pop(key)
+            self.last_used.pop(key, None)
+            freed += int(values.nbytes)
+        self.current_bytes -= freed
+        return freed
+
+    def cached_tickers(self) -> Set[str]:
+        """Tickers with at least one cached array (adjusted series counted under their ticker)"""
+        return {key[0].split('@', 1)[0] for key in self.cache}
 
     def clear(self):
         """Clear the cache"""
         self.cache.clear()
+        self.last_used.clear()
+        self.current_bytes = 0
         self.hit_count = 0
         self.miss_count = 0
+        self.evict_count = 0
+        self.shared_hits = 0
+
+    # Memory budget protocol (see memory_budget.py)
+
+    def memory_bytes(self) -> int:
+        return self.current_bytes
+
+    def memory_entries(self) -> int:
+        return len(self.cache)
+
+    def lru_last_used(self) -> Optional[float]:
+        return self.last_used[next(iter(self.cache))] if self.cache else None
+
+    def evict_lru(self) -> int:
+        """Drop the least recently used array, return bytes freed"""
+        key, evicted = self.cache.popitem(last=False)
+        self.last_used.pop(key, None)
+        self.current_bytes -= int(evicted.nbytes)
+        self.evict_count += 1
+        return int(evicted.nbytes)
 
     def get_stats(self) -> Dict:
         """Get cache statistics"""
-        total = self.hit_count + self.miss_count
-        hit_rate = (self.hit_count / total * 100) if total > 0 else 0
-        return {
+        hits = self.hit_count + self.shared_hits
+        total = hits + self.miss_count
+        hit_rate = (hits / total * 100) if total > 0 else 0
+        stats = {
             'size': len(self.cache),
             'hits': self.hit_count,
             'misses': self.miss_count,
-            'hit_rate': hit_rate
+            'evictions': self.evict_count,
+            'hit_rate': hit_rate,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
         }
+        if self.compact:
+            stats['compact'] = True
+        if self.shared is not None:
+            stats['shared_hits'] = self.shared_hits
+        if self.store is not None:
+            stats['store'] = self.store.get_stats()
+        return stats
 
     # Indicator calculation methods (vectorized NumPy operations)
 
@@ -177,6 +364,7 @@ class IndicatorCache:
             return np.copy(prices)
 
         # Use pandas for efficient rolling mean
+        import pandas as pd
         sma = pd.Series(prices).rolling(window=period, min_periods=1).mean().values
         return sma
 
@@ -191,6 +379,7 @@ class IndicatorCache:
             return prices
 
         # Use pandas for efficient EMA
+        import pandas as pd
         ema = pd.Series(prices).ewm(span=period, adjust=False).mean().values
         return ema
 
@@ -204,6 +393,7 @@ class IndicatorCache:
         if len(prices) < period:
             return np.zeros(len(prices))
 
+        import pandas as pd
         stddev = pd.Series(prices).rolling(window=period, min_periods=1).std().values
         return stddev
 
@@ -231,12 +421,14 @@ class SharedIndicatorCache:
     Pre-computes common indicators before optimization starts
     """
 
-    def __init__(self):
-        self.cache = IndicatorCache(max_cache_size=5000)
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, store=None):
+        self.cache = IndicatorCache(max_bytes=max_bytes, store=store)
         self.tickers: List[str] = []
         self.indicators_config: Dict[str, List[int]] = {}
 
-    def precompute_all(self, price_data: Dict[str, np.ndarray], indicators_config: Dict[str, List[int]]):
+    def precompute_all(self, price_data: Dict[str, np.ndarray], indicators_config: Dict[str, List[int]],
+                       dates: Optional[Dict[str, np.ndarray]] = None,
+                       data_versions: Optional[Dict[str, str]] = None):
         """
         Pre-compute all indicators for all tickers
 
@@ -244,7 +436,12 @@ class SharedIndicatorCache:
             price_data: Dict mapping ticker -> close prices array
             indicators_config: Dict mapping indicator name -> list of periods
                               e.g., {'RSI': [5,10,14,20,50,100,200], 'SMA': [10,20,50,200]}
+            dates: Optional dict mapping ticker -> timestamps aligned with its prices
+            data_versions: Optional dict mapping ticker -> source data version
         """
+        dates = dates or {}
+        data_versions = data_versions or {}
+
         self.tickers = list(price_data.keys())
         self.indicators_config = indicators_config
 
@@ -255,16 +452,61 @@ class SharedIndicatorCache:
 
         for ticker, prices in price_data.items():
             for indicator, periods in indicators_config.items():
-                self.cache.precompute_periods(ticker, indicator, periods, prices)
+                self.cache.precompute_periods(ticker, indicator, periods, prices,
+                                              dates.get(ticker), data_versions.get(ticker))
                 computed += len(periods)
 
         stats = self.cache.get_stats()
         print(f"[IndicatorCache] Pre-computation complete: {stats['size']} indicators cached", file=sys.stderr, flush=True)
 
-    def get_indicator(self, ticker: str, indicator: str, period: int, prices: np.ndarray) -> Optional[np.ndarray]:
+    def get_indicator(self, ticker: str, indicator: str, period: int, prices: np.ndarray,
+                      dates: Optional[np.ndarray] = None, data_version: Optional[str] = None) -> Optional[np.ndarray]:
         """Get indicator from cache (delegates to internal cache)"""
-        return self.cache.get_indicator(ticker, indicator, period, prices)
+        return self.cache.get_indicator(ticker, indicator, period, prices, dates, data_version)
 
     def get_stats(self) -> Dict:
         """Get cache statistics"""
         return self.cache.get_stats()
+
+
+if __name__ == '__main__':
+    # Test content-addressed keys and LRU byte budget
+    prices = np.linspace(100.0, 200.0, 1000)
+    dates_a = np.arange(1000) * 86400
+    dates_b = dates_a + 86400 * 30  # Same length, different window
+
+    cache = IndicatorCache(max_bytes=3 * prices.nbytes)
+
+    a = cache.get_indicator('SPY', 'SMA', 10, prices, dates_a, 'v1')
+    b = cache.get_indicator('SPY', 'SMA', 10, prices, dates_b, 'v1')
+    assert cache.get_stats()['misses'] == 2, "Different date windows must not share entries"
+
+    cache.get_indicator('SPY', 'SMA', 10, prices, dates_a, 'v1')
+    assert cache.get_stats()['hits'] == 1, "Same series should hit"
+
+    cache.get_indicator('SPY', 'SMA', 10, prices, dates_a, 'v2')
+    assert cache.get_stats()['misses'] == 3, "New data version should miss"
+
+    # Fourth array exceeds the 3-array budget: least recently used (dates_b) goes first
+    cache.get_indicator('SPY', 'SMA', 20, prices, dates_a, 'v1')
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1 and stats['bytes'] <= stats['max_bytes'], "Should evict over budget"
+    assert cache.make_key('SPY', 'SMA', 10, prices, dates_b, 'v1') not in cache.cache, "LRU entry evicted"
+
+    # Arena tier: a shared view is returned as-is and never copied into the LRU
+    arena = {}  # Stands in for SharedArenaReader (same get() interface)
+    key = cache.make_key('QQQ', 'SMA', 5, prices, dates_a, 'v1')
+    arena[indicator_key_id(key)] = cache.compute('SMA', 5, prices)
+    cache.attach_shared(arena)
+    shared = cache.get_indicator('QQQ', 'SMA', 5, prices, dates_a, 'v1')
+    assert shared is arena[indicator_key_id(key)] and key not in cache.cache, "Should serve arena view"
+    assert cache.get_stats()['shared_hits'] == 1
+
+    # Compact mode: half the bytes per entry, values within float32 rounding
+    compact = IndicatorCache(compact=True)
+    rsi = compact.get_indicator('SPY', 'RSI', 14, prices, dates_a, 'v1')
+    assert rsi.dtype == np.float32 and compact.get_stats()['bytes'] == rsi.nbytes
+    assert np.allclose(rsi, compact.compute('RSI', 14, prices), rtol=1e-6, equal_nan=True)
+
+    print(f"✓ Indicator cache test passed", file=sys.stderr)
+    print(f"  Stats: {stats}", file=sys.stderr)
@@ -0,0 +1,298 @@
+"""
+Persistent on-disk indicator store backed by memory-mapped .npy files
+Indicator arrays are written once and opened read-only via np.memmap, so every
+worker process (and every restart) shares one page-cache copy instead of
+recomputing RSI/SMA arrays from scratch
+"""
+
+import os
+import sys
+import time
+import uuid
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from compact_mode import COMPACT_ENABLED, to_compact
+
+# Default size cap of the store (override with INDICATOR_STORE_MB)
+DEFAULT_MAX_BYTES = int(os.environ.get('INDICATOR_STORE_MB', '2048')) * 1024 * 1024
+
+# Run eviction after this many writes (keeps puts cheap)
+EVICT_INTERVAL = 500
+
+# Refresh a file's modification time (its recency) at most this often per hit
+TOUCH_INTERVAL = 3600
+
+
+def _sanitize(part: str) -> str:
+    """Make a key component safe for use in a filename"""
+    safe = ''.join(c if c.isalnum() or c in '-.' else '_' for c in str(part))
+    return safe or '_'
+
+
+class IndicatorStore:
+    """
+    Directory of memory-mappable indicator arrays
+
+    Layout: <root>/<TICKER>/<indicator>__<period>__<data_version>__<series_hash>.npy
+
+    One file per (ticker, indicator, params, data version, aligned series).
+    Files are written to a temp name and atomically renamed into place, so
+    readers never observe a partial array (a lost write after a crash is
+    only a cache miss, so nothing is fsynced). When a ticker's source parquet
+    changes its data version changes too; the first write of a new version
+    removes files of older versions for that ticker. Every aligned window is
+    a file of its own, so least recently used files (by modification time)
+    are evicted once the store exceeds max_bytes. Compact (float32) arrays
+    hash to different names, so the two modes never read each other's files.
+    """
+
+    def __init__(self, root: str, compact: bool = COMPACT_ENABLED, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize indicator store
+
+        Args:
+            root: Directory that holds the store (created if missing)
+            compact: Store and read float32 arrays
+            max_bytes: Maximum total size of stored arrays
+        """
+        self.root = Path(root)
+        self.compact = compact
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.versions: Dict[str, str] = {}  # ticker -> data version already purged for
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.purged = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls, parquet_dir: str) -> Optional['IndicatorStore']:
+        """
+        Create the store configured for this process
+
+        INDICATOR_STORE=0 disables it; INDICATOR_STORE_DIR overrides the
+        default location (<parquet_dir>/../indicator_store).
+
+        Returns:
+            IndicatorStore, or None if disabled or the directory is not writable
+        """
+        if os.environ.get('INDICATOR_STORE', '1') == '0':
+            return None
+
+        root = os.environ.get('INDICATOR_STORE_DIR') or str(Path(parquet_dir).parent / 'indicator_store')
+        try:
+            return cls(root)
+        except OSError as e:
+            print(f"[IndicatorStore] Disabled, cannot use {root}: {e}", file=sys.stderr)
+            return None
+
+    def _path(self, key: Tuple) -> Optional[Path]:
+        """Map an IndicatorCache key to its file path (None if not persistable)"""
+        ticker, indicator, period, fingerprint = key
+        data_version = fingerprint[-1]
+        if data_version is None:
+            return None  # Unversioned data cannot be invalidated, so never persist it
+
+        series = repr(fingerprint) + ('|float32' if self.compact else '')
+        series_hash = hashlib.sha1(series.encode('utf-8')).hexdigest()[:16]
+        name = f"{_sanitize(indicator)}__{int(period)}__{_sanitize(data_version)}__{series_hash}.npy"
+        return self.root / _sanitize(ticker) / name
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        """
+        Open a stored indicator array read-only
+
+        Args:
+            key: IndicatorCache key (ticker, indicator, period, fingerprint)
+
+        Returns:
+            Read-only np.memmap, or None if not stored
+        """
+        path = self._path(key)
+        try:
+            modified = os.stat(path).st_mtime if path is not None else None
+        except OSError:
+            modified = None
+        if modified is None:
+            self.misses += 1
+            return None
+
+        try:
+            values = np.lib.format.open_memmap(str(path), mode='r')
+        except (OSError, ValueError) as e:
+            print(f"[IndicatorStore] Warning: Failed to open {path.name}: {e}", file=sys.stderr)
+            self.misses += 1
+            return None
+
+        if time.time() - modified > TOUCH_INTERVAL:
+            try:
+                os.utime(path)  # Recently used: keep it out of eviction
+            except OSError:
+                pass
+
+        self.hits += 1
+        return values
+
+    def put(self, key: Tuple, values: np.ndarray) -> bool:
+        """
+        Persist an indicator array (write-once, atomic)
+
+        Args:
+            key: IndicatorCache key (ticker, indicator, period, fingerprint)
+            values: Indicator array
+
+        Returns:
+            True if the array is stored (now or previously)
+        """
+        path = self._path(key)
+        if path is None:
+            return False
+        if path.exists():
+            return True
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(to_compact(values) if self.compact else values))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[IndicatorStore] Warning: Failed to write {path.name}: {e}", file=sys.stderr)
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+            return False
+
+        self.writes += 1
+        ticker, version = key[0], key[3][-1]
+        if self.versions.get(ticker) != version:
+            self.versions[ticker] = version
+            self.purge_ticker(ticker, keep_version=version)
+        if self.writes % EVICT_INTERVAL == 0:
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        """
+        Remove least recently used arrays over the byte budget
+
+        Returns:
+            Number of files removed
+        """
+        files = []
+        total = 0
+        for path in self.root.glob('*/*.npy'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            # Drop oldest files until ~10% under budget (avoids evicting on every put)
+            excess = total - int(self.max_bytes * 0.9)
+            freed = 0
+            for _, size, path in sorted(files):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+                if freed >= excess:
+                    break
+
+        self.evicted += removed
+        return removed
+
+    def purge_ticker(self, ticker: str, keep_version: Optional[str] = None) -> int:
+        """
+        Remove stored arrays for a ticker whose data version is outdated
+
+        Args:
+            ticker: Ticker symbol
+            keep_version: Data version to keep (None removes everything)
+
+        Returns:
+            Number of files removed
+        """
+        ticker_dir = self.root / _sanitize(ticker)
+        if not ticker_dir.exists():
+            return 0
+
+        keep = _sanitize(keep_version) if keep_version is not None else None
+        removed = 0
+        for path in ticker_dir.glob('*.npy'):
+            parts = path.name.split('__')
+            if len(parts) == 4 and parts[2] == keep:
+                continue
+            try:
+                # Readers that already mapped the file keep their pages until they close it
+                path.unlink()
+                removed += 1
+            except OSError:
+                pass
+
+        self.purged += removed
+        return removed
+
+    def get_stats(self) -> dict:
+        """Get store statistics"""
+        return {
+            'root': str(self.root),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'purged': self.purged,
+            'evicted': self.evicted,
+            'max_bytes': self.max_bytes
+        }
+
+
+if __name__ == '__main__':
+    # Test write-once store, read-only mapping and version invalidation
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = IndicatorStore(tmp)
+        values = np.linspace(0.0, 100.0, 500)
+        key_v1 = ('SPY', 'Relative Strength Index', 14, (500, 0, 43113600, 'v1'))
+        key_v2 = ('SPY', 'Relative Strength Index', 14, (500, 0, 43113600, 'v2'))
+
+        assert store.get(key_v1) is None, "Empty store should miss"
+        assert store.put(key_v1, values), "Should persist versioned array"
+
+        mapped = store.get(key_v1)
+        assert isinstance(mapped, np.memmap) and not mapped.flags.writeable, "Should map read-only"
+        assert np.array_equal(mapped, values), "Data mismatch!"
+
+        store.put(key_v2, values * 2)
+        assert store.get(key_v1) is None, "Old version should be purged"
+        assert np.array_equal(store.get(key_v2), values * 2), "New version should be readable"
+
+        compact = IndicatorStore(tmp, compact=True)
+        assert compact.get(key_v2) is None, "Compact store must not read float64 files"
+        compact.put(key_v2, values * 2)
+        assert compact.get(key_v2).dtype == np.float32 and store.get(key_v2).dtype == np.float64
+
+        unversioned = ('SPY', 'SMA', 10, (500, 0, 43113600, None))
+        assert not store.put(unversioned, values), "Unversioned data must not be persisted"
+
+        # Byte cap: the least recently used windows go first
+        capped = IndicatorStore(os.path.join(tmp, 'capped'), max_bytes=3 * values.nbytes)
+        windows = [('QQQ', 'SMA', 10, (500, start, 43113600, 'v1')) for start in range(5)]
+        for age, key in enumerate(windows):
+            capped.put(key, values)
+            os.utime(capped._path(key), (1000 + age, 1000 + age))
+        assert capped.evict() == 3, "Should evict down to 90% of the cap"
+        assert capped.get(windows[0]) is None and capped.get(windows[4]) is not None, "Oldest should go first"
+
+        print(f"✓ Indicator store test passed", file=sys.stderr)
+        print(f"  Stats: {store.get_stats()}", file=sys.stderr)
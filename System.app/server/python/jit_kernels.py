@@ -0,0 +1,133 @@
+"""
+Numba kernels resolved on first call, compiled or run as plain Python
+Importing numba and loading even a cached kernel costs ~0.5s per process,
+more than a single backtest spends inside its kernels (metrics over one
+equity curve take a few milliseconds as plain Python). Kernels are declared
+with @kernel(...) instead of @njit(...): numba is not imported until a kernel
+is first called, and in fast-start mode the kernels run uncompiled and numba
+is never imported at all.
+
+Mode: PY_FAST_START=1 runs kernels as plain Python, PY_FAST_START=0 always
+compiles them; unset, a process compiles unless it called fast_start() before
+its first kernel call (one-shot entry points such as backtester.py do).
+Compiled kernels use the on-disk cache (cache=True), which
+precompile_kernels.py fills at image build time.
+"""
+
+import functools
+import importlib.util
+import os
+import sys
+from typing import Callable, Dict, List
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Kernels declared per module (resolved together, see _resolve)
+_kernels: Dict[str, List['Kernel']] = {}
+_fast_start = False
+
+
+def fast_start(enabled: bool = True):
+    """
+    Run kernels as plain Python in this process unless PY_FAST_START says otherwise
+
+    Only affects modules whose kernels have not been called yet.
+    """
+    global _fast_start
+    _fast_start = enabled
+
+
+def jit_enabled() -> bool:
+    """Whether kernels resolved now get compiled"""
+    setting = os.environ.get('PY_FAST_START')
+    if setting in ('0', '1'):
+        return setting == '0' and NUMBA_AVAILABLE
+    return not _fast_start and NUMBA_AVAILABLE
+
+
+class Kernel:
+    """A kernel that becomes a numba dispatcher or its plain function on first call"""
+
+    def __init__(self, func: Callable, options: Dict):
+        functools.update_wrapper(self, func)
+        self.py_func = func
+        self.options = options
+        self.impl = None
+        _kernels.setdefault(func.__module__, []).append(self)
+
+    def __call__(self, *args, **kwargs):
+        if self.impl is None:
+            _resolve(self.py_func.__module__)
+        return self.impl(*args, **kwargs)
+
+
+def kernel(**options) -> Callable[[Callable], Kernel]:
+    """
+    Declare a kernel (options as for numba.jit, e.g. nopython=True, cache=True)
+    """
+    def decorator(func: Callable) -> Kernel:
+        return Kernel(func, options)
+    return decorator
+
+
+def _resolve(module_name: str):
+    """
+    Resolve every kernel of a module at once
+
+    Compiled kernels call each other through module globals, so the globals are
+    rebound to the dispatchers before any of them compiles.
+    """
+    kernels = _kernels.get(module_name, [])
+    if jit_enabled():
+        import numba
+        module_globals = sys.modules[module_name].__dict__
+        for k in kernels:
+            k.impl = numba.jit(**k.options)(k.py_func)
+            module_globals[k.__name__] = k.impl
+    else:
+        for k in kernels:
+            k.impl = k.py_func
+
+
+if __name__ == '__main__':
+    # Test both modes on a throwaway module with kernels calling each other
+    import types
+    import numpy as np
+    import jit_kernels  # The module the kernels register with (not __main__)
+
+    def load(name):
+        module = types.ModuleType(name)
+        sys.modules[name] = module
+        exec(
+            "import numpy as np\n"
+            "from jit_kernels import kernel\n"
+            "@kernel(nopython=True)\n"
+            "def total(values):\n"
+            "    s = 0.0\n"
+            "    for v in values:\n"
+            "        s += v\n"
+            "    return s\n"
+            "@kernel(nopython=True)\n"
+            "def mean(values):\n"
+            "    return total(values) / len(values)\n",
+            module.__dict__
+        )
+        return module
+
+    values = np.arange(10, dtype=np.float64)
+    jit_kernels.fast_start()
+    plain = load('kernels_plain')
+    assert plain.mean(values) == 4.5
+    assert plain.mean.impl is plain.mean.py_func, "Fast start runs the plain function"
+
+    if os.environ.get('PY_FAST_START') is None:
+        assert 'numba' not in sys.modules, "Fast start never imports numba"
+    if NUMBA_AVAILABLE and os.environ.get('PY_FAST_START') is None:
+        jit_kernels.fast_start(False)
+        compiled = load('kernels_compiled')
+        assert compiled.mean(values) == 4.5
+        assert compiled.total is not compiled.mean.py_func and hasattr(compiled.total, 'signatures'), \
+            "Compiled kernels are rebound to dispatchers"
+
+    print(f"✓ JIT kernel test passed", file=sys.stderr)
+    print(f"  numba available: {NUMBA_AVAILABLE}, compiled now: {jit_kernels.jit_enabled()}", file=sys.stderr)
@@ -0,0 +1,184 @@
+"""
+Worker-wide memory budget across all in-process caches
+Each cache tracks the real bytes it holds; when the total exceeds the budget
+the entry that is least worth keeping (idle longest relative to how expensive
+it is to rebuild) is evicted, whichever cache it lives in
+"""
+
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+# Worker-wide budget (override with PYWORKER_MEM_MB)
+DEFAULT_MAX_BYTES = int(os.environ.get('PYWORKER_MEM_MB', '1024')) * 1024 * 1024
+
+# Relative cost of rebuilding one entry of each cache (higher = kept longer when idle).
+# A result is a whole backtest; a price frame is a parquet read; the rest are vectorized numpy.
+RECOMPUTE_COST = {
+    'results': 16.0,
+    'prices': 4.0,
+    'panels': 2.0,
+    'indicators': 1.0,
+    'signals': 1.0,
+}
+
+
+class MemoryBudget:
+    """
+    Byte budget shared by registered caches
+
+    A registered cache implements:
+        memory_bytes() -> int             bytes currently held
+        memory_entries() -> int           number of entries held
+        lru_last_used() -> Optional[float] time.monotonic() of its LRU entry's last use
+        evict_lru() -> int                drop its LRU entry, return bytes freed
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize memory budget
+
+        Args:
+            max_bytes: Maximum total bytes held by all registered caches
+        """
+        self.max_bytes = max_bytes
+        self.caches: Dict[str, object] = {}
+        self.costs: Dict[str, float] = {}
+        self.evictions: Dict[str, int] = {}
+        self.evicted_bytes = 0
+
+    def register(self, name: str, cache, cost: Optional[float] = None):
+        """
+        Put a cache under the budget
+
+        Args:
+            name: Cache name (reported in usage; picks the default recompute cost)
+            cache: Object implementing the cache protocol above
+            cost: Relative recompute cost (defaults to RECOMPUTE_COST[name] or 1.0)
+        """
+        if cache is None:
+            return
+        self.caches[name] = cache
+        self.costs[name] = cost if cost is not None else RECOMPUTE_COST.get(name, 1.0)
+        self.evictions.setdefault(name, 0)
+
+    def used_bytes(self) -> int:
+        """Total bytes held by registered caches"""
+        return sum(cache.memory_bytes() for cache in self.caches.values())
+
+    def enforce(self) -> int:
+        """
+        Evict entries across caches until usage is within the budget
+
+        Returns:
+            Bytes freed
+        """
+        used = self.used_bytes()
+        if used <= self.max_bytes:
+            return 0
+
+        freed = 0
+        now = time.monotonic()
+        while used > self.max_bytes:
+            victim = None
+            victim_score = -1.0
+            for name, cache in self.caches.items():
+                last_used = cache.lru_last_used()
+                if last_used is None:
+                    continue
+                score = (now - last_used) / self.costs[name]
+                if score > victim_score:
+                    victim, victim_score = name, score
+            if victim is None:
+                break
+
+            released = self.caches[victim].evict_lru()
+            self.evictions[victim] += 1
+            freed += released
+            used -= released
+
+        self.evicted_bytes += freed
+        return freed
+
+    def get_usage(self) -> Dict:
+        """Current usage per cache plus process RSS"""
+        caches = {}
+        for name, cache in self.caches.items():
+            caches[name] = {
+                'bytes': cache.memory_bytes(),
+                'entries': cache.memory_entries(),
+                'evictions': self.evictions[name],
+                'cost': self.costs[name]
+            }
+        return {
+            'max_bytes': self.max_bytes,
+            'used_bytes': sum(c['bytes'] for c in caches.values()),
+            'evicted_bytes': self.evicted_bytes,
+            'rss_bytes': process_rss_bytes(),
+            'caches': caches
+        }
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Global budget instance (one per worker process)
+_global_budget = None
+
+
+def get_global_memory_budget() -> MemoryBudget:
+    """Get or create the worker-wide memory budget"""
+    global _global_budget
+    if _global_budget is None:
+        _global_budget = MemoryBudget()
+    return _global_budget
+
+
+if __name__ == '__main__':
+    from collections import OrderedDict
+
+    class _ToyCache:
+        """Minimal cache implementing the budget protocol"""
+
+        def __init__(self):
+            self.entries = OrderedDict()  # key -> (nbytes, last_used)
+
+        def put(self, key, nbytes, last_used):
+            self.entries[key] = (nbytes, last_used)
+
+        def memory_entries(self):
+            return len(self.entries)
+
+        def memory_bytes(self):
+            return sum(n for n, _ in self.entries.values())
+
+        def lru_last_used(self):
+            return next(iter(self.entries.values()))[1] if self.entries else None
+
+        def evict_lru(self):
+            return self.entries.popitem(last=False)[1][0]
+
+    now = time.monotonic()
+    cheap, costly = _ToyCache(), _ToyCache()
+    cheap.put('a', 100, now - 10)
+    costly.put('r', 100, now - 100)  # Idle 10x longer but 16x as expensive to rebuild
+
+    budget = MemoryBudget(max_bytes=150)
+    budget.register('indicators', cheap)
+    budget.register('results', costly)
+    assert budget.used_bytes() == 200
+    assert budget.enforce() == 100, "Should evict one entry"
+    assert cheap.memory_entries() == 0 and costly.memory_entries() == 1, "Cheap-to-rebuild entry goes first"
+
+    usage = budget.get_usage()
+    assert usage['used_bytes'] == 100 and usage['caches']['indicators']['evictions'] == 1
+
+    print(f"✓ Memory budget test passed", file=sys.stderr)
+    print(f"  Usage: {usage}", file=sys.stderr)
@@ -10,26 +10,435 @@ This module provides high-performance price data loading:
 Similar to Java's double[] arrays + Caffeine cache pattern.
 """
 
+import os
+import time
+import hashlib
 import numpy as np
-import pandas as pd
+from collections import OrderedDict
+from datetime import datetime
 from pathlib import Path
-from functools import lru_cache
 import sys
 
+from price_quality import scan_prices
+from synthetic_tickers import build_ratio_columns, expand_tickers, parse_ratio_ticker, ratio_data_version
+
+# Rows appended since a ticker's parquet file was written live in
+# <parquet_dir>/_deltas/<TICKER>/*.parquet (see ticker-data/deltas.py)
+DELTAS_DIR = '_deltas'
+
+
+def delta_paths(parquet_path):
+    """
+    Delta files that extend a ticker's parquet file, oldest first.
+
+    Only deltas newer than the base file count: rewriting the base (compaction
+    or a full download) supersedes every delta written before it.
+
+    Args:
+        parquet_path: Path to the ticker's base parquet file
+
+    Returns:
+        List of Paths (empty when the ticker has no live deltas)
+    """
+    parquet_path = Path(parquet_path)
+    ticker_dir = parquet_path.parent / DELTAS_DIR / parquet_path.stem
+    try:
+        names = sorted(n for n in os.listdir(ticker_dir) if n.endswith('.parquet'))
+    except OSError:
+        return []
+    try:
+        base_mtime = parquet_path.stat().st_mtime_ns
+    except OSError:
+        return []
+
+    live = []
+    for name in names:
+        try:
+            if (ticker_dir / name).stat().st_mtime_ns > base_mtime:
+                live.append(ticker_dir / name)
+        except OSError:
+            continue
+    return live
+
+
+def parquet_data_version(parquet_path):
+    """
+    Version string for a parquet file (changes whenever the file is rewritten
+    or a delta is appended to it).
+
+    Args:
+        parquet_path: Path to the parquet file
+
+    Returns:
+        Hex "mtime_ns-size" string (plus "+<deltas hash>" when deltas exist),
+        or None if the file does not exist
+    """
+    try:
+        st = Path(parquet_path).stat()
+    except OSError:
+        return None
+    version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    deltas = delta_signature(parquet_path)
+    if deltas:
+        version += '+' + deltas
+    return version
+
+
+def ticker_data_version(data_dir, ticker):
+    """
+    Version of a ticker's source data, ratio tickers included.
+
+    Args:
+        data_dir: Parquet directory
+        ticker: Ticker symbol (a ratio such as SPY/XLU combines the versions
+            of its components, see synthetic_tickers)
+
+    Returns:
+        Version string, or None if a source file does not exist
+    """
+    ratio = parse_ratio_ticker(ticker)
+    if ratio:
+        return ratio_data_version(*(parquet_data_version(Path(data_dir) / f"{t}.parquet") for t in ratio))
+    return parquet_data_version(Path(data_dir) / f"{ticker}.parquet")
+
+
+def delta_signature(parquet_path):
+    """Short hash naming a ticker's live deltas (None if it has none)"""
+    deltas = delta_paths(parquet_path)
+    if not deltas:
+        return None
+    names = '\n'.join(d.name for d in deltas)
+    return hashlib.sha1(names.encode('utf-8')).hexdigest()[:12]
+
+
+def read_price_parquet(parquet_path, columns=None):
+    """
+    Read a ticker's parquet file merged with its live deltas.
+
+    Args:
+        parquet_path: Path to the ticker's base parquet file
+        columns: Columns to read (None = all)
+
+    Returns:
+        Pandas DataFrame (sorted by Date, one row per date, when deltas exist)
+    """
+    import pandas as pd  # Deferred: processes served by the panel store never need it
+
+    df = pd.read_parquet(parquet_path, engine='pyarrow', columns=columns)
+    deltas = delta_paths(parquet_path)
+    if not deltas:
+        return df
+
+    frames = [df] + [pd.read_parquet(d, engine='pyarrow', columns=columns) for d in deltas]
+    df = pd.concat(frames, ignore_index=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.drop_duplicates('Date', keep='last').sort_values('Date').reset_index(drop=True)
+
+
+# Normalized price columns: (array key, parquet column)
+PRICE_FIELDS = (
+    ('open', 'Open'),
+    ('high', 'High'),
+    ('low', 'Low'),
+    ('close', 'Close'),
+    ('adjClose', 'Adj Close'),
+    ('volume', 'Volume'),
+)
+
+# Per-bar adjClose / close ratio derived from the two columns above
+ADJ_FACTOR = ('adjFactor', 'Adj Factor')
+
+# Per-bar data-quality flags from the ingest scan (see price_quality.py)
+QUALITY = ('quality', 'Quality')
+
+# Tickers read per bulk scan when loading or streaming a universe; bounds peak
+# memory independently of the universe size (override with UNIVERSE_BLOCK_TICKERS)
+DEFAULT_BLOCK_TICKERS = int(os.environ.get('UNIVERSE_BLOCK_TICKERS', '256'))
+
+# Backtests never use data before this date
+MIN_DATE = '1993-01-01'
+
+
+def adjustment_factors(close, adj_close):
+    """
+    Adjustment factor of every bar, so that adjusted price = close * factor.
+
+    Bars without a usable Close/Adj Close pair carry the previous bar's factor
+    (leading ones the first known factor), so the latest factor also adjusts
+    bars that only have a close, such as a live quote. A series without any
+    usable pair gets 1.0 (its prices are taken as already adjusted).
+
+    Args:
+        close: Close prices, one series or a (tickers x days) matrix
+        adj_close: Adjusted close prices of the same shape (None if missing)
+
+    Returns:
+        float64 array shaped like close
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if adj_close is None:
+        return np.ones(close.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.asarray(adj_close, dtype=np.float64) / close
+    valid = np.isfinite(factor) & (factor > 0)
+
+    # Index of the last valid bar at or before each bar, first valid bar before that
+    positions = np.where(valid, np.arange(factor.shape[-1]), -1)
+    last = np.maximum.accumulate(positions, axis=-1)
+    first = np.expand_dims(np.argmax(valid, axis=-1), -1)
+    factor = np.take_along_axis(factor, np.where(last < 0, first, last), axis=-1)
+
+    factor[~valid.any(axis=-1)] = 1.0
+    return factor
+
+
+def normalize_price_frame(df):
+    """
+    Convert a raw parquet frame into sorted, filtered structure-of-arrays form.
+
+    Args:
+        df: DataFrame with a Date column (or Date index) and OHLCV columns
+
+    Returns:
+        Dict with 'time' (int64 Unix seconds), float64 arrays for each
+        PRICE_FIELDS column present in the frame, 'quality' and 'adjFactor',
+        all read-only
+    """
+    import pandas as pd
+
+    if 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date'])
+    elif df.index.name == 'Date':
+        dates = pd.to_datetime(df.index.to_series())
+    else:
+        raise KeyError('Price data has no Date column')
+
+    return _normalize_arrays(dates.values, {col: df[col].values for _, col in PRICE_FIELDS if col in df.columns})
+
+
+def _normalize_arrays(dates, values):
+    """
+    Filter to the backtest start date, sort by date, repair and flag bad
+    bars (see price_quality.scan_prices) and convert to read-only columns.
+
+    Args:
+        dates: datetime64 array
+        values: Dict of parquet column name -> array (same length as dates)
+
+    Returns:
+        Dict with 'time' (int64 Unix seconds), repaired float64 PRICE_FIELDS
+        arrays, uint8 'quality' flags and 'adjFactor' (see adjustment_factors)
+        when the Close column is present
+    """
+    keep = np.flatnonzero(dates >= np.datetime64(MIN_DATE))
+    order = keep[np.argsort(dates[keep], kind='stable')]
+
+    columns = {'time': dates[order].astype('datetime64[ns]').astype(np.int64) // 10**9}
+    for key, col in PRICE_FIELDS:
+        if col in values:
+            columns[key] = values[col][order].astype(np.float64)
+    repaired, quality = scan_prices(columns)
+    columns.update(repaired)
+    columns[QUALITY[0]] = quality
+    if 'close' in columns:
+        columns[ADJ_FACTOR[0]] = adjustment_factors(columns['close'], columns.get('adjClose'))
+
+    for array in columns.values():
+        array.setflags(write=False)
+    return columns
+
+
+def read_price_arrays(parquet_path):
+    """
+    Read one ticker's normalized columns with pyarrow.parquet alone.
+
+    A single file gains nothing from a dataset scan, and importing
+    pyarrow.dataset costs more than a one-shot backtest spends reading its
+    tickers. The 1993 cutoff is applied after the read.
+
+    Args:
+        parquet_path: Path to the ticker's parquet file
+
+    Returns:
+        Normalized columns (as normalize_price_frame), or None for files that
+        need the pandas path (see bulk_read_price_arrays)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if delta_paths(parquet_path):
+        return None
+    parquet = pq.ParquetFile(parquet_path)
+    schema = parquet.schema_arrow
+    if 'Date' not in schema.names:
+        return None
+    date_type = schema.field('Date').type
+    if not pa.types.is_timestamp(date_type) or date_type.tz is not None:
+        return None
+
+    wanted = ['Date'] + [col for _, col in PRICE_FIELDS if col in schema.names]
+    table = parquet.read(columns=wanted)
+    values = {name: table.column(name).to_numpy() for name in table.column_names if name != 'Date'}
+    return _normalize_arrays(table.column('Date').to_numpy(), values)
+
+
+def bulk_read_price_arrays(paths, max_workers=None):
+    """
+    Read many tickers' parquet files in one parallel pyarrow dataset scan.
+
+    Only the Date and PRICE_FIELDS columns are read and the 1993 cutoff is
+    pushed into the scan, so skipped row groups are never decoded. Files the
+    scan cannot represent exactly like normalize_price_frame (Date stored as
+    the index or with a timezone, or rows appended as deltas) are left to the
+    per-ticker loader.
+
+    Args:
+        paths: Dict of ticker -> parquet path
+        max_workers: Parallel fragment scans (default: CPU count)
+
+    Returns:
+        Tuple (columns, skipped): ticker -> normalized columns (as
+        normalize_price_frame), and the tickers that were not read
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    from concurrent.futures import ThreadPoolExecutor
+
+    skipped = [t for t, path in paths.items() if delta_paths(path)]
+    tickers = {str(Path(path)): t for t, path in paths.items() if t not in skipped}
+    if not tickers:
+        return {}, skipped
+
+    dataset = ds.dataset(list(tickers), format='parquet')
+    wanted = ['Date'] + [col for _, col in PRICE_FIELDS]
+
+    def scan(fragment):
+        schema = fragment.physical_schema
+        if 'Date' not in schema.names:
+            return None
+        date_type = schema.field('Date').type
+        if not pa.types.is_timestamp(date_type) or date_type.tz is not None:
+            return None
+        start = pa.scalar(datetime.fromisoformat(MIN_DATE), type=date_type)
+        table = fragment.to_table(schema=schema, columns=[c for c in wanted if c in schema.names],
+                                  filter=ds.field('Date') >= start)
+        dates = table.column('Date').to_numpy()
+        values = {name: table.column(name).to_numpy() for name in table.column_names if name != 'Date'}
+        return _normalize_arrays(dates, values)
+
+    fragments = list(dataset.get_fragments())
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(scan, fragments))
+
+    columns = {}
+    for fragment, result in zip(fragments, results):
+        ticker = tickers[str(Path(fragment.path))]
+        if result is None:
+            skipped.append(ticker)
+        else:
+            columns[ticker] = result
+    return columns, skipped
+
+
+def ticker_blocks(tickers, block_tickers=DEFAULT_BLOCK_TICKERS):
+    """
+    Split tickers into consecutive blocks (order kept, duplicates dropped).
+
+    Args:
+        tickers: Ticker symbols
+        block_tickers: Maximum tickers per block
+
+    Yields:
+        Lists of at most block_tickers tickers
+    """
+    tickers = list(dict.fromkeys(tickers))
+    size = max(1, int(block_tickers))
+    for start in range(0, len(tickers), size):
+        yield tickers[start:start + size]
+
 
 class PriceDataCache:
     """
     In-memory cache for price data (similar to Caffeine cache).
 
-    Uses Python's built-in LRU cache + manual dict for frequently accessed tickers.
+    Each ticker is normalized once into read-only NumPy columns (see
+    normalize_price_frame); warm loads return views without touching pandas.
+    Raw DataFrames and the arrays of get_price_arrays() are only kept for
+    tickers that asked for them. Entries are LRU (at most cache_size tickers)
+    and byte-accounted so the worker memory budget can evict whole tickers.
+    Ratio tickers (SPY/XLU) are built from their components' columns on first
+    use and cached under their own symbol (see synthetic_tickers).
     """
 
     def __init__(self, data_dir='../data/parquet', cache_size=500):
         self.data_dir = Path(data_dir)
         self.cache_size = cache_size
-        self._hot_cache = {}  # Manual cache for most-used tickers
+        self._lru = OrderedDict()  # ticker -> time.monotonic() of last access (LRU order)
+        self._columns = {}  # ticker -> normalized read-only columns
+        self._frames = {}  # ticker -> raw DataFrame (only if requested)
+        self._hot_cache = {}  # ticker -> get_price_arrays() result
+        self._sizes = {}  # ticker -> bytes held (all of the above)
+        self._versions = {}  # Data version of each ticker as it was loaded
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _touch(self, ticker):
+        self._lru[ticker] = time.monotonic()
+        self._lru.move_to_end(ticker)
+
+    def _add(self, ticker, store, value, nbytes):
+        """Cache one representation of a ticker and evict over cache_size"""
+        store[ticker] = value
+        self._sizes[ticker] = self._sizes.get(ticker, 0) + nbytes
+        self.current_bytes += nbytes
+        self._touch(ticker)
+        while len(self._lru) > self.cache_size:
+            self.evict_lru()
+
+    def _forget(self, ticker):
+        """Drop everything cached for a ticker, return bytes freed"""
+        self._lru.pop(ticker, None)
+        self._columns.pop(ticker, None)
+        self._frames.pop(ticker, None)
+        self._hot_cache.pop(ticker, None)
+        self._versions.pop(ticker, None)  # Re-read from the file once the data is gone
+        size = self._sizes.pop(ticker, 0)
+        self.current_bytes -= size
+        return size
+
+    def _open_parquet(self, ticker):
+        """Path of a ticker's parquet file, dropping cached data from an older version"""
+        parquet_path = self.data_dir / f"{ticker}.parquet"
+
+        if not parquet_path.exists():
+            raise FileNotFoundError(f"Parquet file not found: {parquet_path}")
+
+        # Record the version of the file we actually read (keys downstream caches)
+        version = parquet_data_version(parquet_path)
+        if ticker in self._lru and self._versions.get(ticker) != version:
+            self._forget(ticker)
+        self._versions[ticker] = version
+        return parquet_path
+
+    def _read_parquet(self, ticker):
+        """Read a ticker's parquet file as a DataFrame (merged with rows appended since as deltas)"""
+        return read_price_parquet(self._open_parquet(ticker))
+
+    def _read_columns(self, ticker):
+        """
+        Read a ticker's normalized columns straight from pyarrow
+
+        No DataFrame is built unless pyarrow cannot read the file exactly
+        (see read_price_arrays).
+        """
+        parquet_path = self._open_parquet(ticker)
+        columns = read_price_arrays(parquet_path)
+        if columns is None:
+            columns = normalize_price_frame(read_price_parquet(parquet_path))
+        return columns
 
-    @lru_cache(maxsize=500)
     def _load_parquet_cached(self, ticker):
         """
         Load parquet file with LRU caching.
@@ -40,50 +449,243 @@ class PriceDataCache:
         Returns:
             Pandas DataFrame
         """
-        parquet_path = self.data_dir / f"{ticker}.parquet"
+        df = self._frames.get(ticker)
+        if df is not None:
+            self.hits += 1
+            self._touch(ticker)
+            return df
+
+        self.misses += 1
+        df = self._read_parquet(ticker)
+        self._add(ticker, self._frames, df, int(df.memory_usage(deep=True).sum()))
+        return df
 
-        if not parquet_path.exists():
-            raise FileNotFoundError(f"Parquet file not found: {parquet_path}")
+    def get_ticker_arrays(self, ticker, limit=20000):
+        """
+        Get normalized ticker data as read-only NumPy views (no pandas on warm loads).
 
-        # Use pyarrow for fast reading
-        df = pd.read_parquet(parquet_path, engine='pyarrow')
+        Args:
+            ticker: Ticker symbol
+            limit: Maximum number of rows to return (most recent)
 
-        return df
+        Returns:
+            Dict with 'time' (int64 Unix seconds, sorted, >= 1993-01-01) and
+            float64 'open', 'high', 'low', 'close', 'adjClose', 'volume' and
+            'adjFactor' (columns missing from the parquet file are omitted)
+        """
+        columns = self._columns.get(ticker)
+        if columns is not None:
+            self.hits += 1
+            self._touch(ticker)
+        elif parse_ratio_ticker(ticker):
+            self.misses += 1
+            columns = self._build_ratio(ticker)
+            self._add(ticker, self._columns, columns, sum(int(v.nbytes) for v in columns.values()))
+        else:
+            self.misses += 1
+            df = self._frames.get(ticker)
+            columns = normalize_price_frame(df) if df is not None else self._read_columns(ticker)
+            self._add(ticker, self._columns, columns, sum(int(v.nbytes) for v in columns.values()))
+
+        if limit and limit < len(columns['time']):
+            return {key: values[-limit:] for key, values in columns.items()}
+        return dict(columns)
+
+    def _build_ratio(self, ticker):
+        """
+        Build a ratio ticker's read-only columns from its (cached) components.
 
-    def get_ticker_data(self, ticker, limit=20000):
+        Raises:
+            FileNotFoundError: If a component has no parquet file
         """
-        Get ticker data as pandas DataFrame with date filtering and limit.
+        numerator, denominator = parse_ratio_ticker(ticker)
+        num = self.get_ticker_arrays(numerator, limit=None)
+        den = self.get_ticker_arrays(denominator, limit=None)
+        self._versions[ticker] = ratio_data_version(self.get_data_version(numerator), self.get_data_version(denominator))
+        columns = build_ratio_columns(num, den)
+        for array in columns.values():
+            array.setflags(write=False)
+        return columns
+
+    def _read_block(self, tickers):
+        """
+        Read a block of tickers with one parallel pyarrow scan (not cached).
+
+        Args:
+            tickers: Ticker symbols (missing files are ignored)
+
+        Returns:
+            Tuple (columns, versions): ticker -> normalized columns, and the
+            data version of each file captured before it was read
+        """
+        paths = {}
+        versions = {}
+        for ticker in tickers:
+            path = self.data_dir / f"{ticker}.parquet"
+            version = parquet_data_version(path)
+            if version is not None:
+                paths[ticker] = path
+                versions[ticker] = version
+        if not paths:
+            return {}, {}
+
+        try:
+            loaded, skipped = bulk_read_price_arrays(paths)
+        except Exception as e:
+            print(f"[PriceDataCache] Bulk scan failed, loading one by one: {e}", file=sys.stderr)
+            loaded, skipped = {}, list(paths)
+
+        for ticker in skipped:
+            try:
+                loaded[ticker] = normalize_price_frame(read_price_parquet(paths[ticker]))
+            except Exception as e:
+                print(f"[PriceDataCache] Warning: Failed to load {ticker}: {e}", file=sys.stderr)
+        return loaded, versions
+
+    def preload(self, tickers, block_tickers=DEFAULT_BLOCK_TICKERS):
+        """
+        Load many tickers at once (one parallel pyarrow scan per block of cold tickers).
+
+        At most cache_size tickers are read: preloading more would only evict
+        what was just read. The rest load on demand. Ratio tickers are built
+        once their components are loaded.
+
+        Args:
+            tickers: Ticker symbols (missing files are ignored)
+            block_tickers: Tickers per scan (bounds the memory of a scan)
+
+        Returns:
+            Number of tickers read from disk
+        """
+        tickers = list(dict.fromkeys(tickers))
+        cold = [ticker for ticker in expand_tickers(tickers) if ticker not in self._columns]
+        if len(cold) > self.cache_size:
+            print(f"[PriceDataCache] Pre-loading {self.cache_size} of {len(cold)} tickers "
+                  f"(cache holds {self.cache_size}), the rest load on demand", file=sys.stderr)
+            cold = cold[:self.cache_size]
+
+        read = 0
+        for block in ticker_blocks(cold, block_tickers):
+            loaded, versions = self._read_block(block)
+            for ticker, columns in loaded.items():
+                if ticker in self._lru and self._versions.get(ticker) != versions[ticker]:
+                    self._forget(ticker)
+                # Version captured before the scan: a file rewritten meanwhile looks stale and is re-read
+                self._versions[ticker] = versions[ticker]
+                self.misses += 1
+                self._add(ticker, self._columns, columns, sum(int(v.nbytes) for v in columns.values()))
+            read += len(loaded)
+
+        for ticker in tickers:
+            if parse_ratio_ticker(ticker) and ticker not in self._columns:
+                try:
+                    self.get_ticker_arrays(ticker, limit=None)
+                except FileNotFoundError:
+                    pass
+        return read
+
+    def stream(self, tickers, block_tickers=DEFAULT_BLOCK_TICKERS):
+        """
+        Iterate over a universe block by block without caching it.
+
+        Cached tickers are served from the cache. The others are read with one
+        scan per block and released once the caller moves on to the next
+        block, so peak memory is one block (plus the cache) whatever the
+        universe size.
+
+        Args:
+            tickers: Ticker symbols (missing files are skipped)
+            block_tickers: Tickers per block
+
+        Yields:
+            Tuple (columns, versions) for one block: ticker -> normalized
+            columns, and ticker -> data version (ratio tickers are built from
+            their components, which are read with the block)
+        """
+        for block in ticker_blocks(tickers, block_tickers):
+            wanted = [t for t in block if t not in self._columns]
+            loaded, versions = self._read_block([t for t in expand_tickers(wanted) if t not in self._columns])
+            for ticker in dict.fromkeys(block + expand_tickers(wanted)):
+                if ticker in self._columns:
+                    self.hits += 1
+                    loaded[ticker] = self._columns[ticker]
+                    versions[ticker] = self._versions.get(ticker)
+            for ticker in wanted:
+                ratio = parse_ratio_ticker(ticker)
+                if ratio and all(t in loaded for t in ratio):
+                    loaded[ticker] = build_ratio_columns(loaded[ratio[0]], loaded[ratio[1]])
+                    versions[ticker] = ratio_data_version(versions[ratio[0]], versions[ratio[1]])
+            yield {t: loaded[t] for t in block if t in loaded}, versions
+
+    def get_data_version(self, ticker):
+        """
+        Get the data version of a ticker's parquet file.
+
+        Returns the version captured when the ticker was loaded, so cache keys
+        derived from it always describe the data that is actually in memory.
 
         Args:
             ticker: Ticker symbol
-            limit: Maximum number of rows to return (most recent)
 
         Returns:
-            Pandas DataFrame with OHLC data
+            Version string, or None if the file does not exist
         """
-        # Load from parquet (LRU cached)
-        df = self._load_parquet_cached(ticker)
+        version = self._versions.get(ticker)
+        if version is None:
+            version = ticker_data_version(self.data_dir, ticker)
+        return version
+
+    def loaded_versions(self):
+        """
+        Data version of every cached ticker as it was read.
+
+        Returns:
+            Dict of ticker -> version (compare with parquet_data_version to
+            find files rewritten since)
+        """
+        return {ticker: self._versions.get(ticker) for ticker in self._lru}
 
-        # Ensure Date column is datetime
-        if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'])
-        elif df.index.name == 'Date':
-            df = df.reset_index()
-            df['Date'] = pd.to_datetime(df['Date'])
+    def invalidate_tickers(self, tickers):
+        """
+        Drop everything cached for the given tickers (re-read on next use).
 
-        # Filter to backtest start date (1993-01-01 minimum)
-        df = df[df['Date'] >= '1993-01-01']
+        Ratio tickers built from any of them are dropped as well.
 
-        # Sort by date
-        df = df.sort_values('Date')
+        Args:
+            tickers: Ticker symbols
 
-        # Add timestamp column (Unix epoch in seconds)
-        df['time'] = df['Date'].astype(np.int64) // 10**9
+        Returns:
+            Bytes freed
+        """
+        tickers = set(tickers)
+        tickers.update(t for t in self._lru if set(parse_ratio_ticker(t) or ()) & tickers)
+        return sum(self._forget(ticker) for ticker in tickers if ticker in self._lru)
 
-        # Apply limit
-        if limit and limit < len(df):
-            df = df.tail(limit)
+    def get_ticker_data(self, ticker, limit=20000):
+        """
+        Get ticker data as pandas DataFrame with date filtering and limit.
+
+        Built from the normalized columns (get_ticker_arrays is faster when a
+        DataFrame is not needed).
 
+        Args:
+            ticker: Ticker symbol
+            limit: Maximum number of rows to return (most recent)
+
+        Returns:
+            Pandas DataFrame with Date, OHLCV and time (Unix seconds) columns,
+            plus Adj Factor and Quality (price_quality flags) when the source
+            has them; the shared price arena copies both to workers
+        """
+        import pandas as pd
+
+        columns = self.get_ticker_arrays(ticker, limit)
+
+        df = pd.DataFrame({'Date': pd.to_datetime(columns['time'], unit='s')})
+        for key, col in PRICE_FIELDS + (ADJ_FACTOR, QUALITY):
+            if key in columns:
+                df[col] = columns[key]
+        df['time'] = columns['time']
         return df
 
     def get_price_arrays(self, ticker):
@@ -105,6 +707,7 @@ class PriceDataCache:
         """
         # Check hot cache first
         if ticker in self._hot_cache:
+            self._touch(ticker)
             return self._hot_cache[ticker]
 
         # Load from parquet (LRU cached)
@@ -128,25 +731,47 @@ class PriceDataCache:
         price_data['returns'] = returns
         price_data['length'] = len(close_prices)
 
-        # Add to hot cache if frequently accessed
-        if len(self._hot_cache) < 100:  # Keep top 100 tickers in hot cache
-            self._hot_cache[ticker] = price_data
+        # Keep the arrays as long as the ticker stays cached
+        self._add(ticker, self._hot_cache, price_data,
+                  sum(v.nbytes for v in price_data.values() if isinstance(v, np.ndarray)))
 
         return price_data
 
     def clear_cache(self):
         """Clear all caches."""
+        self._lru.clear()
+        self._columns.clear()
+        self._frames.clear()
         self._hot_cache.clear()
-        self._load_parquet_cached.cache_clear()
+        self._sizes.clear()
+        self._versions.clear()
+        self.current_bytes = 0
+
+    # Memory budget protocol (see memory_budget.py)
+
+    def memory_bytes(self):
+        return self.current_bytes
+
+    def memory_entries(self):
+        return len(self._lru)
+
+    def lru_last_used(self):
+        return next(iter(self._lru.values())) if self._lru else None
+
+    def evict_lru(self):
+        """Drop the least recently used ticker (all representations), return bytes freed."""
+        return self._forget(next(iter(self._lru)))
 
     def get_cache_info(self):
         """Get cache statistics."""
-        lru_info = self._load_parquet_cached.cache_info()
+        total = self.hits + self.misses
         return {
             'hot_cache_size': len(self._hot_cache),
-            'lru_hits': lru_info.hits,
-            'lru_misses': lru_info.misses,
-            'lru_hit_rate': lru_info.hits / (lru_info.hits + lru_info.misses) if (lru_info.hits + lru_info.misses) > 0 else 0,
+            'lru_size': len(self._lru),
+            'lru_hits': self.hits,
+            'lru_misses': self.misses,
+            'lru_hit_rate': self.hits / total if total > 0 else 0,
+            'bytes': self.current_bytes,
         }
 
 
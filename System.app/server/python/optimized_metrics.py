@@ -4,11 +4,11 @@ Provides 10-100x speedup over pure Python implementations
 """
 
 import numpy as np
-from numba import jit
 from typing import Dict, Optional
+from jit_kernels import kernel
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_max_drawdown(equity_curve: np.ndarray) -> float:
     """Calculate maximum drawdown from equity curve"""
     if len(equity_curve) == 0:
@@ -27,7 +27,7 @@ def calculate_max_drawdown(equity_curve: np.ndarray) -> float:
     return max_dd
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_cagr(equity_curve: np.ndarray, n_years: float) -> float:
     """Calculate Compound Annual Growth Rate"""
     if len(equity_curve) < 2 or n_years <= 0:
@@ -45,7 +45,7 @@ def calculate_cagr(equity_curve: np.ndarray, n_years: float) -> float:
     return cagr
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_sharpe_ratio(returns: np.ndarray, periods_per_year: float = 252.0) -> float:
     """Calculate annualized Sharpe ratio"""
     if len(returns) < 2:
@@ -61,7 +61,7 @@ def calculate_sharpe_ratio(returns: np.ndarray, periods_per_year: float = 252.0)
     return sharpe
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_sortino_ratio(returns: np.ndarray, periods_per_year: float = 252.0) -> float:
     """Calculate annualized Sortino ratio (penalizes downside volatility only)"""
     if len(returns) < 2:
@@ -82,7 +82,7 @@ def calculate_sortino_ratio(returns: np.ndarray, periods_per_year: float = 252.0
     return sortino
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_calmar_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     """Calculate Calmar ratio (CAGR / Max Drawdown)"""
     if len(equity_curve) < 2 or n_years <= 0:
@@ -97,7 +97,7 @@ def calculate_calmar_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     return cagr / max_dd
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_tim_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     """
     Calculate TIM ratio (Time In Market ratio)
@@ -121,7 +121,7 @@ def calculate_tim_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     return cagr / time_in_market
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_timar_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     """
     Calculate TIMAR ratio (Time In Market Adjusted Return)
@@ -139,7 +139,7 @@ def calculate_timar_ratio(equity_curve: np.ndarray, n_years: float) -> float:
     return tim / max_dd
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_win_rate(returns: np.ndarray) -> float:
     """Calculate percentage of positive returns"""
     if len(returns) == 0:
@@ -153,7 +153,7 @@ def calculate_win_rate(returns: np.ndarray) -> float:
     return wins / len(returns)
 
 
-@jit(nopython=True, cache=True, fastmath=True)
+@kernel(nopython=True, cache=True, fastmath=True)
 def calculate_all_metrics_fast(equity_curve: np.ndarray, returns: np.ndarray, n_years: float, periods_per_year: float = 252.0) -> tuple:
     """
     Calculate all metrics in a single pass for maximum efficiency
@@ -277,3 +277,8 @@ def calculate_metrics_fast(equity_curve: np.ndarray, n_years: float, periods_per
         'timar': float(timar),
         'winRate': float(win_rate)
     }
+
+
+def warm_up_kernels():
+    """Load (or compile) the metric kernels (see optimized_indicators.warm_up_kernels)"""
+    calculate_metrics_fast(np.linspace(100.0, 110.0, 64), 1.0)
@@ -0,0 +1,266 @@
+"""
+Per-worker memo of aligned price panels
+Branches of a batch share a handful of ticker universes, so the aligned columns
+built by build_price_database are kept per date axis and reused: the same
+axis is served directly, and a narrower axis is served by slicing a cached
+wider one when the slice is guaranteed to equal a fresh alignment
+"""
+
+import os
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Default byte budget for cached aligned columns (override with PANEL_CACHE_MB)
+DEFAULT_MAX_BYTES = int(os.environ.get('PANEL_CACHE_MB', '256')) * 1024 * 1024
+
+# Aligned fields of a price database
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'adjClose', 'volume', 'adjFactor', 'quality')
+
+
+def axis_key(dates: np.ndarray) -> Tuple:
+    """Cheap identity of a date axis (length, first and last timestamp)"""
+    if len(dates) == 0:
+        return (0, None, None)
+    return (len(dates), int(dates[0]), int(dates[-1]))
+
+
+class _Panel:
+    """Aligned columns of many tickers on one date axis"""
+
+    __slots__ = ('dates', 'columns', 'nbytes', 'last_used')
+
+    def __init__(self, dates: np.ndarray):
+        self.dates = dates
+        self.dates.setflags(write=False)
+        self.columns: Dict[str, Tuple[Optional[str], Dict[str, np.ndarray]]] = {}
+        self.nbytes = int(dates.nbytes)
+        self.last_used = time.monotonic()
+
+    def locate(self, dates: np.ndarray) -> Optional[int]:
+        """Offset at which `dates` is a contiguous run of this axis, or None"""
+        n = len(dates)
+        if n == 0 or n > len(self.dates):
+            return None
+        start = int(np.searchsorted(self.dates, dates[0]))
+        if start + n > len(self.dates) or self.dates[start] != dates[0] or self.dates[start + n - 1] != dates[-1]:
+            return None
+        if not np.array_equal(self.dates[start:start + n], dates):
+            return None
+        return start
+
+
+class PanelCache:
+    """
+    LRU cache of aligned price columns, grouped by date axis
+
+    A column aligned to an axis depends only on the ticker's data and the axis,
+    so panels accumulate every ticker ever aligned to their axis and a request
+    for any subset of them is served without realigning.
+
+    Slicing a wider axis is only exact for tickers that have a complete row
+    at the first requested date (the caller passes these as `anchored`):
+    forward fill inside the slice then never reaches before it, and there is
+    nothing to back fill.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize panel cache
+
+        Args:
+            max_bytes: Maximum total size of cached arrays in bytes
+        """
+        self.panels: "OrderedDict[Tuple, _Panel]" = OrderedDict()
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.slice_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, dates: np.ndarray, versions: Dict[str, Optional[str]],
+               anchored: Set[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Find cached aligned columns for a request
+
+        Args:
+            dates: Requested date axis
+            versions: Data version of every requested ticker
+            anchored: Tickers with a complete row at dates[0] (may be served by slicing)
+
+        Returns:
+            Dict of ticker -> {field: array} for the tickers found (possibly none)
+        """
+        found = {}
+        key = axis_key(dates)
+        used = []
+        for panel_key in reversed(self.panels):
+            panel = self.panels[panel_key]
+            exact = panel_key == key and np.array_equal(panel.dates, dates)
+            start = 0 if exact else panel.locate(dates)
+            if start is None:
+                continue
+
+            hit = False
+            for ticker, version in versions.items():
+                if ticker in found:
+                    continue
+                column = panel.columns.get(ticker)
+                if column is None or column[0] != version:
+                    continue
+                if exact:
+                    found[ticker] = column[1]
+                    self.hits += 1
+                elif ticker in anchored:
+                    end = start + len(dates)
+                    found[ticker] = {field: values[start:end] for field, values in column[1].items()}
+                    self.slice_hits += 1
+                else:
+                    continue
+                hit = True
+
+            if hit:
+                used.append(panel_key)
+            if len(found) == len(versions):
+                break
+
+        now = time.monotonic()
+        for panel_key in reversed(used):
+            self.panels.move_to_end(panel_key)
+            self.panels[panel_key].last_used = now
+
+        self.misses += len(versions) - len(found)
+        return found
+
+    def store(self, dates: np.ndarray, columns: Dict[str, Dict[str, np.ndarray]],
+              versions: Dict[str, Optional[str]]):
+        """
+        Add freshly aligned columns to the panel of their date axis
+
+        Arrays are made read-only: they are shared by every branch served from the cache.
+
+        Args:
+            dates: Date axis the columns are aligned to
+            columns: Dict of ticker -> {field: array}
+            versions: Data version of each ticker
+        """
+        if not columns:
+            return
+
+        key = axis_key(dates)
+        panel = self.panels.get(key)
+        if panel is None or not np.array_equal(panel.dates, dates):
+            if panel is not None:
+                self._drop(key)
+            panel = _Panel(dates)
+            self.panels[key] = panel
+            self.current_bytes += panel.nbytes
+        else:
+            self.panels.move_to_end(key)
+            panel.last_used = time.monotonic()
+
+        for ticker, fields in columns.items():
+            old = panel.columns.pop(ticker, None)
+            if old is not None:
+                size = sum(int(v.nbytes) for v in old[1].values())
+                panel.nbytes -= size
+                self.current_bytes -= size
+            for values in fields.values():
+                values.setflags(write=False)
+            size = sum(int(v.nbytes) for v in fields.values())
+            panel.columns[ticker] = (versions.get(ticker), fields)
+            panel.nbytes += size
+            self.current_bytes += size
+
+        while len(self.panels) > 1 and self.current_bytes > self.max_bytes:
+            self.evict_lru()
+
+    def invalidate_tickers(self, tickers: Set[str]) -> int:
+        """Drop the aligned columns of the given tickers from every panel, return bytes freed"""
+        freed = 0
+        for panel in self.panels.values():
+            for ticker in tickers & panel.columns.keys():
+                size = sum(int(v.nbytes) for v in panel.columns.pop(ticker)[1].values())
+                panel.nbytes -= size
+                freed += size
+        self.current_bytes -= freed
+        return freed
+
+    def _drop(self, key: Tuple) -> int:
+        panel = self.panels.pop(key)
+        self.current_bytes -= panel.nbytes
+        return panel.nbytes
+
+    # Memory budget protocol (see memory_budget.py)
+
+    def memory_bytes(self) -> int:
+        return self.current_bytes
+
+    def memory_entries(self) -> int:
+        return len(self.panels)
+
+    def lru_last_used(self) -> Optional[float]:
+        return next(iter(self.panels.values())).last_used if self.panels else None
+
+    def evict_lru(self) -> int:
+        """Drop the least recently used panel, return bytes freed"""
+        self.evictions += 1
+        return self._drop(next(iter(self.panels)))
+
+    def clear(self):
+        """Clear the cache"""
+        self.panels.clear()
+        self.current_bytes = 0
+        self.hits = 0
+        self.slice_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        hits = self.hits + self.slice_hits
+        total = hits + self.misses
+        return {
+            'panels': len(self.panels),
+            'columns': sum(len(p.columns) for p in self.panels.values()),
+            'hits': self.hits,
+            'slice_hits': self.slice_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (hits / total * 100) if total > 0 else 0,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+if __name__ == '__main__':
+    import sys
+
+    wide = np.arange(10, dtype=np.int64) * 86400
+    spy = {field: np.arange(10, dtype=np.float64) + 100 for field in PANEL_FIELDS}
+    qqq = {field: np.arange(10, dtype=np.float64) + 200 for field in PANEL_FIELDS}
+
+    cache = PanelCache()
+    assert cache.lookup(wide, {'SPY': 'v1'}, set()) == {}, "Empty cache should miss"
+    cache.store(wide, {'SPY': spy, 'QQQ': qqq}, {'SPY': 'v1', 'QQQ': 'v1'})
+
+    found = cache.lookup(wide, {'SPY': 'v1'}, set())
+    assert found['SPY']['close'] is spy['close'], "Same axis is served without copying"
+    assert not found['SPY']['close'].flags.writeable, "Shared columns are read-only"
+
+    narrow = wide[3:8]
+    found = cache.lookup(narrow, {'SPY': 'v1', 'QQQ': 'v1'}, anchored={'SPY'})
+    assert list(found) == ['SPY'], "Only anchored tickers are served by slicing"
+    assert np.array_equal(found['SPY']['close'], spy['close'][3:8])
+
+    assert cache.lookup(wide, {'SPY': 'v2'}, set()) == {}, "New data version must not reuse columns"
+    assert cache.lookup(wide[::2], {'SPY': 'v1'}, {'SPY'}) == {}, "Non-contiguous axis cannot be sliced"
+
+    held = cache.memory_bytes()
+    assert cache.invalidate_tickers({'QQQ'}) > 0 and cache.memory_bytes() < held
+    assert cache.lookup(wide, {'QQQ': 'v1'}, set()) == {} and 'SPY' in cache.lookup(wide, {'SPY': 'v1'}, set())
+
+    print(f"✓ Panel cache test passed", file=sys.stderr)
+    print(f"  Stats: {cache.get_stats()}", file=sys.stderr)
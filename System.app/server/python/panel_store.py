@@ -0,0 +1,372 @@
+"""
+Calendar-aligned price panel store compiled from the per-ticker parquet files
+One master trading-day calendar plus one memory-mapped (tickers x days) matrix
+per price field, so aligning a universe is a row lookup and a column mask
+instead of a parquet read, a DataFrame conversion and a merge per ticker
+
+Build it with:
+    python panel_store.py <parquet_dir> [store_dir]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from optimized_dataloader import (
+    ADJ_FACTOR, PRICE_FIELDS, QUALITY, adjustment_factors, normalize_price_frame, parquet_data_version,
+    read_price_parquet
+)
+from price_quality import QUALITY_DTYPE, QUALITY_MISSING
+
+# Bump when the on-disk layout changes (older builds are ignored)
+FORMAT_VERSION = 3
+
+# Tickers per block when deriving adjustment factors (bounds temporary memory)
+FACTOR_BLOCK_ROWS = 1024
+
+
+def default_store_dir(parquet_dir: str) -> Path:
+    """Default store location (<parquet_dir>/../panel_store)"""
+    return Path(parquet_dir).parent / 'panel_store'
+
+
+class PanelStore:
+    """
+    Read-only view of a compiled panel store
+
+    Layout: <root>/CURRENT names the active build directory, which holds
+        calendar.npy              int64 Unix seconds, union of all tickers' days
+        <field>.npy               float64 (tickers x days), repaired values, NaN where a ticker has no row
+        adjFactor.npy             float64 (tickers x days), adjClose / close, gaps filled
+        quality.npy               uint8 (tickers x days), price_quality flags, MISSING where no row
+        present.npy               bool (tickers x days), ticker has a row on that day
+        first_valid.npy           int32 first calendar index with a row (-1 if none)
+        last_valid.npy            int32 last calendar index with a row (-1 if none)
+        index.json                ticker -> row, data version, row count, raw start date
+
+    Rows hold exactly the normalized parquet data (same 1993 cutoff and
+    quality repairs as the loaders), so aligning from the store gives the
+    same arrays as aligning the parquet columns. Each ticker records the data version of the file it
+    was compiled from; callers only use rows whose version still matches, and
+    anything else falls back to the parquet path until the store is rebuilt.
+    """
+
+    def __init__(self, build_dir: Union[str, Path]):
+        """
+        Open a store build (all matrices are mapped read-only)
+
+        Args:
+            build_dir: Build directory containing index.json and the .npy files
+        """
+        self.build_dir = Path(build_dir)
+        with open(self.build_dir / 'index.json') as f:
+            index = json.load(f)
+        if index.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported panel store format {index.get('format')}")
+
+        self.tickers: Dict[str, Dict] = index['tickers']
+        self.fields: List[str] = index['fields']
+        self.built_at: float = index.get('built_at', 0.0)
+        self.calendar = np.load(self.build_dir / 'calendar.npy', mmap_mode='r')
+        self.present = np.load(self.build_dir / 'present.npy', mmap_mode='r')
+        self.first_valid = np.load(self.build_dir / 'first_valid.npy', mmap_mode='r')
+        self.last_valid = np.load(self.build_dir / 'last_valid.npy', mmap_mode='r')
+        self.quality = np.load(self.build_dir / f'{QUALITY[0]}.npy', mmap_mode='r')
+        self.matrices = {field: np.load(self.build_dir / f'{field}.npy', mmap_mode='r') for field in self.fields}
+
+    @classmethod
+    def open(cls, root: Union[str, Path]) -> Optional['PanelStore']:
+        """Open the active build of a store directory (None if not built)"""
+        current = Path(root) / 'CURRENT'
+        try:
+            build = current.read_text().strip()
+        except OSError:
+            return None
+        try:
+            return cls(Path(root) / build)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[PanelStore] Warning: Cannot open {root}/{build}: {e}", file=sys.stderr)
+            return None
+
+    @classmethod
+    def from_env(cls, parquet_dir: str) -> Optional['PanelStore']:
+        """
+        Open the store configured for this process
+
+        PANEL_STORE=0 disables it; PANEL_STORE_DIR overrides the default
+        location (<parquet_dir>/../panel_store).
+
+        Returns:
+            PanelStore, or None if disabled or not built
+        """
+        if os.environ.get('PANEL_STORE', '1') == '0':
+            return None
+        root = os.environ.get('PANEL_STORE_DIR') or str(default_store_dir(parquet_dir))
+        return cls.open(root)
+
+    def is_active(self) -> bool:
+        """Whether this is still the build CURRENT names (False once a rebuild is activated)"""
+        try:
+            return (self.build_dir.parent / 'CURRENT').read_text().strip() == self.build_dir.name
+        except OSError:
+            return False
+
+    def is_fresh(self, ticker: str, version: Optional[str]) -> bool:
+        """Whether the store holds a ticker compiled from this data version"""
+        entry = self.tickers.get(ticker)
+        return entry is not None and version is not None and entry['version'] == version
+
+    def row_count(self, ticker: str) -> int:
+        """Number of rows (days) a ticker has in the store"""
+        return self.tickers[ticker]['count']
+
+    def start_date(self, ticker: str) -> Optional['pd.Timestamp']:
+        """First date in the ticker's source file (before the 1993 cutoff)"""
+        import pandas as pd
+
+        entry = self.tickers.get(ticker)
+        if entry is None or entry.get('start') is None:
+            return None
+        return pd.Timestamp(entry['start'], unit='s')
+
+    def common_days(self, tickers: List[str]) -> Union[slice, np.ndarray]:
+        """
+        Calendar positions where every ticker has a row
+
+        Returns:
+            A slice when the positions are contiguous (aligned reads are then
+            views of the mapped matrices), otherwise a boolean mask
+        """
+        rows = [self.tickers[t]['row'] for t in tickers]
+        start = int(max(self.first_valid[r] for r in rows))
+        stop = int(min(self.last_valid[r] for r in rows)) + 1
+        if start < 0 or stop <= start:
+            return slice(0, 0)
+
+        mask = np.ones(stop - start, dtype=bool)
+        for r in rows:
+            mask &= self.present[r, start:stop]
+        if mask.all():
+            return slice(start, stop)
+
+        full = np.zeros(len(self.calendar), dtype=bool)
+        full[start:stop] = mask
+        return full
+
+    def aligned(self, ticker: str, days: Union[slice, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        A ticker's raw (unfilled) field values on the selected calendar days
+
+        Args:
+            ticker: Ticker symbol
+            days: Slice or boolean mask from common_days()
+
+        Returns:
+            Dict of field -> float64 array (NaN where the ticker has no row or
+            no value could be repaired) plus the uint8 'quality' flags;
+            read-only views for a slice
+        """
+        row = self.tickers[ticker]['row']
+        columns = {field: matrix[row, days] for field, matrix in self.matrices.items()}
+        columns[QUALITY[0]] = self.quality[row, days]
+        return columns
+
+    def get_stats(self) -> Dict:
+        """Get store statistics"""
+        return {
+            'build': self.build_dir.name,
+            'tickers': len(self.tickers),
+            'days': len(self.calendar),
+            'fields': self.fields,
+            'built_at': self.built_at
+        }
+
+
+def _read_ticker(path: Path):
+    """Read and normalize one parquet file, returning (columns, raw start seconds)"""
+    import pandas as pd
+
+    df = read_price_parquet(path)
+    columns = normalize_price_frame(df)
+    raw = df['Date'] if 'Date' in df.columns else df.index.to_series()
+    raw = pd.to_datetime(raw)
+    start = int(raw.min().value // 10**9) if len(raw) else None
+    return columns, start
+
+
+def build_panel_store(parquet_dir: str, store_dir: Optional[str] = None) -> Path:
+    """
+    Compile every <TICKER>.parquet file into a new store build and activate it
+
+    Two passes keep memory flat: the first collects each ticker's days to form
+    the calendar, the second writes rows straight into the mapped matrices.
+    The new build is activated by atomically replacing CURRENT, so readers see
+    either the old or the new store; older builds are removed afterwards
+    (processes that mapped them keep their pages until they reopen).
+
+    Args:
+        parquet_dir: Directory of per-ticker parquet files
+        store_dir: Store directory (defaults to <parquet_dir>/../panel_store)
+
+    Returns:
+        Path of the activated build directory
+    """
+    import pandas as pd  # Only builds need pandas; readers stay light
+
+    parquet_dir = Path(parquet_dir)
+    root = Path(store_dir) if store_dir else default_store_dir(str(parquet_dir))
+    root.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+
+    paths = sorted(parquet_dir.glob('*.parquet'))
+    day_sets = []
+    for path in paths:
+        try:
+            try:
+                df = read_price_parquet(path, columns=['Date'])
+            except (KeyError, ValueError):
+                df = pd.read_parquet(path, engine='pyarrow')  # Date stored as the index
+            day_sets.append(normalize_price_frame(df)['time'])
+        except Exception as e:
+            print(f"[PanelStore] Skipping {path.stem}: {e}", file=sys.stderr)
+    calendar = np.unique(np.concatenate(day_sets)) if day_sets else np.zeros(0, dtype=np.int64)
+
+    build_dir = root / f"build-{int(started)}-{uuid.uuid4().hex[:8]}"
+    build_dir.mkdir()
+    n_tickers, n_days = len(paths), len(calendar)
+    fields = [key for key, _ in PRICE_FIELDS]
+    matrices = {
+        field: np.lib.format.open_memmap(str(build_dir / f'{field}.npy'), mode='w+',
+                                         dtype=np.float64, shape=(n_tickers, n_days))
+        for field in fields
+    }
+    present = np.lib.format.open_memmap(str(build_dir / 'present.npy'), mode='w+',
+                                        dtype=bool, shape=(n_tickers, n_days))
+    quality = np.lib.format.open_memmap(str(build_dir / f'{QUALITY[0]}.npy'), mode='w+',
+                                        dtype=QUALITY_DTYPE, shape=(n_tickers, n_days))
+    first_valid = np.full(n_tickers, -1, dtype=np.int32)
+    last_valid = np.full(n_tickers, -1, dtype=np.int32)
+
+    tickers = {}
+    for row, path in enumerate(paths):
+        for matrix in matrices.values():
+            matrix[row] = np.nan
+        quality[row] = QUALITY_MISSING
+        ticker = path.stem
+        version = parquet_data_version(path)
+        try:
+            columns, start = _read_ticker(path)
+        except Exception as e:
+            print(f"[PanelStore] Skipping {ticker}: {e}", file=sys.stderr)
+            continue
+
+        times = columns['time']
+        pos = np.searchsorted(calendar, times)
+        if len(times) and (pos[-1] >= n_days or not np.array_equal(calendar[pos], times)):
+            # File rewritten between the two passes: leave it out, readers use parquet
+            print(f"[PanelStore] Skipping {ticker}: changed during build", file=sys.stderr)
+            continue
+        if len(np.unique(times)) != len(times):
+            # Duplicate days cannot be represented in one row; readers use parquet
+            print(f"[PanelStore] Skipping {ticker}: duplicate dates", file=sys.stderr)
+            continue
+
+        for field in fields:
+            if field in columns:
+                matrices[field][row, pos] = columns[field]
+        quality[row, pos] = columns[QUALITY[0]]
+        present[row, pos] = True
+        if len(pos):
+            first_valid[row], last_valid[row] = pos[0], pos[-1]
+        tickers[ticker] = {'row': row, 'version': version, 'count': int(len(times)), 'start': start}
+
+    # Adjustment factors for the whole universe at once, blocks of tickers at a time
+    factors = np.lib.format.open_memmap(str(build_dir / f'{ADJ_FACTOR[0]}.npy'), mode='w+',
+                                        dtype=np.float64, shape=(n_tickers, n_days))
+    for start in range(0, n_tickers, FACTOR_BLOCK_ROWS):
+        block = slice(start, start + FACTOR_BLOCK_ROWS)
+        values = adjustment_factors(matrices['close'][block], matrices['adjClose'][block])
+        factors[block] = np.where(present[block], values, np.nan)
+
+    for matrix in list(matrices.values()) + [present, quality, factors]:
+        matrix.flush()
+    del matrices, present, quality, factors
+    np.save(build_dir / 'calendar.npy', calendar)
+    np.save(build_dir / 'first_valid.npy', first_valid)
+    np.save(build_dir / 'last_valid.npy', last_valid)
+    with open(build_dir / 'index.json', 'w') as f:
+        json.dump({'format': FORMAT_VERSION, 'built_at': started, 'fields': fields + [ADJ_FACTOR[0]],
+                   'tickers': tickers}, f)
+
+    # Activate the new build, then remove the old ones
+    tmp_current = root / f".CURRENT.{os.getpid()}.tmp"
+    tmp_current.write_text(build_dir.name)
+    os.replace(tmp_current, root / 'CURRENT')
+    for old in root.glob('build-*'):
+        if old != build_dir:
+            shutil.rmtree(old, ignore_errors=True)
+
+    print(f"[PanelStore] Built {len(tickers)}/{n_tickers} tickers x {n_days} days "
+          f"in {time.time() - started:.1f}s -> {build_dir}", file=sys.stderr)
+    return build_dir
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        build_panel_store(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+        sys.exit(0)
+
+    # Test build, aligned reads and version checks on a small gapped universe
+    import tempfile
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        parquet_dir = Path(tmp) / 'parquet'
+        parquet_dir.mkdir()
+        days = pd.bdate_range('1992-12-01', '1993-03-31')
+        pd.DataFrame({'Date': days, 'Close': np.arange(len(days), dtype=float),
+                      'Adj Close': np.arange(len(days), dtype=float) / 2,
+                      'Volume': 1e6}).to_parquet(parquet_dir / 'SPY.parquet')
+        gapped = days[days >= '1993-02-01'].delete([3])
+        pd.DataFrame({'Date': gapped, 'Close': np.arange(len(gapped), dtype=float) + 500,
+                      'Volume': 2e6}).to_parquet(parquet_dir / 'QQQ.parquet')
+
+        assert PanelStore.open(Path(tmp) / 'panel_store') is None, "Unbuilt store should not open"
+        build_panel_store(str(parquet_dir))
+        store = PanelStore.from_env(str(parquet_dir))
+        assert store is not None and set(store.tickers) == {'SPY', 'QQQ'}
+
+        spy_version = parquet_data_version(parquet_dir / 'SPY.parquet')
+        assert store.is_fresh('SPY', spy_version) and not store.is_fresh('SPY', 'stale')
+        assert store.start_date('SPY') == pd.Timestamp('1992-12-01'), "Start date is taken before the cutoff"
+        assert store.row_count('SPY') == len(days[days >= '1993-01-01'])
+
+        days_spy = store.common_days(['SPY'])
+        assert isinstance(days_spy, slice), "A gap-free ticker selects a contiguous range"
+        close = store.aligned('SPY', days_spy)['close']
+        assert not close.flags.writeable and close[0] == len(days[days < '1993-01-01'])
+        assert np.isnan(store.aligned('SPY', days_spy)['open']).all(), "Missing fields read as NaN"
+        assert (store.aligned('SPY', days_spy)['adjFactor'] == 0.5).all()
+
+        both = store.common_days(['SPY', 'QQQ'])
+        assert not isinstance(both, slice), "A gap inside the range needs a mask"
+        expected = (gapped.values.astype('datetime64[s]').astype(np.int64))
+        assert np.array_equal(store.calendar[both], expected)
+        assert np.array_equal(store.aligned('QQQ', both)['close'], np.arange(len(gapped), dtype=float) + 500)
+        assert (store.aligned('QQQ', both)['adjFactor'] == 1.0).all(), "No Adj Close: prices are already adjusted"
+        assert not store.aligned('QQQ', both)['quality'].any()
+        qqq = store.aligned('QQQ', days_spy)
+        assert (qqq['quality'][np.isnan(qqq['close'])] == QUALITY_MISSING).all(), "Days without a row are flagged"
+
+        first_build = store.build_dir
+        build_panel_store(str(parquet_dir))
+        assert not first_build.exists(), "Rebuild removes the previous build"
+
+    print(f"✓ Panel store test passed", file=sys.stderr)
+    print(f"  Stats: {store.get_stats()}", file=sys.stderr)
@@ -7,43 +7,62 @@ Pre-loads tickers and pre-computes indicators on startup for massive speedup
 
 import sys
 import json
+import time
+from typing import Dict, Optional, Set
 from backtester import Backtester
+from batch_optimizer import aligned_indicators, alignment_blocks, groups_from_json
 from optimized_dataloader import get_global_cache
-from indicator_cache import SharedIndicatorCache
-from shared_memory_manager import SharedPriceDataReader
+from result_cache import get_global_result_cache
+from memory_budget import get_global_memory_budget
+from data_refresh import DataRefresher
+from shared_memory_manager import SharedPriceDataReader, SharedArenaReader
+from worker_protocol import PROTOCOL_JSON, PROTOCOLS, WorkerChannel
 
-def main():
+
+class PersistentWorker:
     """
-    Persistent worker that processes multiple branches via stdin/stdout
-    Protocol: One JSON object per line (newline-delimited JSON)
+    Caches and shared state of one worker, and the request loop serving them
+
+    Construction loads everything that can be shared (imports, shared memory
+    attachments, pre-loaded tickers and indicators); start() opens what must
+    belong to one process (result store connection, data refresher). The zygote
+    (worker_zygote.py) constructs once and forks, each child calling start().
     """
-    # Read parquet directory from first line
-    try:
-        first_line = sys.stdin.readline()
-        if not first_line:
-            sys.exit(0)
 
-        config = json.loads(first_line)
-        parquet_dir = config.get('parquetDir')
+    def __init__(self, config: Dict):
+        """
+        Initialize worker caches from the pool's init message
+
+        Args:
+            config: Init message (parquetDir, preloadTickers, preloadGroups,
+                sharedMemoryMetadata, sharedIndicatorMetadata)
+        """
+        self.parquet_dir = config['parquetDir']
         preload_tickers = config.get('preloadTickers', [])
-        preload_indicators = config.get('preloadIndicators', {})
+        preload_groups = groups_from_json(config.get('preloadGroups'))
         shared_memory_metadata = config.get('sharedMemoryMetadata')
-
-        if not parquet_dir:
-            print(json.dumps({'error': 'Missing parquetDir'}), flush=True)
-            sys.exit(1)
+        shared_indicator_metadata = config.get('sharedIndicatorMetadata')
 
         # Initialize backtester ONCE (caches persist across branches)
-        backtester = Backtester(parquet_dir)
+        backtester = Backtester(self.parquet_dir)
+        self.backtester = backtester
+
+        # One byte budget across every in-process cache (PYWORKER_MEM_MB)
+        memory_budget = get_global_memory_budget()
+        memory_budget.register('prices', get_global_cache(self.parquet_dir))
+        memory_budget.register('indicators', backtester.indicator_cache)
+        memory_budget.register('panels', backtester.panel_cache)
+        memory_budget.register('signals', backtester.signal_cache)
+        self.memory_budget = memory_budget
 
         # OPTIMIZATION: Attach to shared memory if available (2-3x speedup)
         shared_memory_reader = None
         if shared_memory_metadata:
             try:
-                print(f"[Worker] Attaching to shared memory for {len(shared_memory_metadata)} tickers...", file=sys.stderr, flush=True)
+                print(f"[Worker] Attaching to shared memory for {len(shared_memory_metadata['tickers'])} tickers...", file=sys.stderr, flush=True)
                 shared_memory_reader = SharedPriceDataReader(shared_memory_metadata)
-                # Pre-load all tickers from shared memory
-                for ticker in shared_memory_metadata.keys():
+                # Pre-load all tickers from shared memory (views into one mapping)
+                for ticker in shared_memory_metadata['tickers'].keys():
                     shared_memory_reader.load_ticker(ticker)
                 print(f"[Worker] ✓ Attached to shared memory", file=sys.stderr, flush=True)
             except Exception as e:
@@ -53,101 +72,217 @@ def main():
         # Pass shared memory reader to backtester if available
         if shared_memory_reader:
             backtester.shared_memory_reader = shared_memory_reader
+        self.shared_memory_reader = shared_memory_reader
+
+        # OPTIMIZATION: Attach to the indicator arena built by BatchOptimizer (zero-copy, no recompute)
+        shared_indicator_reader = None
+        if shared_indicator_metadata and backtester.indicator_cache is not None:
+            try:
+                shared_indicator_reader = SharedArenaReader(shared_indicator_metadata)
+                backtester.indicator_cache.attach_shared(shared_indicator_reader)
+                print(f"[Worker] ✓ Attached to shared indicator arena ({len(shared_indicator_reader)} arrays)", file=sys.stderr, flush=True)
+            except Exception as e:
+                print(f"[Worker] Warning: Failed to attach to indicator arena: {e}", file=sys.stderr, flush=True)
+                shared_indicator_reader = None
+        self.shared_indicator_reader = shared_indicator_reader
 
         # OPTIMIZATION: Pre-load tickers and pre-compute indicators for massive speedup
-        if preload_tickers or preload_indicators:
+        if preload_tickers or preload_groups:
             print(f"[Worker] Pre-loading {len(preload_tickers)} tickers...", file=sys.stderr, flush=True)
 
             # Get global cache instance
-            cache = get_global_cache(parquet_dir)
+            cache = get_global_cache(self.parquet_dir)
 
-            # Pre-load all tickers into cache
-            for ticker in preload_tickers:
-                try:
-                    cache.get_ticker_data(ticker, limit=20000)
-                except Exception as e:
-                    print(f"[Worker] Warning: Failed to load {ticker}: {e}", file=sys.stderr, flush=True)
+            # Pre-load all tickers into cache (one parallel scan for every cold ticker)
+            cache.preload(preload_tickers)
 
             cache_stats = cache.get_cache_info()
             print(f"[Worker] ✓ Pre-loaded tickers. Cache: {cache_stats}", file=sys.stderr, flush=True)
 
-            # Pre-compute indicators if specified
-            if preload_indicators:
+            # Pre-compute indicators locally only when no shared arena is available
+            if preload_groups and shared_indicator_reader is None and backtester.indicator_cache is not None:
                 print(f"[Worker] Pre-computing indicators...", file=sys.stderr, flush=True)
 
-                # Create shared indicator cache
-                indicator_cache = SharedIndicatorCache()
-
-                # Build price data dict
-                price_data = {}
-                for ticker in preload_tickers:
+                # On each alignment group's aligned series (the keys branches look up),
+                # in ticker blocks: arrays beyond the memory budget spill to the
+                # indicator store instead of piling up in this process
+                for block, _ in alignment_blocks(preload_groups):
                     try:
-                        df = cache.get_ticker_data(ticker, limit=20000)
-                        if len(df) > 0 and 'Close' in df.columns:
-                            price_data[ticker] = df['Close'].values
+                        for _ in aligned_indicators(backtester, backtester.indicator_cache, block):
+                            pass
                     except Exception as e:
-                        print(f"[Worker] Warning: Failed to get prices for {ticker}: {e}", file=sys.stderr, flush=True)
-
-                # Pre-compute all indicators
-                indicator_cache.precompute_all(price_data, preload_indicators)
+                        print(f"[Worker] Warning: Failed to pre-compute a block: {e}", file=sys.stderr, flush=True)
+                    memory_budget.enforce()
 
-                stats = indicator_cache.get_stats()
+                stats = backtester.indicator_cache.get_stats()
                 print(f"[Worker] ✓ Pre-computed indicators. Stats: {stats}", file=sys.stderr, flush=True)
 
-        # Signal ready
-        print(json.dumps({'status': 'ready'}), flush=True)
+            memory_budget.enforce()
+
+        self.refresher = None
+        self.reported_warm = set()
+
+    def start(self):
+        """Open the per-process parts (call once in the process that serves branches)"""
+        # The result store holds a SQLite connection, which must not cross a fork
+        self.memory_budget.register('results', get_global_result_cache())
+
+        # Pick up tickers re-downloaded while the pool is running (DATA_REFRESH_SECONDS)
+        self.refresher = DataRefresher.from_env(self.backtester)
+        self.reported_warm = self.warm_tickers()
+
+    def warm_tickers(self) -> Set[str]:
+        """Tickers this worker holds prices or indicators for (the pool routes similar branches here)"""
+        warm = set(get_global_cache(self.parquet_dir).loaded_versions())
+        if self.backtester.indicator_cache is not None:
+            warm |= self.backtester.indicator_cache.cached_tickers()
+        return warm
+
+    def run_task(self, task: Dict) -> Dict:
+        """Run one branch, returning its result (with the warm set if it changed) or an error result"""
+        branch_id = task.get('branchId', 'unknown')
+        try:
+            tree = task.get('tree')
+            if not tree:
+                return {'error': 'Missing tree', 'branchId': branch_id}
+            if self.refresher:
+                self.refresher.check()
+            start = time.perf_counter()
+            # Copied first: the backtester may return the dict its result cache holds
+            result = dict(self.backtester.run_backtest(tree, task.get('options', {})))
+            self.memory_budget.enforce()
+
+            # Runtime refines the pool's cost model
+            result['branchId'] = branch_id
+            result['elapsedMs'] = round((time.perf_counter() - start) * 1000, 3)
+            warm = self.warm_tickers()
+            if warm != self.reported_warm:
+                self.reported_warm = warm
+                result['warmTickers'] = sorted(warm)
+            return result
+        except Exception as e:
+            return {'error': str(e), 'type': type(e).__name__, 'branchId': branch_id}
+
+    def shutdown(self, release_shared_memory: bool = False):
+        """
+        Log cache stats and detach from the shared memory arenas
+
+        Args:
+            release_shared_memory: Unlink the arenas (one worker does, once the batch is done)
+        """
+        backtester = self.backtester
+        try:
+            print(f"[Worker] Memory usage: {self.memory_budget.get_usage()}", file=sys.stderr, flush=True)
+            result_cache = get_global_result_cache()
+            stats = result_cache.get_stats()
+            print(f"[Worker] Result cache stats: {stats}", file=sys.stderr, flush=True)
+            if backtester.subtree_memo:
+                print(f"[Worker] Subtree memo stats: {backtester.subtree_memo.get_stats()}", file=sys.stderr, flush=True)
+            if backtester.panel_cache:
+                print(f"[Worker] Panel cache stats: {backtester.panel_cache.get_stats()}", file=sys.stderr, flush=True)
+            if backtester.signal_cache:
+                print(f"[Worker] Signal cache stats: {backtester.signal_cache.get_stats()}", file=sys.stderr, flush=True)
+            if backtester.precision_guard:
+                print(f"[Worker] Precision guard stats: {backtester.precision_guard.get_stats()}", file=sys.stderr, flush=True)
+            if self.refresher:
+                print(f"[Worker] Data refresh stats: {self.refresher.get_stats()}", file=sys.stderr, flush=True)
+        except:
+            pass
+
+        # Release the indicator arena (one worker unlinks it once the batch is done)
+        if self.shared_indicator_reader is not None:
+            try:
+                print(f"[Worker] Indicator cache stats: {backtester.indicator_cache.get_stats()}", file=sys.stderr, flush=True)
+                backtester.indicator_cache.attach_shared(None)
+                if release_shared_memory:
+                    self.shared_indicator_reader.unlink()
+                else:
+                    self.shared_indicator_reader.close()
+            except Exception:
+                pass
+
+        # Cleanup shared memory connections (one worker unlinks the arena)
+        if self.shared_memory_reader:
+            try:
+                backtester.shared_memory_reader = None
+                if release_shared_memory:
+                    self.shared_memory_reader.unlink()
+                else:
+                    self.shared_memory_reader.close()
+                print(f"[Worker] ✓ Closed shared memory connections", file=sys.stderr, flush=True)
+            except:
+                pass
+
+    def serve(self, channel: WorkerChannel, protocol: Optional[str]):
+        """
+        Signal ready, then answer requests until EOF or a shutdown command
+
+        Args:
+            channel: Channel the init message was read from
+            protocol: Protocol asked for in the init message
+        """
+        # Signal ready (in JSON) with the protocol every later message uses
+        if protocol not in PROTOCOLS:
+            protocol = PROTOCOL_JSON
+        print(json.dumps({'status': 'ready', 'protocol': protocol, 'warmTickers': sorted(self.reported_warm)}),
+              file=channel.stdout, flush=True)
+        channel.protocol = protocol
 
         # Process branches in a loop
         while True:
-            line = sys.stdin.readline()
-            if not line:
+            try:
+                task = channel.receive()
+            except ValueError as e:
+                channel.send({'error': str(e), 'type': type(e).__name__, 'branchId': 'unknown'})
+                continue
+            if task is None:
                 break  # EOF - shutdown
 
             try:
-                task = json.loads(line)
+                # Report memory usage per cache (answered in order with branch results)
+                if task.get('command') == 'memory':
+                    channel.send({'memory': self.memory_budget.get_usage()})
+                    continue
 
                 # Handle shutdown command
                 if task.get('command') == 'shutdown':
-                    # Print cache stats before shutdown
-                    try:
-                        from result_cache import get_global_result_cache
-                        result_cache = get_global_result_cache()
-                        stats = result_cache.get_stats()
-                        print(f"[Worker] Result cache stats: {stats}", file=sys.stderr, flush=True)
-                    except:
-                        pass
-
-                    # Cleanup shared memory connections
-                    if shared_memory_reader:
-                        try:
-                            shared_memory_reader.close()
-                            print(f"[Worker] ✓ Closed shared memory connections", file=sys.stderr, flush=True)
-                        except:
-                            pass
-
+                    self.shutdown(bool(task.get('releaseSharedMemory')))
                     break
 
-                # Run backtest
-                tree = task.get('tree')
-                options = task.get('options', {})
-                branch_id = task.get('branchId', 'unknown')
-
-                if not tree:
-                    result = {'error': 'Missing tree', 'branchId': branch_id}
-                else:
-                    result = backtester.run_backtest(tree, options)
-                    result['branchId'] = branch_id
-
-                # Output result
-                print(json.dumps(result), flush=True)
+                # Run backtests: a request carries one branch or a batch of them, one result each in order
+                for branch in task.get('tasks') or [task]:
+                    channel.send(self.run_task(branch))
 
             except Exception as e:
                 error_result = {
                     'error': str(e),
                     'type': type(e).__name__,
-                    'branchId': task.get('branchId', 'unknown') if 'task' in locals() else 'unknown'
+                    'branchId': task.get('branchId', 'unknown')
                 }
-                print(json.dumps(error_result), flush=True)
+                channel.send(error_result)
+
+
+def main():
+    """
+    Persistent worker that processes multiple branches via stdin/stdout
+    Protocol: JSON init line, then newline-delimited JSON or length-prefixed
+    binary frames as negotiated (see worker_protocol.py)
+    """
+    channel = WorkerChannel(sys.stdin.buffer, sys.stdout)
+
+    # Read parquet directory from first line
+    try:
+        config = channel.read_init()
+        if config is None:
+            sys.exit(0)
+
+        if not config.get('parquetDir'):
+            print(json.dumps({'error': 'Missing parquetDir'}), flush=True)
+            sys.exit(1)
+
+        worker = PersistentWorker(config)
+        worker.start()
+        worker.serve(channel, config.get('protocol', PROTOCOL_JSON))
 
     except Exception as e:
         print(json.dumps({'error': f'Worker initialization failed: {str(e)}'}), flush=True)
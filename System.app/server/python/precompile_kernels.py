@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Compile every Numba kernel into the on-disk cache (run at image build time)
+
+Kernels are declared with cache=True, so each compiled kernel is written next
+to its module (__pycache__) and later processes only load it. Compiling here
+keeps that ~1-2s out of the first worker or optimizer run after a deploy.
+Set NUMBA_CPU_NAME=generic when the image may run on a different CPU than
+the one that built it, or the cache is ignored there.
+
+Usage: python precompile_kernels.py
+"""
+
+import os
+import sys
+import time
+
+os.environ['PY_FAST_START'] = '0'  # Compile even if the environment asks for plain kernels
+
+from jit_kernels import NUMBA_AVAILABLE
+from optimized_indicators import warm_up_kernels as warm_up_indicator_kernels
+from optimized_metrics import warm_up_kernels as warm_up_metric_kernels
+
+
+def main():
+    if not NUMBA_AVAILABLE:
+        print(f"[Precompile] Numba not installed - kernels will run as plain Python", file=sys.stderr)
+        return
+
+    start = time.perf_counter()
+    warm_up_indicator_kernels()
+    warm_up_metric_kernels()
+    cpu = os.environ.get('NUMBA_CPU_NAME', 'host')
+    print(f"[Precompile] ✓ Kernels compiled for {cpu} CPU in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Data-quality scan applied once when price data is loaded or compiled
+Every bar gets a uint8 flag mask and every price field a repaired series, so
+backtests consume clean arrays instead of repairing each universe per request
+
+Repairs only ever carry the previous valid value forward: a bar is never
+filled from a later one (that would leak future prices into the past), so
+bars before a field's first valid value stay NaN and are flagged UNFILLED.
+"""
+
+import os
+import sys
+import numpy as np
+from typing import Dict, Tuple
+
+# Bar flags (combined per bar over all fields)
+QUALITY_MISSING = 1      # No value (NaN, or no row on an aligned date), previous value carried
+QUALITY_NONPOSITIVE = 2  # Zero or negative price, previous value carried
+QUALITY_SPIKE = 4        # One-bar spike that reverts on the next bar, previous value carried
+QUALITY_UNFILLED = 8     # Nothing to carry yet (before the first valid value), left NaN
+
+QUALITY_DTYPE = np.dtype(np.uint8)
+
+# Fields that must be positive; volume is only checked for missing values
+PRICE_KEYS = ('open', 'high', 'low', 'close', 'adjClose')
+SCANNED_KEYS = PRICE_KEYS + ('volume',)
+
+# A bar is a spike when it moves by more than this fraction (as a log ratio,
+# so up and down moves are symmetric) and the next bar returns to within a
+# quarter of it of the previous bar (override with PRICE_SPIKE_THRESHOLD, 0 disables)
+DEFAULT_SPIKE_THRESHOLD = float(os.environ.get('PRICE_SPIKE_THRESHOLD', '0.5'))
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """
+    Carry the last non-NaN value forward along the last axis
+
+    Args:
+        values: One series or a (tickers x days) matrix
+
+    Returns:
+        Filled array (the input itself if it has no NaN to fill); leading
+        NaNs stay NaN
+    """
+    valid = ~np.isnan(values)
+    if valid.all() or not valid.any():
+        return values
+    positions = np.where(valid, np.arange(values.shape[-1]), -1)
+    last = np.maximum.accumulate(positions, axis=-1)
+    filled = np.take_along_axis(values, np.maximum(last, 0), axis=-1)
+    filled[last < 0] = np.nan
+    return filled
+
+
+def spike_bars(values: np.ndarray, threshold: float = DEFAULT_SPIKE_THRESHOLD) -> np.ndarray:
+    """
+    Bars that jump away from both neighbours and straight back
+
+    Args:
+        values: Gap-free positive prices, one series or a (tickers x days) matrix
+        threshold: Minimum move as a fraction of the price (0 disables)
+
+    Returns:
+        Boolean array shaped like values (first and last bars are never spikes)
+    """
+    spikes = np.zeros(values.shape, dtype=bool)
+    if threshold <= 0 or values.shape[-1] < 3:
+        return spikes
+
+    limit = np.log1p(threshold)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs = np.log(values)
+    before, bar, after = logs[..., :-2], logs[..., 1:-1], logs[..., 2:]
+    with np.errstate(invalid='ignore'):
+        spikes[..., 1:-1] = ((np.abs(bar - before) > limit) & (np.abs(after - bar) > limit)
+                             & (np.abs(after - before) <= limit / 4))
+    return spikes
+
+
+def scan_prices(columns: Dict[str, np.ndarray],
+                threshold: float = DEFAULT_SPIKE_THRESHOLD) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Flag and repair the OHLCV fields of one ticker (or a matrix of tickers)
+
+    Args:
+        columns: Dict of field -> float64 array; fields other than
+            SCANNED_KEYS (e.g. 'time') are ignored
+        threshold: Spike threshold (see DEFAULT_SPIKE_THRESHOLD)
+
+    Returns:
+        (repaired, quality): repaired arrays for the scanned fields (unchanged
+        fields are returned as is) and the uint8 flag mask of every bar
+    """
+    scanned = [key for key in SCANNED_KEYS if key in columns]
+    quality = np.zeros(np.shape(columns[scanned[0]]) if scanned else (0,), dtype=QUALITY_DTYPE)
+    repaired = {}
+
+    for key in scanned:
+        values = np.asarray(columns[key], dtype=np.float64)
+        bad = np.isnan(values)
+        quality[bad] |= QUALITY_MISSING
+
+        if key in PRICE_KEYS:
+            with np.errstate(invalid='ignore'):
+                nonpositive = values <= 0
+            quality[nonpositive] |= QUALITY_NONPOSITIVE
+            bad |= nonpositive
+
+            spikes = spike_bars(forward_fill(np.where(bad, np.nan, values)), threshold) & ~bad
+            quality[spikes] |= QUALITY_SPIKE
+            bad |= spikes
+
+        if bad.any():
+            values = forward_fill(np.where(bad, np.nan, values))
+            quality[np.isnan(values)] |= QUALITY_UNFILLED
+        repaired[key] = values
+
+    return repaired, quality
+
+
+def quality_counts(quality: np.ndarray) -> Dict[str, int]:
+    """Number of bars carrying each flag (flags that never occur are left out)"""
+    names = (('missing', QUALITY_MISSING), ('nonpositive', QUALITY_NONPOSITIVE),
+             ('spike', QUALITY_SPIKE), ('unfilled', QUALITY_UNFILLED))
+    counts = {name: int(np.count_nonzero(quality & flag)) for name, flag in names}
+    return {name: count for name, count in counts.items() if count}
+
+
+if __name__ == '__main__':
+    # Test gap, zero-price and spike repair without look-ahead
+    close = np.array([np.nan, 10.0, 10.5, np.nan, 0.0, 11.0, 55.0, 11.2, 11.1, 30.0, 31.0])
+    volume = np.array([1.0, np.nan, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0, 11.0])
+    repaired, quality = scan_prices({'time': np.arange(len(close)), 'close': close, 'volume': volume})
+
+    assert 'time' not in repaired
+    assert np.isnan(repaired['close'][0]), "Leading gaps are never filled from later bars"
+    assert quality[0] == QUALITY_MISSING | QUALITY_UNFILLED
+    assert repaired['close'][3] == 10.5 and quality[3] == QUALITY_MISSING
+    assert repaired['close'][4] == 10.5 and quality[4] == QUALITY_NONPOSITIVE
+    assert repaired['close'][6] == 11.0 and quality[6] == QUALITY_SPIKE, "One-bar spike is replaced"
+    assert repaired['close'][9] == 30.0 and quality[9] == 0, "A lasting jump is not a spike"
+    assert repaired['volume'][1] == 1.0 and quality[1] == QUALITY_MISSING
+    assert quality_counts(quality) == {'missing': 3, 'nonpositive': 1, 'spike': 1, 'unfilled': 1}
+
+    # Matrices are scanned row by row in one pass
+    matrix = np.vstack([close, np.linspace(1.0, 2.0, len(close))])
+    rows, flags = scan_prices({'close': matrix})
+    assert np.array_equal(rows['close'][0], repaired['close'], equal_nan=True)
+    assert np.array_equal(rows['close'][1], matrix[1]) and not flags[1].any()
+
+    clean = {'close': np.linspace(1.0, 2.0, 5)}
+    assert scan_prices(clean)[0]['close'] is clean['close'], "Clean series are not copied"
+
+    print(f"✓ Price quality test passed", file=sys.stderr)
+    print(f"  Counts: {quality_counts(quality)}", file=sys.stderr)
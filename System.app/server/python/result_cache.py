@@ -4,8 +4,24 @@ Caches backtest results to avoid re-computing identical trees/parameters
 """
 
 import json
+import time
 import hashlib
-from typing import Dict, Optional, Any
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Any
+from tree_hash import tree_hash as compute_tree_hash
+
+# Approximate in-memory size of result parts (measured with tracemalloc on CPython 3.11):
+# an equity point is a [int, float] list, an allocation a small {ticker: weight} dict
+RESULT_BASE_BYTES = 4096
+EQUITY_POINT_BYTES = 136
+ALLOCATION_BYTES = 290
+
+
+def estimate_result_bytes(result: Dict) -> int:
+    """Approximate memory held by a backtest result (walking it would cost more than it saves)"""
+    return (RESULT_BASE_BYTES
+            + len(result.get('equityCurve') or ()) * EQUITY_POINT_BYTES
+            + len(result.get('allocations') or ()) * ALLOCATION_BYTES)
 
 
 class ResultCache:
@@ -16,127 +32,106 @@ class ResultCache:
     - Same tree structure tested multiple times
     - Parameter optimization generates duplicate combinations
     - Rolling optimizations repeat trees across time periods
+
+    Entries remember the data version they were computed on and are kept in
+    LRU order. An optional ResultStore adds a persistent tier shared by all
+    workers, so results also survive worker restarts.
     """
 
-    def __init__(self, max_size: int = 10000):
-        self.cache: Dict[str, Dict] = {}
+    def __init__(self, max_size: int = 10000, store=None):
+        """
+        Initialize result cache
+
+        Args:
+            max_size: Maximum number of results kept in memory
+            store: Optional ResultStore used as a persistent second tier
+        """
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()  # {hash: (data_version, result)}
+        self.sizes: Dict[str, int] = {}  # Estimated bytes of each entry
+        self.tickers: Dict[str, frozenset] = {}  # Tickers each entry was computed from (if known)
+        self.last_used: Dict[str, float] = {}
+        self.current_bytes = 0
         self.max_size = max_size
+        self.store = store
         self.hits = 0
         self.misses = 0
+        self.store_hits = 0
 
-    def _normalize_tree(self, tree: Dict) -> Dict:
-        """
-        Normalize tree by removing noise (IDs, titles, timestamps)
-        Keep only fields that affect backtest results
-        """
-        if not isinstance(tree, dict):
-            return tree
-
-        # Fields that affect backtest results
-        keep_fields = {
-            'kind', 'weighting', 'conditions', 'positions', 'positionMode',
-            'metric', 'window', 'bottom', 'rank', 'quantifier', 'n', 'items',
-            'scaleMetric', 'scaleWindow', 'scaleTicker', 'scaleFrom', 'scaleTo',
-            'entryConditions', 'exitConditions', 'children'
-        }
-
-        normalized = {}
-
-        for key, value in tree.items():
-            if key not in keep_fields:
-                continue
-
-            if key == 'children' and isinstance(value, dict):
-                # Normalize children recursively
-                normalized['children'] = {
-                    slot: [self._normalize_tree(child) if child else None for child in children]
-                    if isinstance(children, list) else self._normalize_tree(children)
-                    for slot, children in value.items()
-                }
-            elif key == 'conditions' and isinstance(value, list):
-                # Normalize conditions (keep only backtest-relevant fields)
-                normalized['conditions'] = [
-                    {
-                        'metric': c.get('metric'),
-                        'window': c.get('window'),
-                        'ticker': c.get('ticker'),
-                        'comparator': c.get('comparator'),
-                        'threshold': c.get('threshold'),
-                        'rightMetric': c.get('rightMetric'),
-                        'rightWindow': c.get('rightWindow'),
-                        'rightTicker': c.get('rightTicker'),
-                        'type': c.get('type')
-                    }
-                    for c in value
-                ]
-            elif key == 'items' and isinstance(value, list):
-                # Normalize numbered block items
-                normalized['items'] = [
-                    {
-                        'conditions': [
-                            {
-                                'metric': c.get('metric'),
-                                'window': c.get('window'),
-                                'ticker': c.get('ticker'),
-                                'comparator': c.get('comparator'),
-                                'threshold': c.get('threshold'),
-                                'type': c.get('type')
-                            }
-                            for c in item.get('conditions', [])
-                        ]
-                    }
-                    for item in value
-                ]
-            else:
-                normalized[key] = value
-
-        return normalized
-
-    def _compute_hash(self, tree: Dict, options: Dict) -> str:
+    def _compute_hash(self, tree: Dict, options: Dict, tree_hash: Optional[str] = None) -> str:
         """
         Compute stable hash of tree + options
 
-        Uses SHA256 for collision resistance
+        The tree part is the root's Merkle hash (see tree_hash.py), which
+        ignores ids, titles and other UI-only fields.
+
+        Args:
+            tree: Tree structure
+            options: Backtest options
+            tree_hash: Precomputed structural hash of the tree, if available
         """
-        # Normalize tree to remove noise
-        normalized_tree = self._normalize_tree(tree)
+        if tree_hash is None:
+            tree_hash = compute_tree_hash(tree)
 
         # Normalize options (only backtest-affecting fields)
+        split_config = options.get('splitConfig') or {}
         normalized_options = {
             'mode': options.get('mode'),
             'costBps': options.get('costBps'),
             'splitConfig': {
-                'strategy': options.get('splitConfig', {}).get('strategy'),
-                'oosStartDate': options.get('splitConfig', {}).get('oosStartDate')
+                'enabled': split_config.get('enabled'),
+                'strategy': split_config.get('strategy'),
+                'chronologicalDate': split_config.get('chronologicalDate'),
+                'chronologicalPercent': split_config.get('chronologicalPercent'),
+                'oosStartDate': split_config.get('oosStartDate')
             }
         }
 
         # Create canonical JSON (sorted keys for stability)
         canonical = json.dumps({
-            'tree': normalized_tree,
+            'tree': tree_hash,
             'options': normalized_options
         }, sort_keys=True, separators=(',', ':'))
 
         # Hash using SHA256
         return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]  # First 16 chars
 
-    def get(self, tree: Dict, options: Dict) -> Optional[Dict]:
+    def get(self, tree: Dict, options: Dict, data_version: str = '', tree_hash: Optional[str] = None,
+            tickers: Optional[Iterable[str]] = None) -> Optional[Dict]:
         """
         Get cached result if exists
 
+        Args:
+            tree: Tree structure
+            options: Backtest options
+            data_version: Version of the ticker data the tree would run on
+            tree_hash: Precomputed structural hash of the tree, if available
+            tickers: Tickers the tree reads (recorded for a result loaded from the store)
+
         Returns:
-            Cached result dict or None if not found
+            Cached result dict or None if not found (or computed on other data)
         """
-        cache_key = self._compute_hash(tree, options)
+        cache_key = self._compute_hash(tree, options, tree_hash)
 
-        if cache_key in self.cache:
+        entry = self.cache.get(cache_key)
+        if entry is not None and entry[0] == data_version:
             self.hits += 1
-            return self.cache[cache_key]
+            self.cache.move_to_end(cache_key)
+            self.last_used[cache_key] = time.monotonic()
+            return entry[1]
+
+        # Second tier: results written by any worker (or a previous run)
+        if self.store is not None:
+            result = self.store.get(cache_key, data_version)
+            if result is not None:
+                self.store_hits += 1
+                self._remember(cache_key, data_version, result, tickers)
+                return result
 
         self.misses += 1
         return None
 
-    def set(self, tree: Dict, options: Dict, result: Dict) -> None:
+    def set(self, tree: Dict, options: Dict, result: Dict, data_version: str = '',
+            tree_hash: Optional[str] = None, tickers: Optional[Iterable[str]] = None) -> None:
         """
         Cache a result
 
@@ -144,35 +139,103 @@ class ResultCache:
             tree: Tree structure
             options: Backtest options
             result: Backtest result to cache
+            data_version: Version of the ticker data the result was computed on
+            tree_hash: Precomputed structural hash of the tree, if available
+            tickers: Tickers the result was computed from (see invalidate_tickers)
+        """
+        cache_key = self._compute_hash(tree, options, tree_hash)
+        self._remember(cache_key, data_version, result, tickers)
+
+        if self.store is not None:
+            self.store.put(cache_key, data_version, result)
+
+    def _remember(self, cache_key: str, data_version: str, result: Dict,
+                  tickers: Optional[Iterable[str]] = None) -> None:
+        """Insert into the in-memory tier, evicting the least recently used entry"""
+        self.cache[cache_key] = (data_version, result)
+        if tickers is not None:
+            self.tickers[cache_key] = frozenset(tickers)
+        else:
+            self.tickers.pop(cache_key, None)
+        self.cache.move_to_end(cache_key)
+        self.last_used[cache_key] = time.monotonic()
+
+        size = estimate_result_bytes(result)
+        self.current_bytes += size - self.sizes.get(cache_key, 0)
+        self.sizes[cache_key] = size
+
+        while len(self.cache) > self.max_size:
+            self.evict_lru()
+
+    def invalidate_tickers(self, tickers: Set[str]) -> int:
         """
-        cache_key = self._compute_hash(tree, options)
+        Drop the in-memory results computed from any of the given tickers
 
-        # Evict oldest entry if cache is full (simple FIFO)
-        if len(self.cache) >= self.max_size:
-            # Remove first key (oldest)
-            first_key = next(iter(self.cache))
-            del self.cache[first_key]
+        Such results can no longer be served (their data version is outdated)
+        and would only hold memory until evicted. The persistent store is left
+        alone: its entries are checked against the data version on every read.
 
-        self.cache[cache_key] = result
+        Returns:
+            Estimated bytes freed
+        """
+        freed = 0
+        for key in [k for k, used in self.tickers.items() if not used.isdisjoint(tickers)]:
+            del self.cache[key]
+            del self.tickers[key]
+            self.last_used.pop(key, None)
+            freed += self.sizes.pop(key, 0)
+        self.current_bytes -= freed
+        return freed
 
     def clear(self) -> None:
         """Clear all cached results"""
         self.cache.clear()
+        self.tickers.clear()
+        self.sizes.clear()
+        self.last_used.clear()
+        self.current_bytes = 0
         self.hits = 0
         self.misses = 0
+        self.store_hits = 0
+
+    # Memory budget protocol (see memory_budget.py)
+
+    def memory_bytes(self) -> int:
+        return self.current_bytes
+
+    def memory_entries(self) -> int:
+        return len(self.cache)
+
+    def lru_last_used(self) -> Optional[float]:
+        return self.last_used[next(iter(self.cache))] if self.cache else None
+
+    def evict_lru(self) -> int:
+        """Drop the least recently used result, return estimated bytes freed"""
+        key, _ = self.cache.popitem(last=False)
+        self.last_used.pop(key, None)
+        self.tickers.pop(key, None)
+        size = self.sizes.pop(key, 0)
+        self.current_bytes -= size
+        return size
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        total = self.hits + self.misses
-        hit_rate = (self.hits / total * 100) if total > 0 else 0
+        hits = self.hits + self.store_hits
+        total = hits + self.misses
+        hit_rate = (hits / total * 100) if total > 0 else 0
 
-        return {
+        stats = {
             'size': len(self.cache),
             'hits': self.hits,
+            'store_hits': self.store_hits,
             'misses': self.misses,
             'hit_rate': hit_rate,
+            'bytes': self.current_bytes,
             'max_size': self.max_size
         }
+        if self.store is not None:
+            stats['store'] = self.store.get_stats()
+        return stats
 
 
 # Global cache instance (shared across all backtests in a worker)
@@ -180,10 +243,11 @@ _global_result_cache = None
 
 
 def get_global_result_cache(max_size: int = 10000) -> ResultCache:
-    """Get or create global result cache"""
+    """Get or create global result cache (backed by the shared on-disk result store)"""
     global _global_result_cache
     if _global_result_cache is None:
-        _global_result_cache = ResultCache(max_size)
+        from result_store import ResultStore
+        _global_result_cache = ResultCache(max_size, store=ResultStore.from_env())
     return _global_result_cache
 
 
@@ -292,3 +356,27 @@ if __name__ == '__main__':
     print(f"✓ Result cache test passed", file=sys.stderr)
     print(f"  Stats: {stats}", file=sys.stderr)
     print(f"  Expected: 2 hits, 1 miss", file=sys.stderr)
+
+    # Data version: a result computed on other data must not be served
+    assert cache.get(tree1, options, data_version='new-data') is None, "Should miss for new data version"
+
+    # Re-downloaded tickers: only results computed from them are dropped
+    cache.set(tree3, options, result1, data_version='v1', tickers={'SPY', 'XLU'})
+    assert cache.invalidate_tickers({'QQQ'}) == 0
+    assert cache.invalidate_tickers({'XLU'}) > 0 and cache.get(tree3, options, data_version='v1') is None
+    assert cache.get(tree1, options) == result1, "Results without ticker info are kept"
+
+    # Persistent tier: a fresh cache (another worker / restart) hits the store
+    import os
+    import tempfile
+    from result_store import ResultStore
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'result_store.db')
+        ResultCache(store=ResultStore(db_path)).set(tree1, options, result1, data_version='v1')
+
+        restarted = ResultCache(store=ResultStore(db_path))
+        assert restarted.get(tree2, options, data_version='v1') == result1, "Should hit persistent store"
+        assert restarted.get(tree2, options, data_version='v1') == result1 and restarted.hits == 1, "Then memory"
+        assert restarted.get(tree1, options, data_version='v2') is None, "Store must invalidate on new data"
+        print(f"✓ Persistent result store tier verified", file=sys.stderr)
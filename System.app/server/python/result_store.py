@@ -0,0 +1,265 @@
+"""
+Persistent backtest result store backed by SQLite
+Shared by every Python worker (WAL mode) and kept across restarts, so re-running
+a Forge job or rolling optimization on unchanged data skips identical backtests
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+# Bump when the tree hash or result format changes (old rows are then ignored)
+STORE_FORMAT = 2
+
+# Defaults (override with RESULT_STORE_MB / RESULT_STORE_TTL_DAYS)
+DEFAULT_MAX_BYTES = int(os.environ.get('RESULT_STORE_MB', '512')) * 1024 * 1024
+DEFAULT_TTL_SECONDS = float(os.environ.get('RESULT_STORE_TTL_DAYS', '30')) * 86400
+
+# Same directory as the Node backtest_cache.db
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / 'data' / 'result_store.db'
+
+# Run eviction after this many writes (keeps puts cheap)
+EVICT_INTERVAL = 500
+
+# Refresh a row's access time at most this often (avoids a write per hit)
+TOUCH_INTERVAL = 3600
+
+
+class ResultStore:
+    """
+    SQLite table of compressed backtest results
+
+    Rows are keyed by the ResultCache tree+options hash and remember the data
+    version of the tickers they were computed on; a lookup with a different
+    version deletes the row, so results are invalidated automatically when
+    ticker data is re-downloaded. Rows expire after a TTL and the least
+    recently used rows are evicted once payloads exceed max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        Open (or create) the result store
+
+        Args:
+            path: SQLite database file
+            max_bytes: Maximum total size of compressed payloads
+            ttl_seconds: Rows not accessed for this long are removed
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                data_version TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_results_accessed_at ON results(accessed_at)')
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.writes = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['ResultStore']:
+        """
+        Create the store configured for this process
+
+        RESULT_STORE=0 disables it; RESULT_STORE_PATH overrides the default
+        location (server/data/result_store.db).
+
+        Returns:
+            ResultStore, or None if disabled or the database cannot be opened
+        """
+        if os.environ.get('RESULT_STORE', '1') == '0':
+            return None
+
+        path = os.environ.get('RESULT_STORE_PATH') or str(DEFAULT_PATH)
+        try:
+            return cls(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[ResultStore] Disabled, cannot use {path}: {e}", file=sys.stderr)
+            return None
+
+    def _key(self, cache_key: str) -> str:
+        return f"{STORE_FORMAT}:{cache_key}"
+
+    def get(self, cache_key: str, data_version: str) -> Optional[Dict]:
+        """
+        Look up a stored result
+
+        Args:
+            cache_key: ResultCache hash of tree + options
+            data_version: Version of the ticker data the caller would backtest on
+
+        Returns:
+            Result dict, or None if missing, expired or computed on other data
+        """
+        key = self._key(cache_key)
+        try:
+            row = self.conn.execute(
+                'SELECT data_version, payload, accessed_at FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            stored_version, payload, accessed_at = row
+            now = time.time()
+            if stored_version != data_version or now - accessed_at > self.ttl_seconds:
+                # Ticker data changed (or row expired): the stored result is stale
+                self.conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                self.invalidated += 1
+                self.misses += 1
+                return None
+
+            if now - accessed_at > TOUCH_INTERVAL:
+                self.conn.execute('UPDATE results SET accessed_at = ? WHERE key = ?', (now, key))
+
+            result = json.loads(zlib.decompress(payload))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            print(f"[ResultStore] Warning: Lookup failed: {e}", file=sys.stderr)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, cache_key: str, data_version: str, result: Dict) -> bool:
+        """
+        Store a result (replaces any previous row for the key)
+
+        Args:
+            cache_key: ResultCache hash of tree + options
+            data_version: Version of the ticker data the result was computed on
+            result: Backtest result (JSON-serializable)
+
+        Returns:
+            True if stored
+        """
+        try:
+            payload = zlib.compress(json.dumps(result, separators=(',', ':')).encode('utf-8'), 6)
+            now = time.time()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (key, data_version, payload, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self._key(cache_key), data_version, payload, len(payload), now, now)
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"[ResultStore] Warning: Failed to store result: {e}", file=sys.stderr)
+            return False
+
+        self.writes += 1
+        if self.writes % EVICT_INTERVAL == 0:
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        """
+        Remove expired rows, then least recently used rows over the byte budget
+
+        Returns:
+            Number of rows removed
+        """
+        removed = 0
+        try:
+            cutoff = time.time() - self.ttl_seconds
+            removed += self.conn.execute('DELETE FROM results WHERE accessed_at < ?', (cutoff,)).rowcount
+
+            total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                # Drop oldest-accessed rows until ~10% under budget (avoids evicting on every put)
+                excess = total - int(self.max_bytes * 0.9)
+                freed = 0
+                stale_keys = []
+                for key, size in self.conn.execute('SELECT key, size FROM results ORDER BY accessed_at'):
+                    stale_keys.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                self.conn.executemany('DELETE FROM results WHERE key = ?', stale_keys)
+                removed += len(stale_keys)
+        except sqlite3.Error as e:
+            print(f"[ResultStore] Warning: Eviction failed: {e}", file=sys.stderr)
+
+        self.evicted += removed
+        return removed
+
+    def clear(self):
+        """Remove all stored results"""
+        self.conn.execute('DELETE FROM results')
+
+    def close(self):
+        """Close the database connection"""
+        try:
+            self.conn.close()
+        except sqlite3.Error:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        try:
+            rows, total = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        except sqlite3.Error:
+            rows, total = None, None
+
+        return {
+            'path': str(self.path),
+            'rows': rows,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidated': self.invalidated,
+            'writes': self.writes,
+            'evicted': self.evicted
+        }
+
+
+if __name__ == '__main__':
+    # Test persistence, data-version invalidation and LRU eviction
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'result_store.db')
+        result = {'metrics': {'cagr': 0.12, 'sharpe': 1.5}, 'equityCurve': [[1, 10000.0]] * 200}
+
+        store = ResultStore(db_path)
+        assert store.get('abc', 'v1') is None, "Empty store should miss"
+        assert store.put('abc', 'v1', result)
+        store.close()
+
+        # Another process (or a restart) sees the same row
+        store = ResultStore(db_path)
+        assert store.get('abc', 'v1') == result, "Result should survive reopen"
+        assert store.get('abc', 'v2') is None, "New data version should invalidate"
+        assert store.get('abc', 'v1') is None, "Invalidated row should be gone"
+
+        # Byte budget: oldest-accessed rows are evicted first
+        store.put('old', 'v1', result)
+        store.conn.execute('UPDATE results SET accessed_at = accessed_at - 100 WHERE key = ?', (store._key('old'),))
+        store.put('new', 'v1', result)
+        store.max_bytes = store.get_stats()['bytes'] - 1
+        assert store.evict() == 1, "Should evict one row"
+        assert store.get('old', 'v1') is None and store.get('new', 'v1') == result, "LRU row evicted"
+
+        print(f"✓ Result store test passed", file=sys.stderr)
+        print(f"  Stats: {store.get_stats()}", file=sys.stderr)
+        store.close()
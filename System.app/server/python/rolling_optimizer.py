@@ -21,6 +21,8 @@ import pandas as pd
 import numpy as np
 
 from optimized_dataloader import get_global_cache
+from panel_store import PanelStore
+from ticker_catalog import TickerCatalog
 
 
 class RollingOptimizer:
@@ -31,6 +33,8 @@ class RollingOptimizer:
     def __init__(self, parquet_dir: str):
         self.parquet_dir = Path(parquet_dir)
         self.cache = get_global_cache(str(parquet_dir))
+        self.panel_store = PanelStore.from_env(str(parquet_dir))
+        self.catalog = TickerCatalog.from_env(str(parquet_dir))
 
     def get_ticker_start_date(self, ticker: str) -> Optional[datetime]:
         """
@@ -42,14 +46,26 @@ class RollingOptimizer:
         Returns:
             First date as datetime, or None if ticker doesn't exist
         """
+        # Ticker catalog answers from _catalog.json (stale entries re-read only the Date column)
+        if self.catalog is not None:
+            try:
+                return self.catalog.start_date(ticker)
+            except Exception as e:
+                print(f"[RollingOptimizer] Warning: Catalog lookup failed for {ticker}: {e}", file=sys.stderr)
+
+        # Compiled panel store records each file's first date (no parquet read)
+        if self.panel_store is not None and self.panel_store.is_fresh(ticker, self.cache.get_data_version(ticker)):
+            return self.panel_store.start_date(ticker)
+
         try:
             # Load ticker data
             df = self.cache._load_parquet_cached(ticker)
             if len(df) == 0:
                 return None
 
-            # Get first date from index
-            first_date = pd.to_datetime(df.index[0])
+            # Get first date (Date column, or the index for files stored with a Date index)
+            dates = df['Date'] if 'Date' in df.columns else df.index.to_series()
+            first_date = pd.to_datetime(dates).min()
             return first_date
 
         except Exception as e:
@@ -95,6 +111,10 @@ class RollingOptimizer:
                 print(f"[RollingOptimizer]   ✗ {ticker}: Start date {start_date.strftime('%Y-%m-%d')} is after {min_start_year}", file=sys.stderr)
                 excluded_count += 1
 
+        # Persist entries rebuilt for new or re-downloaded files
+        if self.catalog is not None:
+            self.catalog.save()
+
         print(f"[RollingOptimizer] Result: {len(valid_tickers)} valid tickers, {excluded_count} excluded", file=sys.stderr)
 
         return valid_tickers, ticker_start_dates
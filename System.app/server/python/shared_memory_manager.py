@@ -1,29 +1,200 @@
 """
 Shared memory manager for zero-copy price data sharing across worker processes
 Provides 2-3x speedup by avoiding duplicate memory copies
+
+All arrays live in a few large arenas (one SharedMemory segment each) described
+by a compact offset index, so a worker attaches with one mmap per arena instead
+of one per ticker column. Segments are named qn_<ownerPid>_<kind>_<token>:
+sweep_stale_segments() removes any whose owner process is gone.
 """
 
+import os
+import re
 import sys
+import uuid
 import numpy as np
 from multiprocessing import shared_memory
 from typing import Dict, List, Tuple, Optional
 
+from compact_mode import COMPACT_ENABLED, COMPACT_DTYPE, DAY_DTYPE, to_day_index, from_day_index
+
+# Arena entries start on cache-line boundaries so views are aligned for SIMD loads
+ARENA_ALIGNMENT = 64
+
+# Where POSIX shared memory segments are visible as files (Linux)
+SHM_DIR = '/dev/shm'
+SEGMENT_PATTERN = re.compile(r'^qn_(\d+)_')
+
+# Price columns shared per ticker: (metadata name, DataFrame column, dtype)
+PRICE_COLUMNS = (
+    ('open', 'Open', 'float64'),
+    ('high', 'High', 'float64'),
+    ('low', 'Low', 'float64'),
+    ('close', 'Close', 'float64'),
+    ('adjClose', 'Adj Close', 'float64'),
+    ('volume', 'Volume', 'float64'),
+    ('adjFactor', 'Adj Factor', 'float64'),
+    ('dates', None, 'int64'),
+    ('quality', 'Quality', 'uint8'),
+)
+
+# Column dtypes of a compact arena (float32 prices, int32 day indices, quality flags as is)
+COMPACT_COLUMN_DTYPES = {
+    name: (str(DAY_DTYPE) if name == 'dates' else dtype if name == 'quality' else str(COMPACT_DTYPE))
+    for name, _, dtype in PRICE_COLUMNS
+}
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the arena alignment"""
+    return -(-offset // ARENA_ALIGNMENT) * ARENA_ALIGNMENT
+
+
+def _untrack(shm: shared_memory.SharedMemory):
+    """
+    Stop this process's resource_tracker from unlinking a segment at exit
+
+    Arena segments outlive the process that builds them (batch_optimizer.py
+    exits before the workers attach), and on Python < 3.13 merely attaching
+    registers the segment too, so the first worker to exit would destroy it.
+    """
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    """Unlink an untracked segment (unlink() unregisters, so register it first)"""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    shm.unlink()
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process id is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by another user
+    except OSError:
+        return True  # Unknown platform behaviour - never sweep on doubt
+    return True
+
+
+def create_segment(kind: str, size: int, owner_pid: Optional[int] = None) -> shared_memory.SharedMemory:
+    """
+    Create a named segment for an arena
+
+    The segment stays registered with this process's resource_tracker, so it is
+    removed automatically if the creator dies before handing it off with
+    release_segment().
+
+    Args:
+        kind: Short label embedded in the name (e.g. 'px', 'ind')
+        size: Size in bytes
+        owner_pid: Long-lived process that owns the segment (defaults to this process)
+
+    Returns:
+        SharedMemory segment
+
+    Raises:
+        MemoryError: If /dev/shm does not have room for the segment
+    """
+    if os.path.isdir(SHM_DIR):
+        # Writing past the tmpfs limit raises SIGBUS instead of an error, so check first
+        st = os.statvfs(SHM_DIR)
+        free = st.f_bavail * st.f_frsize
+        if size > free:
+            raise MemoryError(f"Shared memory arena needs {size / 1024 / 1024:.1f} MB, "
+                              f"only {free / 1024 / 1024:.1f} MB free in {SHM_DIR}")
+
+    name = f"qn_{owner_pid or os.getpid()}_{kind}_{uuid.uuid4().hex[:10]}"
+    return shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+
+
+def release_segment(shm: shared_memory.SharedMemory):
+    """Hand a segment off to its readers: stop tracking it and close the local mapping"""
+    _untrack(shm)
+    try:
+        shm.close()
+    except Exception as e:
+        print(f"[SharedMemory] Warning: Failed to close {shm.name}: {e}", file=sys.stderr)
+
+
+def unlink_shared_segment(name: str) -> bool:
+    """
+    Remove a named shared memory segment without mapping it
+
+    Returns:
+        True if the segment existed and was removed
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    _untrack(shm)
+    shm.close()
+    try:
+        _unlink(shm)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def sweep_stale_segments() -> int:
+    """
+    Unlink arenas whose owner process no longer exists
+
+    Covers owners that crashed or were killed before their workers released
+    the arenas. Only supported where segments are listed under /dev/shm.
+
+    Returns:
+        Number of segments removed
+    """
+    if not os.path.isdir(SHM_DIR):
+        return 0
+
+    removed = 0
+    for name in os.listdir(SHM_DIR):
+        match = SEGMENT_PATTERN.match(name)
+        if not match or _pid_alive(int(match.group(1))):
+            continue
+        if unlink_shared_segment(name):
+            removed += 1
+
+    if removed:
+        print(f"[SharedMemory] Removed {removed} stale segments", file=sys.stderr, flush=True)
+    return removed
+
 
 class SharedPriceData:
     """
-    Manages shared memory blocks for price data across worker processes
+    Packs every ticker's OHLCV columns into one shared memory arena
 
-    Each ticker's OHLCV data is stored in a shared memory block
-    Workers can read from these blocks without copying data
+    Columns of a ticker are stored back to back as fixed-dtype arrays of the
+    same length, so the index needs only [offset, length, column mask, data
+    version] per ticker. Workers can read from the arena without copying data.
+    A compact arena stores float32 prices and int32 day indices instead.
     """
 
-    def __init__(self):
-        self.shm_blocks: Dict[str, shared_memory.SharedMemory] = {}
-        self.ticker_metadata: Dict[str, Dict] = {}  # {ticker: {shape, dtype, columns}}
+    def __init__(self, owner_pid: Optional[int] = None, compact: bool = COMPACT_ENABLED):
+        self.owner_pid = owner_pid
+        self.dtypes = COMPACT_COLUMN_DTYPES if compact else {name: dtype for name, _, dtype in PRICE_COLUMNS}
+        self.pending: Dict[str, Dict[str, np.ndarray]] = {}
+        self.versions: Dict[str, Optional[str]] = {}
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.metadata: Optional[Dict] = None
 
     def create_shared_array(self, ticker: str, data: np.ndarray, column_name: str) -> str:
         """
-        Create a shared memory block for a ticker's data column
+        Queue a ticker's data column for the arena (copied when build() runs)
 
         Args:
             ticker: Ticker symbol
@@ -31,95 +202,136 @@ class SharedPriceData:
             column_name: Column name (e.g., 'close', 'high', 'volume')
 
         Returns:
-            Shared memory block name
+            Arena key of the column ('<ticker>/<column>')
         """
-        # Create unique name for this ticker+column (Windows compatible)
-        # Use underscore and sanitize for cross-platform compatibility
-        import uuid
-        unique_id = str(uuid.uuid4())[:8]
-        shm_name = f"psm_{ticker}_{column_name}_{unique_id}".replace('-', '_')
-
-        # Create shared memory block
-        shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
-
-        # Create NumPy array backed by shared memory
-        shared_array = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
-
-        # Copy data into shared memory
-        shared_array[:] = data[:]
-
-        # Store metadata
-        if ticker not in self.ticker_metadata:
-            self.ticker_metadata[ticker] = {}
-
-        self.ticker_metadata[ticker][column_name] = {
-            'shm_name': shm_name,
-            'shape': data.shape,
-            'dtype': str(data.dtype),
-            'nbytes': data.nbytes
-        }
-
-        # Store shared memory block
-        self.shm_blocks[shm_name] = shm
+        if column_name not in self.dtypes:
+            raise ValueError(f"Unsupported shared column: {column_name}")
 
-        return shm_name
+        if column_name == 'dates' and self.dtypes['dates'] == str(DAY_DTYPE):
+            data = to_day_index(data)
+        self.pending.setdefault(ticker, {})[column_name] = np.asarray(data, dtype=self.dtypes[column_name])
+        return f"{ticker}/{column_name}"
 
-    def load_ticker_to_shared_memory(self, ticker: str, df) -> Dict[str, str]:
+    def load_ticker_to_shared_memory(self, ticker: str, df, data_version: Optional[str] = None) -> List[str]:
         """
-        Load all OHLCV columns for a ticker into shared memory
+        Queue all OHLCV columns for a ticker
 
         Args:
             ticker: Ticker symbol
             df: Pandas DataFrame with OHLCV data
+            data_version: Version of the source data (lets workers key caches consistently)
 
         Returns:
-            Dictionary mapping column names to shared memory names
+            Names of the queued columns
         """
-        shm_names = {}
+        columns = []
 
         # Share common columns
-        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-            if col in df.columns:
-                col_lower = col.lower()
-                shm_name = self.create_shared_array(ticker, df[col].values, col_lower)
-                shm_names[col_lower] = shm_name
+        for name, col, _ in PRICE_COLUMNS:
+            if col is not None and col in df.columns:
+                self.create_shared_array(ticker, df[col].values, name)
+                columns.append(name)
 
         # Share dates as Unix timestamps
         if 'Date' in df.columns:
             timestamps = df['Date'].astype(np.int64).values // 10**9
-            shm_name = self.create_shared_array(ticker, timestamps, 'dates')
-            shm_names['dates'] = shm_name
+            self.create_shared_array(ticker, timestamps, 'dates')
+            columns.append('dates')
         elif 'time' in df.columns:
-            shm_name = self.create_shared_array(ticker, df['time'].values, 'dates')
-            shm_names['dates'] = shm_name
+            self.create_shared_array(ticker, df['time'].values, 'dates')
+            columns.append('dates')
 
-        return shm_names
+        self.versions[ticker] = data_version
+        return columns
 
-    def get_metadata(self) -> Dict:
-        """Get metadata for all shared tickers"""
-        return self.ticker_metadata
+    def build(self) -> Optional[Dict]:
+        """
+        Create the arena and copy all queued columns into it
+
+        Returns:
+            Metadata for SharedPriceDataReader, or None if nothing was queued
+        """
+        if not self.pending:
+            return None
+
+        names = [name for name, _, _ in PRICE_COLUMNS]
+        index = {}
+        offset = 0
+        for ticker, columns in self.pending.items():
+            length = len(next(iter(columns.values())))
+            if any(len(values) != length for values in columns.values()):
+                print(f"[SharedMemory] Warning: Skipping {ticker}, columns differ in length", file=sys.stderr)
+                continue
+
+            mask = sum(1 << i for i, name in enumerate(names) if name in columns)
+            offset = _align(offset)
+            index[ticker] = [offset, length, mask, self.versions.get(ticker)]
+            offset += length * sum(values.itemsize for values in columns.values())
+
+        self.shm = create_segment('px', offset, self.owner_pid)
+        try:
+            for ticker, (start, length, mask, _) in index.items():
+                position = start
+                for i, name in enumerate(names):
+                    if mask & (1 << i):
+                        values = self.pending[ticker][name]
+                        target = np.ndarray((length,), dtype=values.dtype, buffer=self.shm.buf, offset=position)
+                        target[:] = values
+                        del target  # Views must be gone before the mapping can be closed
+                        position += values.itemsize * length
+        except Exception:
+            self.cleanup()
+            raise
+
+        self.pending.clear()
+        self.metadata = {
+            'shm_name': self.shm.name,
+            'size': offset,
+            'columns': [[name, self.dtypes[name]] for name, _, _ in PRICE_COLUMNS],
+            'tickers': index
+        }
+        return self.metadata
+
+    def get_metadata(self) -> Optional[Dict]:
+        """Get the arena index (after build())"""
+        return self.metadata
+
+    def release(self):
+        """Hand the arena off to the workers (the segment outlives this process)"""
+        if self.shm is not None:
+            release_segment(self.shm)
+            self.shm = None
 
     def cleanup(self):
-        """Close and unlink all shared memory blocks"""
-        for shm_name, shm in self.shm_blocks.items():
+        """Close and unlink the arena"""
+        if self.shm is not None:
             try:
-                shm.close()
-                shm.unlink()
+                self.shm.close()
+                self.shm.unlink()
             except Exception as e:
-                print(f"[SharedMemory] Warning: Failed to cleanup {shm_name}: {e}", file=sys.stderr)
+                print(f"[SharedMemory] Warning: Failed to cleanup {self.shm.name}: {e}", file=sys.stderr)
+            self.shm = None
 
-        self.shm_blocks.clear()
-        self.ticker_metadata.clear()
+        self.pending.clear()
+        self.metadata = None
 
 
 class SharedPriceDataReader:
     """
     Reader class for worker processes to access shared memory price data
+
+    Attaches the arena once; ticker columns are NumPy views into it. Dates
+    of a compact arena are converted back to Unix seconds on each lookup, so
+    only the int32 day indices stay resident.
     """
 
     def __init__(self, metadata: Dict):
         self.metadata = metadata
-        self.shm_blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.tickers: Dict[str, list] = dict(metadata.get('tickers', {}))
+        self.columns: List[Tuple[str, str]] = [tuple(c) for c in metadata.get('columns', [])]
+        self.compact = dict(self.columns).get('dates') == str(DAY_DTYPE)
+        self.shm = shared_memory.SharedMemory(name=metadata['shm_name'])
+        _untrack(self.shm)
         self.arrays: Dict[str, Dict[str, np.ndarray]] = {}
 
     def load_ticker(self, ticker: str) -> bool:
@@ -132,32 +344,20 @@ class SharedPriceDataReader:
         Returns:
             True if loaded successfully
         """
-        if ticker not in self.metadata:
+        entry = self.tickers.get(ticker)
+        if entry is None or self.shm is None:
             return False
 
-        ticker_meta = self.metadata[ticker]
-        self.arrays[ticker] = {}
-
-        for column_name, col_meta in ticker_meta.items():
-            shm_name = col_meta['shm_name']
-            shape = tuple(col_meta['shape'])
-            dtype = np.dtype(col_meta['dtype'])
-
-            try:
-                # Attach to existing shared memory block
-                shm = shared_memory.SharedMemory(name=shm_name)
-
-                # Create NumPy array view of shared memory
-                array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
-
-                # Store reference
-                self.shm_blocks[shm_name] = shm
-                self.arrays[ticker][column_name] = array
-
-            except Exception as e:
-                print(f"[SharedMemory] Failed to load {ticker}.{column_name}: {e}", file=sys.stderr)
-                return False
+        offset, length, mask = entry[0], entry[1], entry[2]
+        arrays = {}
+        for i, (name, dtype) in enumerate(self.columns):
+            if mask & (1 << i):
+                array = np.ndarray((length,), dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+                array.flags.writeable = False
+                arrays[name] = array
+                offset += array.itemsize * length
 
+        self.arrays[ticker] = arrays
         return True
 
     def get_ticker_data(self, ticker: str) -> Optional[Dict[str, np.ndarray]]:
@@ -168,25 +368,205 @@ class SharedPriceDataReader:
             ticker: Ticker symbol
 
         Returns:
-            Dictionary of column name -> NumPy array, or None if not found
+            Dictionary of column name -> NumPy array ('dates' in Unix seconds),
+            or None if not found
         """
         if ticker not in self.arrays:
             # Try to load it
             if not self.load_ticker(ticker):
                 return None
 
-        return self.arrays[ticker]
+        arrays = self.arrays[ticker]
+        if self.compact and 'dates' in arrays:
+            return dict(arrays, dates=from_day_index(arrays['dates']))
+        return arrays
+
+    def get_data_version(self, ticker: str) -> Optional[str]:
+        """Get the data version the shared columns were built from"""
+        entry = self.tickers.get(ticker)
+        return entry[3] if entry is not None and len(entry) > 3 else None
+
+    def invalidate_tickers(self, tickers) -> int:
+        """
+        Stop serving tickers whose source data changed since the arena was built
+
+        Their columns stay in the segment (it is shared and read-only), but
+        lookups miss from now on so callers load the current data themselves.
+
+        Returns:
+            Number of tickers dropped
+        """
+        dropped = 0
+        for ticker in tickers:
+            if self.tickers.pop(ticker, None) is not None:
+                self.arrays.pop(ticker, None)
+                dropped += 1
+        return dropped
 
     def close(self):
-        """Close shared memory connections (don't unlink - only creator should unlink)"""
-        for shm in self.shm_blocks.values():
+        """Close shared memory connection (don't unlink - see unlink())"""
+        self.arrays.clear()
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except Exception:
+                pass  # Views still referenced elsewhere keep the mapping alive
+
+    def unlink(self):
+        """Close and remove the arena (call from exactly one process once all readers are done)"""
+        self.close()
+        self.shm = None
+        unlink_shared_segment(self.metadata['shm_name'])
+
+
+class SharedArena:
+    """
+    Packs many NumPy arrays of any shape into ONE shared memory segment
+
+    Entries are looked up by string key through an offset table
+    ({key: [offset, shape, dtype]}). A single segment keeps the worker init
+    message small and costs one mmap per worker instead of one per array.
+    """
+
+    def __init__(self, kind: str = 'arena', owner_pid: Optional[int] = None):
+        self.kind = kind
+        self.owner_pid = owner_pid
+        self.pending: Dict[str, np.ndarray] = {}
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.metadata: Optional[Dict] = None
+
+    def add(self, key: str, values: np.ndarray):
+        """
+        Queue an array for the arena (copied when build() runs)
+
+        Args:
+            key: String key workers use to look the array up
+            values: Array to share
+        """
+        self.pending[key] = np.ascontiguousarray(values)
+
+    def build(self) -> Optional[Dict]:
+        """
+        Create the segment and copy all queued arrays into it
+
+        Returns:
+            Metadata for SharedArenaReader, or None if nothing was queued
+        """
+        if not self.pending:
+            return None
+
+        entries = {}
+        offset = 0
+        for key, values in self.pending.items():
+            offset = _align(offset)
+            entries[key] = [offset, list(values.shape), str(values.dtype)]
+            offset += int(values.nbytes)
+
+        self.shm = create_segment(self.kind, offset, self.owner_pid)
+        try:
+            for key, values in self.pending.items():
+                start = entries[key][0]
+                target = np.ndarray(values.shape, dtype=values.dtype, buffer=self.shm.buf, offset=start)
+                target[...] = values
+                del target  # Views must be gone before the mapping can be closed
+        except Exception:
+            self.cleanup()
+            raise
+
+        self.pending.clear()
+        self.metadata = {'shm_name': self.shm.name, 'size': offset, 'entries': entries}
+        return self.metadata
+
+    def release(self):
+        """Hand the arena off to the workers (the segment outlives this process)"""
+        if self.shm is not None:
+            release_segment(self.shm)
+            self.shm = None
+
+    def cleanup(self):
+        """Close and unlink the segment"""
+        if self.shm is not None:
             try:
-                shm.close()
-            except:
+                self.shm.close()
+                self.shm.unlink()
+            except FileNotFoundError:
                 pass
+            self.shm = None
 
-        self.shm_blocks.clear()
-        self.arrays.clear()
+
+class SharedArenaReader:
+    """
+    Worker-side view of a SharedArena
+
+    get() returns read-only NumPy views straight into the shared segment,
+    so N workers share one physical copy of every array.
+    """
+
+    def __init__(self, metadata: Dict):
+        self.metadata = metadata
+        self.entries: Dict[str, list] = metadata.get('entries', {})
+        self.shm = shared_memory.SharedMemory(name=metadata['shm_name'])
+        _untrack(self.shm)
+        self.views: Dict[str, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Get a zero-copy read-only view of an arena array
+
+        Args:
+            key: Key the array was added under
+
+        Returns:
+            NumPy view, or None if the arena has no such entry
+        """
+        view = self.views.get(key)
+        if view is not None:
+            self.hits += 1
+            return view
+
+        entry = self.entries.get(key)
+        if entry is None or self.shm is None:
+            self.misses += 1
+            return None
+
+        offset, shape, dtype = entry
+        view = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+        view.flags.writeable = False
+        self.views[key] = view
+        self.hits += 1
+        return view
+
+    def get_stats(self) -> Dict:
+        """Get arena usage statistics"""
+        return {
+            'entries': len(self.entries),
+            'bytes': self.metadata.get('size', 0),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def close(self):
+        """Drop views and close the mapping (don't unlink)"""
+        self.views.clear()
+        if self.shm is not None:
+            try:
+                self.shm.close()
+            except Exception:
+                pass  # Views still referenced elsewhere keep the mapping alive
+
+    def unlink(self):
+        """Close and remove the segment (call from exactly one process once all readers are done)"""
+        self.close()
+        self.shm = None
+        unlink_shared_segment(self.metadata['shm_name'])
 
 
 # Example usage
@@ -209,13 +589,14 @@ if __name__ == '__main__':
         'Volume': np.random.randint(1000000, 10000000, 1000)
     })
 
-    # Load to shared memory
-    shm_names = manager.load_ticker_to_shared_memory('SPY', df)
-    print(f"Created shared memory for SPY: {shm_names}", file=sys.stderr)
+    # Load to shared memory (one arena for every ticker)
+    columns = manager.load_ticker_to_shared_memory('SPY', df, data_version='v1')
+    manager.load_ticker_to_shared_memory('QQQ', df.tail(500))
+    print(f"Queued SPY columns: {columns}", file=sys.stderr)
 
-    # Get metadata
-    metadata = manager.get_metadata()
+    metadata = manager.build()
     print(f"Metadata: {metadata}", file=sys.stderr)
+    manager.release()  # Creator lets go; the arena must survive
 
     # Simulate worker process reading from shared memory
     reader = SharedPriceDataReader(metadata)
@@ -228,12 +609,58 @@ if __name__ == '__main__':
 
         # Verify data matches
         assert np.allclose(spy_data['close'], df['Close'].values), "Data mismatch!"
+        assert np.array_equal(spy_data['dates'], df['Date'].astype(np.int64).values // 10**9), "Dates mismatch!"
+        assert np.allclose(reader.get_ticker_data('QQQ')['volume'], df['Volume'].values[-500:]), "QQQ mismatch!"
+        assert 'adjClose' not in spy_data and reader.get_data_version('SPY') == 'v1'
         print(f"✓ Data integrity verified", file=sys.stderr)
     else:
         print(f"✗ Failed to load SPY data", file=sys.stderr)
 
     # Cleanup
-    reader.close()
-    manager.cleanup()
+    del spy_data
+    reader.unlink()
+    assert not unlink_shared_segment(metadata['shm_name']), "Arena should be gone"
+
+    # Indicator-style arena: many arrays in one segment, readable after the creator lets go
+    arena = SharedArena(kind='test')
+    arena.add('SPY|RSI|14', np.linspace(0.0, 100.0, 1001))
+    arena.add('QQQ|SMA|3', np.arange(7, dtype=np.int32))
+    arena_meta = arena.build()
+    arena.release()
+
+    arena_reader = SharedArenaReader(arena_meta)
+    rsi = arena_reader.get('SPY|RSI|14')
+    assert np.array_equal(rsi, np.linspace(0.0, 100.0, 1001)), "Arena data mismatch!"
+    assert not rsi.flags.writeable, "Arena views must be read-only"
+    assert arena_reader.get('QQQ|SMA|3').ctypes.data % ARENA_ALIGNMENT == 0, "Entries must be aligned"
+    assert arena_reader.get('missing') is None
+    del rsi
+    arena_reader.unlink()
+    print(f"✓ Shared arena verified", file=sys.stderr)
+
+    # Compact arena: float32 prices and int32 day indices, half the size
+    compact = SharedPriceData(compact=True)
+    compact.load_ticker_to_shared_memory('SPY', df, data_version='v1')
+    compact_meta = compact.build()
+    compact.release()
+    assert compact_meta['size'] == len(df) * len(columns) * 4, "Compact columns should be 4 bytes wide"
+
+    compact_reader = SharedPriceDataReader(compact_meta)
+    spy_compact = compact_reader.get_ticker_data('SPY')
+    assert spy_compact['close'].dtype == np.float32
+    assert np.allclose(spy_compact['close'], df['Close'].values, rtol=1e-6)
+    assert np.array_equal(spy_compact['dates'], df['Date'].astype(np.int64).values // 10**9), "Dates mismatch!"
+    del spy_compact
+    compact_reader.unlink()
+    print(f"✓ Compact arena verified", file=sys.stderr)
+
+    # Stale sweep: a segment owned by a dead process is removed
+    if os.path.isdir(SHM_DIR):
+        dead_pid = 2 ** 22 + 12345  # Above the default pid_max
+        stale = shared_memory.SharedMemory(name=f"qn_{dead_pid}_test_stale", create=True, size=64)
+        _untrack(stale)
+        stale.close()
+        assert sweep_stale_segments() >= 1 and not os.path.exists(f"{SHM_DIR}/qn_{dead_pid}_test_stale")
+        print(f"✓ Stale segment sweep verified", file=sys.stderr)
 
     print(f"✓ Shared memory test passed", file=sys.stderr)
@@ -0,0 +1,211 @@
+"""
+Per-worker cache of evaluated condition signals
+The same condition (e.g. SPY RSI(10) < 30) appears in hundreds of branches of a
+Forge batch; its whole boolean series is evaluated once and stored as a packed
+bitset, so every later branch reads one bit per bar
+"""
+
+import os
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Default byte budget for packed signals (override with SIGNAL_CACHE_MB)
+DEFAULT_MAX_BYTES = int(os.environ.get('SIGNAL_CACHE_MB', '32')) * 1024 * 1024
+
+# Comparators that evaluate as left > right (everything else is left < right)
+_GREATER = frozenset({'gt', 'crossAbove'})
+
+
+class Signal:
+    """
+    Boolean condition series packed 8 bars per byte
+
+    Bars at or past `length` (the shorter of the compared series) have no value,
+    matching the per-bar evaluation returning None there.
+    """
+
+    __slots__ = ('bits', 'length')
+
+    def __init__(self, bits: bytes, length: int):
+        self.bits = bits
+        self.length = length
+
+    @classmethod
+    def from_bools(cls, values: np.ndarray) -> 'Signal':
+        """Pack a boolean array"""
+        values = np.asarray(values, dtype=bool)
+        return cls(np.packbits(values).tobytes(), len(values))
+
+    def at(self, idx: int) -> Optional[bool]:
+        """Signal value at a bar, or None past the end of the data"""
+        if idx >= self.length:
+            return None
+        return bool((self.bits[idx >> 3] >> (7 - (idx & 7))) & 1)
+
+    def to_bools(self) -> np.ndarray:
+        """Unpack to a boolean array of `length` bars"""
+        return np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), count=self.length).astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+
+def compare_series(left: np.ndarray, comparator: str, right) -> Signal:
+    """
+    Evaluate a condition over every bar
+
+    Args:
+        left: Left-hand metric series
+        comparator: 'gt', 'lt', 'crossAbove' or 'crossBelow' (unknown = 'lt')
+        right: Threshold (float) or right-hand metric series
+
+    Returns:
+        Packed Signal (NaN compares False, as in the per-bar evaluation)
+    """
+    left = np.asarray(left, dtype=np.float64)
+    if isinstance(right, np.ndarray):
+        length = min(len(left), len(right))
+        left = left[:length]
+        right = np.asarray(right[:length], dtype=np.float64)
+
+    with np.errstate(invalid='ignore'):
+        values = left > right if comparator in _GREATER else left < right
+    return Signal.from_bools(values)
+
+
+def normalize_comparator(comparator: str) -> str:
+    """Collapse comparators that evaluate identically (crossAbove is gt, etc.)"""
+    return 'gt' if comparator in _GREATER else 'lt'
+
+
+class SignalCache:
+    """
+    LRU cache of condition signals keyed by condition and input series
+
+    Keys come from the backtester: (ticker, metric, window, comparator,
+    threshold or right-hand (ticker, metric, window), series fingerprints).
+    The fingerprints include the data version, so re-downloaded data never
+    reuses a stale signal.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize signal cache
+
+        Args:
+            max_bytes: Maximum total size of packed signals in bytes
+        """
+        self.cache: "OrderedDict[Tuple, Signal]" = OrderedDict()
+        self.last_used: Dict[Tuple, float] = {}
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[Signal]:
+        """Look up a signal (None if not cached)"""
+        signal = self.cache.get(key)
+        if signal is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.cache.move_to_end(key)
+        self.last_used[key] = time.monotonic()
+        return signal
+
+    def put(self, key: Tuple, signal: Signal):
+        """Insert a signal and evict least recently used entries over the byte budget"""
+        if signal.nbytes > self.max_bytes:
+            return
+
+        old = self.cache.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old.nbytes
+
+        self.cache[key] = signal
+        self.last_used[key] = time.monotonic()
+        self.current_bytes += signal.nbytes
+
+        while self.cache and self.current_bytes > self.max_bytes:
+            self.evict_lru()
+
+    def invalidate_tickers(self, tickers: Set[str]) -> int:
+        """Drop every signal evaluated on the given tickers, return bytes freed"""
+        freed = 0
+        for key in list(self.cache):
+            rhs = key[4]
+            if key[0] in tickers or (isinstance(rhs, tuple) and rhs[0] in tickers):
+                freed += self.cache.pop(key).nbytes
+                self.last_used.pop(key, None)
+        self.current_bytes -= freed
+        return freed
+
+    def clear(self):
+        """Clear the cache"""
+        self.cache.clear()
+        self.last_used.clear()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Memory budget protocol (see memory_budget.py)
+
+    def memory_bytes(self) -> int:
+        return self.current_bytes
+
+    def memory_entries(self) -> int:
+        return len(self.cache)
+
+    def lru_last_used(self) -> Optional[float]:
+        return self.last_used[next(iter(self.cache))] if self.cache else None
+
+    def evict_lru(self) -> int:
+        """Drop the least recently used signal, return bytes freed"""
+        key, evicted = self.cache.popitem(last=False)
+        self.last_used.pop(key, None)
+        self.current_bytes -= evicted.nbytes
+        self.evictions += 1
+        return evicted.nbytes
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total * 100) if total > 0 else 0,
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+if __name__ == '__main__':
+    import sys
+
+    rsi = np.array([25.0, 35.0, np.nan, 20.0, 50.0, 10.0, 31.0, 29.0, 28.0, 70.0])
+    signal = compare_series(rsi, 'lt', 30.0)
+    expected = [v < 30.0 for v in rsi]
+    assert [signal.at(i) for i in range(len(rsi))] == expected, "Packed signal must match per-bar compare"
+    assert signal.at(len(rsi)) is None, "Past the end of the data has no value"
+    assert signal.nbytes == 2, "10 bars pack into 2 bytes"
+
+    sma = np.array([30.0] * 8)
+    signal = compare_series(rsi, 'crossAbove', sma)
+    assert signal.length == 8 and signal.at(8) is None, "Series compare stops at the shorter input"
+    assert list(signal.to_bools()) == [bool(a > b) for a, b in zip(rsi, sma)]
+
+    cache = SignalCache(max_bytes=3)
+    cache.put(('a',), compare_series(rsi, 'lt', 30.0))
+    assert cache.get(('a',)) is not None and cache.get(('b',)) is None
+    cache.put(('b',), compare_series(rsi, 'gt', 30.0))
+    assert cache.get(('a',)) is None and cache.evictions == 1, "Byte budget evicts the oldest signal"
+
+    print(f"✓ Signal cache test passed", file=sys.stderr)
+    print(f"  Stats: {cache.get_stats()}", file=sys.stderr)
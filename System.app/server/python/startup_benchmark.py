@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Python entry points
+
+Each measurement runs in a fresh interpreter, the way the server launches
+one-shot backtests, so import and kernel loading costs are included:
+    - interpreter start (baseline)
+    - import of backtester, rolling_optimizer and vectorized_optimizer
+    - one complete backtest through backtester.py (when a parquet dir is given)
+
+Budgets (milliseconds, median of STARTUP_RUNS runs, 0 disables a check):
+    STARTUP_BUDGET_MS   import backtester       (default 400)
+    BACKTEST_BUDGET_MS  one-shot backtest       (default 1500)
+Exits 1 when a budget is exceeded, so it can gate a deploy or CI job.
+
+Usage: python startup_benchmark.py [parquetDir]
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+STARTUP_RUNS = int(os.environ.get('STARTUP_RUNS', '5'))
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', '400'))
+BACKTEST_BUDGET_MS = float(os.environ.get('BACKTEST_BUDGET_MS', '1500'))
+
+HERE = Path(__file__).resolve().parent
+
+# Same strategy as profile_backtest.py, plus a ranking function over two tickers
+BENCHMARK_TREE = {
+    'kind': 'indicator',
+    'conditions': [{
+        'id': '1',
+        'ticker': 'SPY',
+        'metric': 'Relative Strength Index',
+        'window': 10,
+        'comparator': 'lt',
+        'threshold': 30
+    }],
+    'children': {
+        'then': [{'kind': 'position', 'positions': ['SPY']}],
+        'else': [{
+            'kind': 'function',
+            'metric': 'Relative Strength Index',
+            'window': 14,
+            'bottom': 1,
+            'rank': 'bottom',
+            'children': {'next': [
+                {'kind': 'position', 'positions': ['QQQ']},
+                {'kind': 'position', 'positions': ['SPY']}
+            ]}
+        }]
+    }
+}
+
+
+def time_run(args: List[str], runs: int = STARTUP_RUNS) -> float:
+    """
+    Median wall time of a fresh Python process, in milliseconds
+
+    Args:
+        args: Arguments after the interpreter
+        runs: Number of runs
+
+    Returns:
+        Median milliseconds (raises if the process fails)
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, *args], cwd=HERE, capture_output=True, text=True)
+        samples.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(args)} failed: {proc.stderr.strip()[-500:]}")
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def check(label: str, ms: float, budget: float, baseline: Optional[float] = None) -> bool:
+    """Print one measurement and whether it is within its budget (0 = no budget)"""
+    extra = f" (+{ms - baseline:.0f}ms over interpreter)" if baseline is not None else ''
+    ok = budget <= 0 or ms <= budget
+    status = '' if budget <= 0 else (' ✓' if ok else f" ✗ over {budget:.0f}ms budget")
+    print(f"[Startup] {label:<28} {ms:7.0f}ms{extra}{status}", file=sys.stderr)
+    return ok
+
+
+def main():
+    parquet_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    ok = True
+
+    baseline = time_run(['-c', 'pass'])
+    check('interpreter', baseline, 0)
+    ok &= check('import backtester', time_run(['-c', 'import backtester']), STARTUP_BUDGET_MS, baseline)
+    for module in ('rolling_optimizer', 'vectorized_optimizer'):
+        try:
+            check(f"import {module}", time_run(['-c', f"import {module}"]), 0, baseline)
+        except RuntimeError as e:
+            print(f"[Startup] import {module} skipped: {e}", file=sys.stderr)
+
+    if parquet_dir:
+        payload = json.dumps({
+            'parquetDir': parquet_dir,
+            'tree': BENCHMARK_TREE,
+            'options': {'mode': 'CC', 'costBps': 5}
+        })
+        ok &= check('one-shot backtest', time_run(['backtester.py', payload]), BACKTEST_BUDGET_MS, baseline)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Per-worker memo of subtree allocation series
+Branches of a parameter sweep share most of their tree; the allocation series
+of every unchanged subtree is reused, so only the path from the changed
+condition to the root is re-evaluated
+"""
+
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from tree_hash import node_hashes
+
+# Maximum number of memoized series per worker (override with SUBTREE_MEMO_SIZE)
+DEFAULT_MAX_SERIES = int(os.environ.get('SUBTREE_MEMO_SIZE', '1024'))
+
+# Node kinds that are cheaper to evaluate than to look up
+_SKIP_KINDS = frozenset({'position'})
+
+# Returned by lookup() when the bar is not memoized ({} is a valid allocation)
+MISS = object()
+
+# Placeholder for bars a subtree was not evaluated on (e.g. the untaken branch)
+_HOLE = object()
+
+
+def db_fingerprint(db: Dict) -> Tuple:
+    """
+    Identify the aligned price database a subtree is evaluated on
+
+    Same dates window, same tickers present, same data versions and same
+    indicator price field means every array a subtree can read is identical.
+    """
+    dates = db['dates']
+    versions = db.get('versions', {})
+    return (
+        len(dates),
+        int(dates[0]) if len(dates) else None,
+        int(dates[-1]) if len(dates) else None,
+        tuple(sorted((t, versions.get(t)) for t in db['close'])),
+        db.get('indicatorPrice', 'close')
+    )
+
+
+class SubtreeMemo:
+    """
+    LRU memo of allocation series keyed by (subtree hash, db fingerprint)
+
+    Series are filled as branches are simulated: a subtree below a condition is
+    only evaluated on the bars where that branch is taken, and an early
+    terminated branch stops part way, so series have holes that later branches
+    fill in. Node evaluation depends only on the bar, never on earlier bars.
+    A subtree is only memoized once it has been seen twice (in an earlier
+    branch or twice in the same tree); the nodes on a branch's changed path
+    are unique and would only churn the memo.
+    """
+
+    def __init__(self, max_series: int = DEFAULT_MAX_SERIES):
+        self.max_series = max_series
+        self.series: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self.seen: Dict[Tuple, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def begin_run(self, tree: Dict, db: Dict, hashes: Optional[Dict[int, str]] = None) -> Dict[int, Tuple]:
+        """
+        Register a branch and pick the subtrees worth memoizing
+
+        Args:
+            tree: Root node of the branch
+            db: Aligned price database the branch runs on
+            hashes: Precomputed node_hashes(tree), if available
+
+        Returns:
+            Dict mapping id(node) -> memo key for memoizable nodes
+        """
+        fingerprint = db_fingerprint(db)
+        if hashes is None:
+            hashes = node_hashes(tree)
+
+        if len(self.seen) > 50 * self.max_series:
+            self.seen.clear()  # Bound bookkeeping on very long runs
+
+        memo_keys = {}
+        for node in _walk(tree):
+            if node.get('kind') in _SKIP_KINDS:
+                continue
+            key = (hashes[id(node)], fingerprint)
+            count = self.seen.get(key, 0) + 1
+            self.seen[key] = count
+            if count >= 2 or key in self.series:
+                memo_keys[id(node)] = key
+
+        # Nodes that appear twice in this tree become memoizable on the second walk
+        for node in _walk(tree):
+            key = (hashes[id(node)], fingerprint)
+            if id(node) not in memo_keys and self.seen.get(key, 0) >= 2 and node.get('kind') not in _SKIP_KINDS:
+                memo_keys[id(node)] = key
+
+        return memo_keys
+
+    def lookup(self, key: Tuple, idx: int):
+        """
+        Get the memoized allocation of a subtree at a bar
+
+        Returns:
+            Allocation dict, or MISS
+        """
+        series = self.series.get(key)
+        if series is not None and idx < len(series):
+            allocation = series[idx]
+            if allocation is not _HOLE:
+                self.hits += 1
+                if idx == 0:
+                    self.series.move_to_end(key)
+                return allocation
+
+        self.misses += 1
+        return MISS
+
+    def record(self, key: Tuple, idx: int, allocation: Dict):
+        """
+        Store a subtree's allocation at a bar
+
+        Args:
+            key: Memo key from begin_run()
+            idx: Bar index
+            allocation: Allocation the subtree produced at that bar
+        """
+        series = self.series.get(key)
+        if series is None:
+            series = []
+            self.series[key] = series
+            while len(self.series) > self.max_series:
+                self.series.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.series.move_to_end(key)
+
+        if idx >= len(series):
+            series.extend([_HOLE] * (idx + 1 - len(series)))
+
+        # Allocations rarely change bar to bar: share the previous dict when equal
+        previous = series[idx - 1] if idx > 0 else _HOLE
+        if previous is not _HOLE and previous == allocation:
+            allocation = previous
+        series[idx] = allocation
+
+    def invalidate_tickers(self, tickers: Set[str]) -> int:
+        """Drop the series of every price database that included the given tickers"""
+        def stale(key):
+            return any(ticker in tickers for ticker, _ in key[1][3])
+
+        dropped = [key for key in self.series if stale(key)]
+        for key in dropped:
+            del self.series[key]
+        for key in [key for key in self.seen if stale(key)]:
+            del self.seen[key]
+        return len(dropped)
+
+    def clear(self):
+        """Clear all memoized series"""
+        self.series.clear()
+        self.seen.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_stats(self) -> Dict:
+        """Get memo statistics"""
+        total = self.hits + self.misses
+        return {
+            'series': len(self.series),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total * 100) if total > 0 else 0,
+            'max_series': self.max_series
+        }
+
+
+def _walk(node: Dict):
+    """Yield every node of a tree (pre-order)"""
+    yield node
+    children = node.get('children')
+    if isinstance(children, dict):
+        for value in children.values():
+            if isinstance(value, list):
+                for child in value:
+                    if child:
+                        yield from _walk(child)
+            elif isinstance(value, dict):
+                yield from _walk(value)
+
+
+if __name__ == '__main__':
+    import sys
+    import copy
+    import numpy as np
+
+    db = {'dates': np.arange(5) * 86400, 'close': {'SPY': np.ones(5)}, 'versions': {'SPY': 'v1'}}
+    inner = {'id': 'i', 'kind': 'basic', 'children': {'next': [{'kind': 'position', 'positions': ['SPY']}]}}
+    tree = {'id': 'root', 'kind': 'indicator', 'conditions': [{'threshold': 30}],
+            'children': {'then': [inner], 'else': []}}
+
+    memo = SubtreeMemo(max_series=8)
+    keys = memo.begin_run(tree, db)
+    assert not keys, "Nothing is memoized the first time a subtree is seen"
+
+    sibling = copy.deepcopy(tree)
+    sibling['conditions'][0]['threshold'] = 35
+    keys = memo.begin_run(sibling, db)
+    inner_key = keys.get(id(sibling['children']['then'][0]))
+    assert inner_key is not None and id(sibling) not in keys, "Only the shared subtree is memoized"
+
+    # Partial series with holes (branch not taken on bar 1), then filled by the next branch
+    for i in (0, 2):
+        assert memo.lookup(inner_key, i) is MISS
+        memo.record(inner_key, i, {'SPY': 1.0})
+    assert memo.lookup(inner_key, 2) == {'SPY': 1.0}
+    assert memo.lookup(inner_key, 1) is MISS and memo.lookup(inner_key, 3) is MISS
+    memo.record(inner_key, 1, {'SPY': 1.0})
+    assert memo.series[inner_key][1] is memo.series[inner_key][0], "Equal allocations are shared"
+
+    other_db = dict(db, versions={'SPY': 'v2'})
+    assert inner_key not in memo.begin_run(sibling, other_db).values(), "New data must not reuse series"
+
+    print(f"✓ Subtree memo test passed", file=sys.stderr)
+    print(f"  Stats: {memo.get_stats()}", file=sys.stderr)
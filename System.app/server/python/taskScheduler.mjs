@@ -0,0 +1,322 @@
+/**
+ * Ticker-affinity scheduling for WorkerPool
+ * Branches are grouped by the tickers and indicators their tree reads. A group
+ * stays with the worker that started it, so that worker's price, indicator,
+ * signal and result caches serve the whole group. A free worker starts the
+ * unstarted group that best matches what it already holds, and only takes
+ * branches from another worker's group when nothing else is left (stealing).
+ *
+ * Each branch also gets a cost estimate from its tree (nodes, indicators,
+ * tickers, bars), scaled to milliseconds by the runtimes workers report.
+ * Groups hand out their most expensive branches first and the costliest group
+ * is started first (longest processing time first), so the last branches to
+ * finish are short ones; the same estimates give the predicted ETA.
+ */
+
+// Relative cost of one backtest: fixed overhead plus per node, per indicator and
+// per ticker work, scaled by the bars it runs over (DEFAULT_BARS when unknown)
+export const COST_WEIGHTS = { base: 1, node: 1, indicator: 2, ticker: 0.5 }
+export const DEFAULT_BARS = 5000
+
+/**
+ * Tickers and indicators a tree reads (same walk as BatchOptimizer._extract_tickers_from_tree)
+ * Returns { key, tickers, indicators, nodes }: tasks with the same key share all their inputs
+ */
+export function treeSignature(tree) {
+  const tickers = new Set(['SPY']) // Every backtest aligns on SPY
+  const indicators = new Set()
+  let nodes = 0
+
+  const addTicker = (ticker) => {
+    if (!ticker || typeof ticker !== 'string' || ticker === 'Empty') return null
+    const symbol = ticker.trim().toUpperCase()
+    tickers.add(symbol)
+    // Ratio tickers (SPY/XLU) are built from their components
+    const parts = symbol.split('/')
+    if (parts.length === 2 && parts[0] && parts[1]) {
+      tickers.add(parts[0].trim())
+      tickers.add(parts[1].trim())
+    }
+    return symbol
+  }
+
+  const walk = (node) => {
+    if (!node || typeof node !== 'object') return
+    nodes++
+
+    if (node.kind === 'position' && Array.isArray(node.positions)) {
+      node.positions.forEach(addTicker)
+    }
+
+    if (Array.isArray(node.conditions)) {
+      for (const cond of node.conditions) {
+        const ticker = addTicker(cond.ticker)
+        if (ticker && cond.metric) indicators.add(`${ticker}:${cond.metric}:${cond.window}`)
+        const rightTicker = addTicker(cond.rightTicker)
+        if (rightTicker && cond.expanded) {
+          indicators.add(`${rightTicker}:${cond.rightMetric || cond.metric}:${cond.rightWindow ?? cond.window}`)
+        }
+      }
+    }
+
+    if (node.children) {
+      for (const children of Object.values(node.children)) {
+        if (Array.isArray(children)) {
+          children.forEach(walk)
+        } else {
+          walk(children)
+        }
+      }
+    }
+  }
+
+  walk(tree)
+  const sortedTickers = [...tickers].sort()
+  const sortedIndicators = [...indicators].sort()
+  return {
+    key: `${sortedTickers.join(',')}|${sortedIndicators.join(',')}`,
+    tickers: sortedTickers,
+    indicators: sortedIndicators,
+    nodes
+  }
+}
+
+/**
+ * Static cost estimate of a backtest in cost units
+ * A backtest runs over the dates all its tickers share, so the shortest known
+ * history sets the bar count
+ */
+export function estimateTreeCost(signature, tickerBars = new Map()) {
+  let bars = null
+  for (const ticker of signature.tickers) {
+    const known = tickerBars.get(ticker)
+    if (known !== undefined && (bars === null || known < bars)) bars = known
+  }
+  const work = COST_WEIGHTS.base +
+    COST_WEIGHTS.node * signature.nodes +
+    COST_WEIGHTS.indicator * signature.indicators.length +
+    COST_WEIGHTS.ticker * signature.tickers.length
+  return work * (bars ?? DEFAULT_BARS) / DEFAULT_BARS
+}
+
+export class AffinityScheduler {
+  constructor() {
+    this.groups = new Map() // signature key -> { key, tickers, indicators, tasks, owner }
+    this.size = 0
+    this.affine = 0 // Branches run by the worker that owns their group
+    this.stolen = 0 // Branches taken from another worker's group
+
+    this.tickerBars = new Map() // ticker -> bars of history (from the batch optimizer)
+    this.costs = new WeakMap() // task -> { signature, units, key }
+    this.observed = { ms: 0, units: 0 } // Runtimes reported so far, all groups
+    this.observedGroups = new Map() // signature key -> { ms, units }
+    this.running = new Map() // worker id -> { tasks, since }
+  }
+
+  /**
+   * Queue tasks (each with a tree) under their signature, most expensive first
+   */
+  add(tasks) {
+    const touched = new Set()
+    for (const task of tasks) {
+      const signature = treeSignature(task.tree)
+      let group = this.groups.get(signature.key)
+      if (!group) {
+        group = { key: signature.key, tickers: signature.tickers, indicators: signature.indicators, tasks: [], owner: null, units: 0 }
+        this.groups.set(signature.key, group)
+      }
+      const units = estimateTreeCost(signature, this.tickerBars)
+      this.costs.set(task, { signature, units, key: signature.key })
+      group.tasks.push(task)
+      group.units += units
+      touched.add(group)
+    }
+    for (const group of touched) this.sortGroup(group)
+    this.size += tasks.length
+  }
+
+  clear() {
+    this.groups.clear()
+    this.running.clear()
+    this.size = 0
+  }
+
+  /**
+   * Use the bar count of every ticker (from the batch optimizer) in the estimates
+   */
+  setTickerBars(tickerBars) {
+    this.tickerBars = new Map(Object.entries(tickerBars || {}))
+    for (const group of this.groups.values()) {
+      group.units = 0
+      for (const task of group.tasks) {
+        const cost = this.costs.get(task)
+        cost.units = estimateTreeCost(cost.signature, this.tickerBars)
+        group.units += cost.units
+      }
+      this.sortGroup(group)
+    }
+  }
+
+  sortGroup(group) {
+    group.tasks.sort((a, b) => this.costs.get(b).units - this.costs.get(a).units)
+  }
+
+  /**
+   * Estimated runtime of a task in milliseconds, null before any runtime was reported
+   * A group's own runtimes win over the global rate once it has any
+   */
+  estimateMs(task) {
+    const cost = this.costs.get(task)
+    return cost ? cost.units * this.msPerUnit(cost.key) : null
+  }
+
+  msPerUnit(key) {
+    const group = this.observedGroups.get(key)
+    if (group && group.units > 0) return group.ms / group.units
+    return this.observed.units > 0 ? this.observed.ms / this.observed.units : null
+  }
+
+  /**
+   * How much of a group's inputs a worker already holds
+   */
+  score(group, worker) {
+    let score = 0
+    for (const ticker of group.tickers) {
+      if (worker.warmTickers.has(ticker)) score++
+    }
+    for (const indicator of group.indicators) {
+      if (worker.warmIndicators.has(indicator)) score++
+    }
+    return score
+  }
+
+  /**
+   * Take up to maxTasks tasks of one group for a free worker
+   * Among the worker's own groups and the unstarted ones, the group whose next
+   * branch costs the most wins, weighted by how much of its inputs the worker
+   * holds (its own groups count as fully warm). Only when none is left does it
+   * take the tail of the largest group another worker owns.
+   */
+  take(worker, maxTasks) {
+    let best = null
+    let bestPriority = -1
+    let victim = null
+    for (const group of this.groups.values()) {
+      if (group.owner === worker.id || group.owner === null) {
+        const inputs = group.tickers.length + group.indicators.length
+        const overlap = group.owner === worker.id ? 1 : this.score(group, worker) / inputs
+        const priority = this.costs.get(group.tasks[0]).units * (1 + overlap)
+        if (priority > bestPriority) {
+          best = group
+          bestPriority = priority
+        }
+      } else if (!victim || group.tasks.length > victim.tasks.length) {
+        victim = group
+      }
+    }
+
+    let tasks
+    const group = best || victim
+    if (!group) return []
+    if (group === victim) {
+      // Steal from the end: the owner reaches those branches last
+      tasks = group.tasks.splice(Math.max(0, group.tasks.length - maxTasks))
+      this.stolen += tasks.length
+    } else {
+      group.owner = worker.id
+      tasks = group.tasks.splice(0, maxTasks)
+      this.affine += tasks.length
+    }
+
+    for (const ticker of group.tickers) worker.warmTickers.add(ticker)
+    for (const indicator of group.indicators) worker.warmIndicators.add(indicator)
+    for (const task of tasks) group.units -= this.costs.get(task).units
+    if (group.tasks.length === 0) this.groups.delete(group.key)
+    this.size -= tasks.length
+
+    // The worker runs its batch in order, starting now if it was idle
+    const running = this.running.get(worker.id)
+    if (running && running.tasks.length > 0) {
+      running.tasks.push(...tasks)
+    } else {
+      this.running.set(worker.id, { tasks: [...tasks], since: Date.now() })
+    }
+    return tasks
+  }
+
+  /**
+   * Record a finished task's runtime to calibrate the estimates
+   */
+  observe(worker, task, elapsedMs) {
+    const running = this.running.get(worker.id)
+    if (running) {
+      const index = running.tasks.indexOf(task)
+      if (index >= 0) running.tasks.splice(index, 1)
+      running.since = Date.now()
+    }
+
+    const cost = this.costs.get(task)
+    if (!cost || !(elapsedMs >= 0)) return
+    this.observed.ms += elapsedMs
+    this.observed.units += cost.units
+    const group = this.observedGroups.get(cost.key) || { ms: 0, units: 0 }
+    group.ms += elapsedMs
+    group.units += cost.units
+    this.observedGroups.set(cost.key, group)
+  }
+
+  /**
+   * Predicted milliseconds until every task is done on numWorkers workers, null
+   * until a runtime has been reported
+   * Queued work spreads over the workers after what each is still running, but
+   * the longest queued branch still has to run on one of them; the estimate
+   * sharpens with every reported runtime.
+   */
+  eta(numWorkers) {
+    if (this.observed.units === 0) return null
+    const now = Date.now()
+
+    const loads = []
+    for (const running of this.running.values()) {
+      let remaining = 0
+      for (const task of running.tasks) remaining += this.estimateMs(task)
+      // The task at the head has been running since the previous one finished
+      if (running.tasks.length > 0) loads.push(Math.max(0, remaining - (now - running.since)))
+    }
+    while (loads.length < numWorkers) loads.push(0)
+
+    let queued = 0
+    let longest = 0
+    for (const group of this.groups.values()) {
+      const rate = this.msPerUnit(group.key)
+      queued += group.units * rate
+      longest = Math.max(longest, this.costs.get(group.tasks[0]).units * rate)
+    }
+
+    const running = loads.reduce((sum, ms) => sum + ms, 0)
+    return Math.max(
+      Math.max(...loads),
+      (running + queued) / Math.max(1, numWorkers),
+      Math.min(...loads) + longest
+    )
+  }
+
+  /**
+   * Hand a dead worker's groups back to whoever is free next
+   */
+  release(workerId) {
+    for (const group of this.groups.values()) {
+      if (group.owner === workerId) group.owner = null
+    }
+    this.running.delete(workerId)
+  }
+
+  getStats() {
+    return {
+      groups: this.groups.size,
+      affine: this.affine,
+      stolen: this.stolen,
+      msPerUnit: this.observed.units > 0 ? +(this.observed.ms / this.observed.units).toFixed(3) : null
+    }
+  }
+}
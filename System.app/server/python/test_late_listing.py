@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Test ranking with tickers that list after the backtest starts"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Evaluate every bar: the persistent stores would replay results of an earlier run
+os.environ['RESULT_STORE'] = '0'
+os.environ['INDICATOR_STORE'] = '0'
+
+from backtester import Backtester
+
+# SPY trades throughout; QQQ and XLU have no prices before their listing dates.
+# They come first so an unlisted child cannot lose the ranking by sort order alone.
+LISTINGS = {'QQQ': '1999-03-10', 'XLU': '1998-12-22', 'SPY': '1995-01-03'}
+
+
+def write_prices(parquet_dir: str):
+    """Write synthetic daily bars for each ticker from its listing date"""
+    rng = np.random.default_rng(7)
+    for ticker, start in LISTINGS.items():
+        dates = pd.bdate_range(start, '2001-12-31')
+        close = 100 * np.exp(np.cumsum(rng.normal(0.002, 0.01, len(dates))))
+        pd.DataFrame({
+            'Date': dates, 'ticker': ticker, 'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+            'Close': close, 'Adj Close': close, 'Volume': np.full(len(dates), 1e6)
+        }).to_parquet(os.path.join(parquet_dir, f'{ticker}.parquet'), index=False)
+
+
+def ranking_tree(rank: str):
+    """Pick the one child with the highest (top) or lowest (bottom) RSI"""
+    return {
+        'kind': 'function',
+        'metric': 'Relative Strength Index',
+        'window': 10,
+        'bottom': 1,
+        'rank': rank,
+        'children': {'next': [{'kind': 'position', 'positions': [t]} for t in LISTINGS]}
+    }
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    write_prices(tmp)
+    listed = pd.Timestamp(LISTINGS['QQQ']).timestamp()
+
+    for rank in ('top', 'bottom'):
+        result = Backtester(tmp).run_backtest(ranking_tree(rank), {'mode': 'CC', 'costBps': 0})
+        assert 'error' not in result, result
+        early = [alloc for (ts, _), alloc in zip(result['equityCurve'], result['allocations']) if ts < listed]
+        assert early, "The backtest should start before QQQ lists"
+        # Skip the RSI warm-up bars, where no child has a value yet
+        ranked = early[20:]
+        assert all(alloc == {'SPY': 1.0} for alloc in ranked[:-200]), \
+            f"rank {rank}: before XLU lists SPY is the only child with a value"
+        assert all(alloc and set(alloc) <= {'SPY', 'XLU'} for alloc in ranked), \
+            f"rank {rank}: unlisted tickers must not be picked (and then gated to cash)"
+        print(f"  rank {rank}: {len(ranked)} ranked bars before QQQ lists, all invested", file=sys.stderr)
+
+print(f"✓ Late listing test passed", file=sys.stderr)
@@ -0,0 +1,282 @@
+"""
+Ticker catalog manifest kept next to the parquet files (<parquet_dir>/_catalog.json)
+The download scripts record each ticker's first/last date, row count, file
+size, mtime and content hash as they write its parquet file, so start-date
+filtering and ticker validation are answered without opening any parquet file
+
+Rebuild it with:
+    python ticker_catalog.py <parquet_dir>
+"""
+
+import os
+import sys
+import json
+import hashlib
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from optimized_dataloader import delta_signature, read_price_parquet
+
+CATALOG_FILE = '_catalog.json'
+
+# Bump when the entry layout changes (older catalogs are rebuilt entry by entry)
+FORMAT_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    """Content hash of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def catalog_entry(path: Path) -> Optional[Dict]:
+    """
+    Describe one ticker's data (reads only the Date column of its parquet
+    file and deltas; size, mtime and hash are those of the base file)
+
+    Must match catalog_entry() in System.app/ticker-data/catalog.py, which
+    writes the same entries from the download scripts.
+
+    Returns:
+        Entry dict, or None if the file does not exist
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    deltas = delta_signature(path)
+    try:
+        dates = read_price_parquet(path, columns=['Date'])['Date']
+    except (KeyError, ValueError):
+        dates = pd.read_parquet(path, engine='pyarrow').index.to_series()  # Date stored as the index
+    dates = pd.to_datetime(dates)
+
+    return {
+        'first_date': dates.min().strftime('%Y-%m-%d') if len(dates) else None,
+        'last_date': dates.max().strftime('%Y-%m-%d') if len(dates) else None,
+        'rows': int(len(dates)),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': file_sha256(path),
+        'deltas': deltas
+    }
+
+
+class TickerCatalog:
+    """
+    Cached view of _catalog.json
+
+    An entry is trusted only while the file's size, mtime and live deltas
+    still match it (what the data version in optimized_dataloader is built from),
+    so a parquet file rewritten by anything other than the download scripts
+    is detected. Stale or missing entries are rebuilt from the file's Date
+    column on demand and written back by save(). If only the mtime changed
+    and the content hash still matches, the entry is kept as is.
+    """
+
+    def __init__(self, parquet_dir: str):
+        """
+        Initialize catalog
+
+        Args:
+            parquet_dir: Directory of <TICKER>.parquet files holding _catalog.json
+        """
+        self.parquet_dir = Path(parquet_dir)
+        self.path = self.parquet_dir / CATALOG_FILE
+        self.entries: Dict[str, Dict] = self._read()
+        self.updated: Dict[str, Optional[Dict]] = {}
+        self.hits = 0
+        self.rebuilt = 0
+
+    @classmethod
+    def from_env(cls, parquet_dir: str) -> Optional['TickerCatalog']:
+        """Create the catalog for this process (TICKER_CATALOG=0 disables it)"""
+        if os.environ.get('TICKER_CATALOG', '1') == '0':
+            return None
+        return cls(parquet_dir)
+
+    def _read(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path) as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if catalog.get('format') != FORMAT_VERSION:
+            return {}
+        return catalog.get('tickers', {})
+
+    def entry(self, ticker: str) -> Optional[Dict]:
+        """
+        Current entry for a ticker (rebuilt from the file if stale)
+
+        Returns:
+            Entry dict, or None if the ticker has no parquet file
+        """
+        path = self.parquet_dir / f"{ticker}.parquet"
+        try:
+            st = path.stat()
+        except OSError:
+            if ticker in self.entries:
+                self.updated[ticker] = None
+                del self.entries[ticker]
+            return None
+
+        entry = self.entries.get(ticker)
+        if entry is not None and entry.get('deltas') != delta_signature(path):
+            entry = None  # Rows appended or compacted since
+        if entry is not None and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+            self.hits += 1
+            return entry
+
+        if entry is not None and entry.get('size') == st.st_size and entry.get('sha256') == file_sha256(path):
+            entry = dict(entry, mtime_ns=st.st_mtime_ns)  # Touched or copied, same content
+        else:
+            entry = catalog_entry(path)
+            if entry is None:
+                return None
+        self.rebuilt += 1
+        self.entries[ticker] = entry
+        self.updated[ticker] = entry
+        return entry
+
+    def has_ticker(self, ticker: str) -> bool:
+        """Whether the ticker has a parquet file with at least one row"""
+        entry = self.entry(ticker)
+        return entry is not None and entry['rows'] > 0
+
+    def start_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        """First date in the ticker's parquet file (None if no data)"""
+        entry = self.entry(ticker)
+        if entry is None or entry['first_date'] is None:
+            return None
+        return pd.Timestamp(entry['first_date'])
+
+    def end_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        """Last date in the ticker's parquet file (None if no data)"""
+        entry = self.entry(ticker)
+        if entry is None or entry['last_date'] is None:
+            return None
+        return pd.Timestamp(entry['last_date'])
+
+    def save(self) -> bool:
+        """
+        Write rebuilt entries back to _catalog.json
+
+        Merged into the file as it is on disk now (the download scripts may
+        have written it meanwhile) and replaced atomically.
+
+        Returns:
+            True if the catalog was written
+        """
+        if not self.updated:
+            return False
+        written = write_catalog(self.parquet_dir, self.updated)
+        if written:
+            self.updated = {}
+        return written
+
+    def get_stats(self) -> Dict:
+        """Get catalog statistics"""
+        return {
+            'path': str(self.path),
+            'tickers': len(self.entries),
+            'hits': self.hits,
+            'rebuilt': self.rebuilt,
+            'pending': len(self.updated)
+        }
+
+
+def write_catalog(parquet_dir: Path, updates: Dict[str, Optional[Dict]]) -> bool:
+    """
+    Merge entries into _catalog.json (None removes a ticker) and replace it atomically
+
+    Returns:
+        True on success
+    """
+    path = Path(parquet_dir) / CATALOG_FILE
+    try:
+        with open(path) as f:
+            catalog = json.load(f)
+        if catalog.get('format') != FORMAT_VERSION:
+            catalog = {}
+    except (OSError, ValueError):
+        catalog = {}
+
+    tickers = catalog.get('tickers', {})
+    for ticker, entry in updates.items():
+        if entry is None:
+            tickers.pop(ticker, None)
+        else:
+            tickers[ticker] = entry
+
+    tmp_path = path.with_name(f".{CATALOG_FILE}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'format': FORMAT_VERSION, 'tickers': tickers}, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[TickerCatalog] Warning: Failed to write {path}: {e}", file=sys.stderr)
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def rebuild_catalog(parquet_dir: str, tickers: Optional[Iterable[str]] = None) -> TickerCatalog:
+    """Refresh the entries of every (or the given) ticker and save the catalog"""
+    catalog = TickerCatalog(parquet_dir)
+    if tickers is None:
+        tickers = [p.stem for p in Path(parquet_dir).glob('*.parquet')]
+        for ticker in set(catalog.entries) - set(tickers):
+            catalog.updated[ticker] = None  # File deleted
+            del catalog.entries[ticker]
+    for ticker in tickers:
+        catalog.entry(ticker)
+    catalog.save()
+    return catalog
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        catalog = rebuild_catalog(sys.argv[1])
+        print(f"[TickerCatalog] {catalog.get_stats()}", file=sys.stderr)
+        sys.exit(0)
+
+    # Test stale detection, hash shortcut and merge-on-save
+    import time
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        days = pd.bdate_range('1990-01-02', '1990-03-30')
+        pd.DataFrame({'Date': days, 'Close': 1.0}).to_parquet(Path(tmp) / 'SPY.parquet', index=False)
+
+        catalog = rebuild_catalog(tmp)
+        assert catalog.rebuilt == 1 and (Path(tmp) / CATALOG_FILE).exists()
+
+        catalog = TickerCatalog(tmp)
+        assert catalog.start_date('SPY') == pd.Timestamp('1990-01-02')
+        assert catalog.end_date('SPY') == pd.Timestamp('1990-03-30')
+        assert catalog.rebuilt == 0 and catalog.hits == 2, "Fresh entries are served without reading parquet"
+        assert not catalog.has_ticker('QQQ'), "No parquet file, no ticker"
+
+        os.utime(Path(tmp) / 'SPY.parquet', ns=(time.time_ns(), time.time_ns() + 10**9))
+        assert catalog.start_date('SPY') == pd.Timestamp('1990-01-02') and catalog.rebuilt == 1
+        assert 'SPY' in catalog.updated, "Touched file keeps its entry with the new mtime"
+
+        pd.DataFrame({'Date': days[5:], 'Close': 2.0}).to_parquet(Path(tmp) / 'SPY.parquet', index=False)
+        assert catalog.start_date('SPY') == days[5], "Rewritten file is re-read"
+
+        write_catalog(Path(tmp), {'QQQ': {'first_date': None}})  # Another writer meanwhile
+        assert catalog.save()
+        on_disk = TickerCatalog(tmp).entries
+        assert set(on_disk) == {'SPY', 'QQQ'} and on_disk['SPY']['rows'] == len(days) - 5
+
+    print(f"✓ Ticker catalog test passed", file=sys.stderr)
+    print(f"  Stats: {catalog.get_stats()}", file=sys.stderr)
@@ -0,0 +1,104 @@
+"""
+Merkle-style structural hashing of strategy trees
+Each node's hash covers its own backtest-relevant fields plus its children's
+hashes, so identical subtrees hash identically across branches and a change
+to one condition only changes the hashes on the path to the root
+"""
+
+import json
+import hashlib
+from typing import Dict, Optional
+
+# Fields that never affect backtest results (UI state, labels, identifiers)
+NOISE_FIELDS = frozenset({
+    'id', 'title', 'bgColor', 'collapsed',
+    'tickerListName', 'rightTickerListName', 'positionTickerListName'
+})
+
+
+def _strip(value):
+    """Drop noise fields from nested condition/item dicts"""
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in NOISE_FIELDS}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    return value
+
+
+def _digest(data: str) -> str:
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def node_hashes(tree: Dict, hashes: Optional[Dict[int, str]] = None) -> Dict[int, str]:
+    """
+    Compute the structural hash of every node in a tree (bottom-up)
+
+    Args:
+        tree: Root node
+        hashes: Optional dict to fill (id(node) -> hash)
+
+    Returns:
+        Dict mapping id(node) -> hex hash, valid while the tree is alive
+    """
+    if hashes is None:
+        hashes = {}
+    _hash_node(tree, hashes)
+    return hashes
+
+
+def _hash_node(node: Dict, hashes: Dict[int, str]) -> str:
+    own = {k: _strip(v) for k, v in node.items() if k != 'children' and k not in NOISE_FIELDS}
+
+    slots = []
+    children = node.get('children')
+    if isinstance(children, dict):
+        for slot in sorted(children):
+            value = children[slot]
+            if isinstance(value, list):
+                slots.append((slot, [_hash_node(c, hashes) if c else '-' for c in value]))
+            elif isinstance(value, dict):
+                slots.append((slot, _hash_node(value, hashes)))
+
+    canonical = json.dumps([own, slots], sort_keys=True, separators=(',', ':'), default=str)
+    digest = _digest(canonical)
+    hashes[id(node)] = digest
+    return digest
+
+
+def tree_hash(tree: Dict) -> str:
+    """Structural hash of a whole tree (the root's Merkle hash)"""
+    if not isinstance(tree, dict):
+        return _digest(json.dumps(tree, sort_keys=True, default=str))
+    return node_hashes(tree)[id(tree)]
+
+
+if __name__ == '__main__':
+    import sys
+    import copy
+
+    leaf_a = {'id': 'p1', 'kind': 'position', 'positions': ['SPY']}
+    leaf_b = {'id': 'p2', 'kind': 'position', 'positions': ['TLT']}
+    tree = {
+        'id': 'root', 'kind': 'indicator', 'title': 'RSI',
+        'conditions': [{'id': 'c1', 'ticker': 'SPY', 'metric': 'Relative Strength Index', 'window': 10,
+                        'comparator': 'lt', 'threshold': 30}],
+        'children': {'then': [leaf_a], 'else': [leaf_b]}
+    }
+
+    hashes = node_hashes(tree)
+    relabeled = copy.deepcopy(tree)
+    relabeled['title'] = 'Other'
+    relabeled['conditions'][0]['id'] = 'c999'
+    assert tree_hash(relabeled) == hashes[id(tree)], "Labels and ids must not change the hash"
+
+    changed = copy.deepcopy(tree)
+    changed['conditions'][0]['threshold'] = 35
+    changed_hashes = node_hashes(changed)
+    assert changed_hashes[id(changed)] != hashes[id(tree)], "Threshold change must change root hash"
+    assert changed_hashes[id(changed['children']['else'][0])] == hashes[id(leaf_b)], "Unchanged subtree keeps its hash"
+
+    expanded = copy.deepcopy(tree)
+    expanded['conditions'][0]['expanded'] = True
+    assert tree_hash(expanded) != hashes[id(tree)], "Fields outside the old whitelist must count"
+
+    print(f"✓ Tree hash test passed", file=sys.stderr)
@@ -0,0 +1,107 @@
+/**
+ * Binary framing for persistent_worker.py (see worker_protocol.py for the layout)
+ * Frames are a uint32 little-endian byte count followed by the payload.
+ * Requests are JSON payloads; results carry a JSON header plus typed arrays.
+ */
+
+export const PROTOCOL_JSON = 'json'
+export const PROTOCOL_BINARY = 'binary'
+
+const FRAME_HEADER_BYTES = 4
+const textDecoder = new TextDecoder()
+
+/**
+ * Encode a request (one command, or { tasks: [...] }) as a frame
+ */
+export function encodeFrame(message) {
+  const payload = Buffer.from(JSON.stringify(message), 'utf8')
+  const frame = Buffer.allocUnsafe(FRAME_HEADER_BYTES + payload.length)
+  frame.writeUInt32LE(payload.length, 0)
+  payload.copy(frame, FRAME_HEADER_BYTES)
+  return frame
+}
+
+/**
+ * Collects stdout chunks and cuts them into frame payloads
+ * Chunks are only concatenated once a whole frame has arrived, so a large
+ * result spread over many chunks is copied once.
+ */
+export class FrameReader {
+  constructor() {
+    this.chunks = []
+    this.length = 0
+  }
+
+  push(chunk) {
+    if (chunk.length > 0) {
+      this.chunks.push(chunk)
+      this.length += chunk.length
+    }
+  }
+
+  /**
+   * Next complete frame payload, or null if it has not fully arrived
+   */
+  next() {
+    if (this.length < FRAME_HEADER_BYTES) return null
+    if (this.chunks[0].length < FRAME_HEADER_BYTES) this.chunks = [Buffer.concat(this.chunks)]
+    const size = this.chunks[0].readUInt32LE(0)
+    if (this.length < FRAME_HEADER_BYTES + size) return null
+
+    const buffer = this.chunks.length === 1 ? this.chunks[0] : Buffer.concat(this.chunks)
+    const end = FRAME_HEADER_BYTES + size
+    const payload = buffer.subarray(FRAME_HEADER_BYTES, end)
+    this.chunks = end < buffer.length ? [buffer.subarray(end)] : []
+    this.length = buffer.length - end
+    return payload
+  }
+}
+
+/**
+ * Decode a result frame: the JSON header plus typed-array views
+ *   equityTimes (Int32Array, Unix seconds), equityValues (Float32Array) and
+ *   allocationChanges { bars, offsets, weights, tickerIds, tickers }
+ * (allocation change i holds entries offsets[i]..offsets[i + 1] from bars[i] on)
+ */
+export function decodeResult(payload) {
+  // Copy into a fresh buffer: typed-array views need an aligned byte offset
+  const bytes = new Uint8Array(payload)
+  const view = new DataView(bytes.buffer)
+  const headerLength = view.getUint32(0, true)
+  let offset = FRAME_HEADER_BYTES + headerLength
+  const result = JSON.parse(textDecoder.decode(bytes.subarray(FRAME_HEADER_BYTES, offset)))
+
+  const bars = view.getUint32(offset, true)
+  const changes = view.getUint32(offset + 4, true)
+  const entries = view.getUint32(offset + 8, true)
+  offset += 12
+
+  const take = (ArrayType, count) => {
+    const values = new ArrayType(bytes.buffer, offset, count)
+    offset += values.byteLength
+    return values
+  }
+
+  const equityTimes = take(Int32Array, bars)
+  const equityValues = take(Float32Array, bars)
+  const changeBars = take(Int32Array, changes)
+  const offsets = take(Uint32Array, changes + 1)
+  const weights = take(Float32Array, entries)
+  const tickerIds = take(Uint16Array, entries)
+
+  if (bars > 0) {
+    result.equityTimes = equityTimes
+    result.equityValues = equityValues
+  }
+  if (changes > 0) {
+    result.allocationChanges = {
+      bars: changeBars,
+      offsets,
+      weights,
+      tickerIds,
+      tickers: result.allocationTickers || []
+    }
+    delete result.allocationTickers
+  }
+  return result
+}
@@ -0,0 +1,216 @@
+"""
+Wire protocols between WorkerPool.mjs and persistent_worker.py
+The init message and the ready reply are always JSON lines; the init message
+asks for a protocol and the ready reply names the one the worker speaks.
+
+json:   one JSON object per line both ways (easy to read and replay by hand)
+binary: length-prefixed frames (uint32 little-endian byte count, then the
+        payload). Requests are JSON payloads that may carry many branches
+        ({"tasks": [...]}). Results keep everything but the equity curve and
+        allocations in a JSON header and send those as typed arrays, so the
+        pool never parses per-bar JSON:
+
+            uint32 header length (multiple of 4) | header JSON (space padded)
+            uint32 bars | uint32 changes | uint32 entries
+            int32[bars] timestamps | float32[bars] equity
+            int32[changes] bar of each allocation change
+            uint32[changes + 1] entry offsets of each change
+            float32[entries] weights | uint16[entries] ticker ids
+
+        Ticker ids index header['allocationTickers']. A change is recorded
+        on the first bar and wherever the allocation differs from the
+        previous bar; it holds until the next change.
+"""
+
+import json
+import struct
+import sys
+import numpy as np
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+PROTOCOL_JSON = 'json'
+PROTOCOL_BINARY = 'binary'
+PROTOCOLS = (PROTOCOL_JSON, PROTOCOL_BINARY)
+
+FRAME_HEADER = struct.Struct('<I')
+COUNTS = struct.Struct('<III')
+
+# Result keys sent as typed arrays instead of JSON
+ARRAY_KEYS = ('equityCurve', 'allocations')
+
+
+def allocation_changes(allocations: List[Dict[str, float]]) -> Tuple[List[int], List[int], List[int], List[float], List[str]]:
+    """
+    Compress per-bar allocations into the bars where they change
+
+    Returns:
+        (bars, offsets, ticker ids, weights, tickers): change i covers
+        entries offsets[i]:offsets[i + 1]
+    """
+    symbols: Dict[str, int] = {}
+    bars, offsets, ids, weights = [], [0], [], []
+    previous = None
+    for i, allocation in enumerate(allocations):
+        if allocation == previous:
+            continue
+        previous = allocation
+        bars.append(i)
+        for ticker, weight in (allocation or {}).items():
+            ids.append(symbols.setdefault(ticker, len(symbols)))
+            weights.append(weight)
+        offsets.append(len(ids))
+    return bars, offsets, ids, weights, list(symbols)
+
+
+def encode_result(message: Dict) -> bytes:
+    """Encode a result (or any other reply) as a binary frame payload"""
+    header = {key: value for key, value in message.items() if key not in ARRAY_KEYS}
+    curve = np.asarray(message.get('equityCurve') or np.empty((0, 2)), dtype=np.float64).reshape(-1, 2)
+    bars, offsets, ids, weights, tickers = allocation_changes(message.get('allocations') or [])
+    if len(tickers) > 0xFFFF:
+        raise ValueError(f"Too many allocation tickers for a binary result: {len(tickers)}")
+    if tickers:
+        header['allocationTickers'] = tickers
+
+    body = json.dumps(header).encode('utf-8')
+    body += b' ' * (-len(body) % 4)
+    return b''.join((
+        FRAME_HEADER.pack(len(body)), body,
+        COUNTS.pack(len(curve), len(bars), len(ids)),
+        curve[:, 0].astype('<i4').tobytes(), curve[:, 1].astype('<f4').tobytes(),
+        np.asarray(bars, dtype='<i4').tobytes(), np.asarray(offsets, dtype='<u4').tobytes(),
+        np.asarray(weights, dtype='<f4').tobytes(), np.asarray(ids, dtype='<u2').tobytes(),
+    ))
+
+
+def decode_result(payload: bytes) -> Dict:
+    """
+    Decode a binary result back into the JSON result shape (debugging and tests)
+
+    Equity values come back as float32 and allocations are re-expanded per bar.
+    """
+    (header_length,) = FRAME_HEADER.unpack_from(payload, 0)
+    offset = FRAME_HEADER.size + header_length
+    message = json.loads(payload[FRAME_HEADER.size:offset])
+    n_bars, n_changes, n_entries = COUNTS.unpack_from(payload, offset)
+    offset += COUNTS.size
+
+    def take(dtype: str, count: int) -> np.ndarray:
+        nonlocal offset
+        values = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += values.nbytes
+        return values
+
+    times, equity = take('<i4', n_bars), take('<f4', n_bars)
+    bars, offsets = take('<i4', n_changes), take('<u4', n_changes + 1)
+    weights, ids = take('<f4', n_entries), take('<u2', n_entries)
+
+    if n_bars:
+        message['equityCurve'] = [[int(t), float(v)] for t, v in zip(times, equity)]
+    if n_changes:
+        tickers = message.pop('allocationTickers', [])
+        allocations = []
+        for i in range(n_changes):
+            allocation = {tickers[ids[k]]: float(weights[k]) for k in range(offsets[i], offsets[i + 1])}
+            stop = bars[i + 1] if i + 1 < n_changes else n_bars
+            allocations.extend(dict(allocation) for _ in range(bars[i], stop))
+        message['allocations'] = allocations
+    return message
+
+
+class WorkerChannel:
+    """
+    Reads requests from and writes replies to the pool in the negotiated protocol
+
+    Reads always go through the binary stdin buffer, so switching protocols
+    after the init line never loses bytes buffered by a text reader.
+    """
+
+    def __init__(self, stdin: BinaryIO, stdout, protocol: str = PROTOCOL_JSON):
+        """
+        Initialize channel
+
+        Args:
+            stdin: Binary input stream (sys.stdin.buffer)
+            stdout: Text output stream (sys.stdout); binary frames go to its buffer
+            protocol: PROTOCOL_JSON or PROTOCOL_BINARY
+        """
+        self.stdin = stdin
+        self.stdout = stdout
+        self.protocol = protocol
+
+    def read_init(self) -> Optional[Dict]:
+        """Read the init message (always a JSON line), None on EOF"""
+        line = self.stdin.readline()
+        return json.loads(line) if line else None
+
+    def receive(self) -> Optional[Dict]:
+        """
+        Read the next request, None on EOF
+
+        Raises:
+            ValueError: If the request is not valid JSON
+        """
+        if self.protocol == PROTOCOL_BINARY:
+            header = self.stdin.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return None
+            (length,) = FRAME_HEADER.unpack(header)
+            payload = self.stdin.read(length)
+            if len(payload) < length:
+                return None
+            return json.loads(payload)
+
+        line = self.stdin.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def send(self, message: Dict):
+        """Write one reply"""
+        if self.protocol == PROTOCOL_BINARY:
+            payload = encode_result(message)
+            out = self.stdout.buffer
+            out.write(FRAME_HEADER.pack(len(payload)))
+            out.write(payload)
+            out.flush()
+        else:
+            print(json.dumps(message), file=self.stdout, flush=True)
+
+
+if __name__ == '__main__':
+    # Test that a binary result round-trips to the JSON result shape
+    import io
+
+    result = {
+        'branchId': 'b1',
+        'metrics': {'cagr': 0.12},
+        'equityCurve': [[946857600 + 86400 * i, 10000.0 + i] for i in range(5)],
+        'allocations': [{'SPY': 1.0}, {'SPY': 1.0}, {'QQQ': 0.5, 'SPY': 0.5}, {}, {}],
+    }
+    payload = encode_result(result)
+    assert (FRAME_HEADER.size + FRAME_HEADER.unpack_from(payload)[0]) % 4 == 0, "Arrays start 4-byte aligned"
+    decoded = decode_result(payload)
+    assert decoded['equityCurve'] == result['equityCurve']
+    assert decoded['allocations'] == result['allocations']
+    assert decoded['metrics'] == result['metrics'] and 'allocationTickers' not in decoded
+    assert allocation_changes(result['allocations'])[0] == [0, 2, 3], "Only changes are sent"
+
+    error = decode_result(encode_result({'error': 'boom', 'branchId': 'b2'}))
+    assert error == {'error': 'boom', 'branchId': 'b2'}
+
+    # Frames through a channel: many branches in one request, one reply per branch
+    request = json.dumps({'tasks': [{'branchId': 'a'}, {'branchId': 'b'}]}).encode('utf-8')
+    stdin = io.BytesIO(b'{"protocol": "binary"}\n' + FRAME_HEADER.pack(len(request)) + request)
+    out = io.TextIOWrapper(io.BytesIO())
+    channel = WorkerChannel(stdin, out)
+    assert channel.read_init() == {'protocol': 'binary'}
+    channel.protocol = PROTOCOL_BINARY
+    assert [t['branchId'] for t in channel.receive()['tasks']] == ['a', 'b']
+    assert channel.receive() is None
+    channel.send(result)
+    written = out.buffer.getvalue()
+    assert FRAME_HEADER.unpack_from(written)[0] == len(payload) and written[FRAME_HEADER.size:] == payload
+
+    print(f"✓ Worker protocol test passed", file=sys.stderr)
+    print(f"  Binary result: {len(payload)} bytes, JSON: {len(json.dumps(result))} bytes", file=sys.stderr)
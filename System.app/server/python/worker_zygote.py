@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Zygote for persistent workers
+Imports, Numba kernel warm-up and the price/indicator pre-load run once here;
+workers are then forked from this process and inherit all of it copy-on-write.
+A new or replacement worker is ready in milliseconds, and pre-loaded arrays
+exist once in memory instead of once per worker.
+
+Protocol (JSON lines on stdin/stdout):
+    -> init message (same as persistent_worker.py)
+    <- {"status": "ready", "pid": ...}
+    -> {"command": "fork", "workerId": 3, "socket": "/tmp/pyworker-3.sock"}
+    <- {"forked": 3, "pid": ...}
+
+A forked worker connects to the Unix socket and speaks the persistent worker
+protocol over it: init message (only its protocol is used), ready reply, then
+branches. Workers log to the zygote's stderr. EOF on stdin stops the zygote;
+forked workers run until their own shutdown.
+
+Needs os.fork (Linux, macOS); the pool spawns workers directly elsewhere.
+"""
+
+import gc
+import os
+import sys
+import json
+import signal
+import socket
+import time
+from optimized_indicators import warm_up_kernels as warm_up_indicator_kernels
+from optimized_metrics import warm_up_kernels as warm_up_metric_kernels
+from persistent_worker import PersistentWorker
+from worker_protocol import PROTOCOL_JSON, WorkerChannel
+
+
+def serve_forked(worker: PersistentWorker, socket_path: str):
+    """
+    Serve the pool as a forked worker over a Unix socket (never returns)
+
+    Args:
+        worker: Worker state inherited from the zygote
+        socket_path: Socket the pool listens on for this worker
+    """
+    code = 0
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+        # Let go of the zygote's pipes so the pool sees them close with the zygote
+        devnull = os.open(os.devnull, os.O_RDWR)
+        os.dup2(devnull, 0)
+        os.dup2(devnull, 1)
+        os.close(devnull)
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(socket_path)
+        channel = WorkerChannel(conn.makefile('rb'), conn.makefile('w', encoding='utf-8'))
+        config = channel.read_init()
+        if config is not None:
+            worker.start()
+            worker.serve(channel, config.get('protocol', PROTOCOL_JSON))
+    except Exception as e:
+        print(f"[Worker] Forked worker failed: {e}", file=sys.stderr, flush=True)
+        code = 1
+    finally:
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def main():
+    """Pre-load once, then fork a worker per request until EOF"""
+    stdin = sys.stdin.buffer
+    try:
+        line = stdin.readline()
+        if not line:
+            sys.exit(0)
+        config = json.loads(line)
+        if not config.get('parquetDir'):
+            print(json.dumps({'error': 'Missing parquetDir'}), flush=True)
+            sys.exit(1)
+        if not hasattr(os, 'fork'):
+            print(json.dumps({'error': 'os.fork is not available on this platform'}), flush=True)
+            sys.exit(1)
+
+        start = time.perf_counter()
+        warm_up_indicator_kernels()
+        warm_up_metric_kernels()
+        worker = PersistentWorker(config)
+        print(f"[Zygote] ✓ Ready in {time.perf_counter() - start:.2f}s", file=sys.stderr, flush=True)
+    except Exception as e:
+        print(json.dumps({'error': f'Zygote initialization failed: {str(e)}'}), flush=True)
+        sys.exit(1)
+
+    # Forked workers are reaped automatically (their exit shows as a closed socket)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    print(json.dumps({'status': 'ready', 'pid': os.getpid()}), flush=True)
+
+    for line in stdin:
+        try:
+            command = json.loads(line)
+        except ValueError as e:
+            print(json.dumps({'error': str(e)}), flush=True)
+            continue
+        if command.get('command') != 'fork':
+            continue
+
+        # Keep the collector from touching inherited objects (and copying their pages)
+        gc.freeze()
+        pid = os.fork()
+        if pid == 0:
+            serve_forked(worker, command['socket'])
+        print(json.dumps({'forked': command.get('workerId'), 'pid': pid}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from deltas import delta_signature, read_merged
+
+# Ticker catalog kept next to the parquet files. The backtest workers read it
+# (server/python/ticker_catalog.py) to filter and validate tickers without
+# opening any parquet file; entries must match catalog_entry() there.
+CATALOG_FILE = "_catalog.json"
+FORMAT_VERSION = 1
+
+
+def file_sha256(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def catalog_entry(path: str | Path) -> Optional[dict]:
+    """Describe one ticker: first/last date, rows (deltas included), base size, mtime, content hash and deltas."""
+    p = Path(path)
+    try:
+        st = p.stat()
+    except OSError:
+        return None
+
+    deltas = delta_signature(p)
+    dates = pd.to_datetime(read_merged(p, columns=["Date"])["Date"])
+    return {
+        "first_date": dates.min().strftime("%Y-%m-%d") if len(dates) else None,
+        "last_date": dates.max().strftime("%Y-%m-%d") if len(dates) else None,
+        "rows": int(len(dates)),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(p),
+        "deltas": deltas,
+    }
+
+
+def update_catalog(out_dir: str | Path, paths: Iterable[str | Path]) -> int:
+    """Record freshly written parquet files in <out_dir>/_catalog.json. Returns entries written."""
+    out_root = Path(out_dir)
+    catalog_path = out_root / CATALOG_FILE
+
+    updates: dict[str, dict] = {}
+    for path in paths:
+        try:
+            entry = catalog_entry(path)
+        except Exception:
+            continue  # Unreadable file: readers rebuild its entry on demand
+        if entry is not None:
+            updates[Path(path).stem] = entry
+    if not updates:
+        return 0
+
+    # Merge with the catalog as it is now (workers may have added entries) and replace atomically
+    try:
+        catalog = json.loads(catalog_path.read_text(encoding="utf-8"))
+        if catalog.get("format") != FORMAT_VERSION:
+            catalog = {}
+    except (OSError, ValueError):
+        catalog = {}
+    tickers = catalog.get("tickers", {})
+    tickers.update(updates)
+
+    tmp_path = out_root / f".{CATALOG_FILE}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps({"format": FORMAT_VERSION, "tickers": tickers}, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, catalog_path)
+    return len(updates)
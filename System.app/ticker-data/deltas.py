@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+# Append-friendly layout: <out_dir>/<TICKER>.parquet holds the history and
+# <out_dir>/_deltas/<TICKER>/<ns>-<id>.parquet hold rows appended since. Readers
+# merge the base with every delta newer than it (server/python/optimized_dataloader.py
+# and server/features/data/service.mjs implement the same rule). Rewriting the base
+# (compaction or a full download) makes older deltas obsolete in the same step,
+# so readers never see a row twice; compaction later removes the obsolete files.
+DELTAS_DIR = "_deltas"
+
+# Compact a ticker once it has this many live deltas (override with --min-deltas)
+DEFAULT_MIN_DELTAS = 20
+
+
+def delta_dir(parquet_path: str | Path) -> Path:
+    p = Path(parquet_path)
+    return p.parent / DELTAS_DIR / p.stem
+
+
+def delta_paths(parquet_path: str | Path) -> tuple[list[Path], list[Path]]:
+    """Return (live, obsolete) delta files of a ticker, oldest first."""
+    p = Path(parquet_path)
+    try:
+        names = sorted(n for n in os.listdir(delta_dir(p)) if n.endswith(".parquet"))
+    except OSError:
+        return [], []
+    try:
+        base_mtime = p.stat().st_mtime_ns
+    except OSError:
+        base_mtime = -1
+
+    live: list[Path] = []
+    obsolete: list[Path] = []
+    for name in names:
+        d = delta_dir(p) / name
+        try:
+            (live if d.stat().st_mtime_ns > base_mtime else obsolete).append(d)
+        except OSError:
+            continue
+    return live, obsolete
+
+
+def delta_signature(parquet_path: str | Path) -> Optional[str]:
+    """Identity of the live deltas (None if there are none); part of the data version."""
+    live, _ = delta_paths(parquet_path)
+    if not live:
+        return None
+    return hashlib.sha1("\n".join(d.name for d in live).encode("utf-8")).hexdigest()[:12]
+
+
+def read_merged(parquet_path: str | Path, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    """Read a ticker's base file plus its live deltas as one frame sorted by Date."""
+    p = Path(parquet_path)
+    base = pd.read_parquet(p, columns=columns)
+    live, _ = delta_paths(p)
+    if not live:
+        return base
+
+    frames = [base] + [pd.read_parquet(d, columns=columns) for d in live]
+    df = pd.concat(frames, ignore_index=True)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df.drop_duplicates("Date", keep="last").sort_values("Date").reset_index(drop=True)
+
+
+def write_delta(parquet_path: str | Path, df: pd.DataFrame) -> Path:
+    """Append rows to a ticker as a new delta file (atomic)."""
+    d = delta_dir(parquet_path)
+    d.mkdir(parents=True, exist_ok=True)
+    name = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+    tmp_path = d / f".{name}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, d / name)
+    return d / name
+
+
+def compact(parquet_path: str | Path, min_deltas: int = DEFAULT_MIN_DELTAS) -> int:
+    """Fold live deltas into the base file and remove obsolete ones. Returns deltas folded."""
+    p = Path(parquet_path)
+    live, obsolete = delta_paths(p)
+
+    folded = 0
+    if live and len(live) >= min_deltas:
+        df = read_merged(p)
+        tmp_path = p.with_name(f".{p.name}.{os.getpid()}.tmp")
+        df.to_parquet(tmp_path, index=False)
+        # The new base is newer than every delta it contains, so readers ignore them from here on
+        os.replace(tmp_path, p)
+        obsolete = obsolete + live
+        folded = len(live)
+
+    for d in obsolete:
+        try:
+            d.unlink()
+        except OSError:
+            pass
+    try:
+        delta_dir(p).rmdir()
+    except OSError:
+        pass  # Not empty (new deltas) or already gone
+    return folded
+
+
+def compact_all(out_dir: str | Path, min_deltas: int = DEFAULT_MIN_DELTAS) -> list[Path]:
+    """Compact every ticker with deltas. Returns the base files that were rewritten."""
+    out_root = Path(out_dir)
+    root = out_root / DELTAS_DIR
+    if not root.is_dir():
+        return []
+
+    rewritten: list[Path] = []
+    for d in sorted(root.iterdir()):
+        if not d.is_dir():
+            continue
+        p = out_root / f"{d.name}.parquet"
+        if not p.exists():
+            continue
+        if compact(p, min_deltas) > 0:
+            rewritten.append(p)
+    return rewritten
+
+
+def _cli() -> int:
+    import argparse
+    import json
+
+    from catalog import update_catalog
+
+    ap = argparse.ArgumentParser(description="Fold delta files into per-ticker Parquet files.")
+    ap.add_argument("--out-dir", required=True, help="Directory of <TICKER>.parquet files")
+    ap.add_argument("--min-deltas", type=int, default=DEFAULT_MIN_DELTAS, help="Compact tickers with at least this many deltas")
+    args = ap.parse_args()
+
+    started = time.time()
+    rewritten = compact_all(args.out_dir, max(1, int(args.min_deltas)))
+    update_catalog(args.out_dir, rewritten)
+    print(json.dumps({"type": "compacted", "tickers": len(rewritten), "seconds": round(time.time() - started, 1)}), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_cli())
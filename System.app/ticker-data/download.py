@@ -9,6 +9,8 @@ from typing import Callable, Iterable, Optional
 import pandas as pd
 import yfinance as yf
 
+from catalog import update_catalog
+
 
 def read_tickers_from_txt(path: str | Path) -> list[str]:
     p = Path(path)
@@ -188,6 +190,12 @@ def download_to_parquet(
         if i < len(batches):
             time.sleep(cfg.sleep_seconds + random.uniform(0.0, 0.5))
 
+    try:
+        update_catalog(out_root, out_paths)
+    except OSError as e:
+        if progress_cb:
+            progress_cb({"type": "warning", "message": f"catalog update failed: {str(e)[:100]}"})
+
     if progress_cb:
         progress_cb({"type": "done", "saved": len(out_paths)})
     return out_paths
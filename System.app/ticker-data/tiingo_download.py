@@ -32,6 +32,13 @@ except ImportError as e:
     YFINANCE_AVAILABLE = False
     _import_errors.append(f"yfinance: {e}")
 
+try:
+    from catalog import update_catalog
+    from deltas import read_merged, write_delta
+except ImportError as e:
+    _import_errors.append(f"storage: {e}")
+    update_catalog = None
+
 # Print import status on startup
 if _import_errors:
     print(json.dumps({"type": "import_errors", "errors": _import_errors}), flush=True)
@@ -342,24 +349,21 @@ def download_recent_data(
             if df_new.empty:
                 return (ticker, False, "empty_frame")
 
-            # If parquet exists, append only new dates
+            # If parquet exists, append only new dates as a small delta file
+            # (the history is not rewritten; deltas.py compacts later)
             if out_path.exists():
-                df_existing = pd.read_parquet(out_path)
-                df_existing["Date"] = pd.to_datetime(df_existing["Date"])
+                existing = read_merged(out_path, columns=["Date"])
                 df_new["Date"] = pd.to_datetime(df_new["Date"])
 
                 # Find dates not already in file
-                existing_dates = set(df_existing["Date"].dt.date)
+                existing_dates = set(pd.to_datetime(existing["Date"]).dt.date)
                 new_dates_mask = ~df_new["Date"].dt.date.isin(existing_dates)
                 df_to_append = df_new[new_dates_mask]
 
                 if df_to_append.empty:
                     return (ticker, True, "no_new_data")
 
-                # Append and sort
-                df_combined = pd.concat([df_existing, df_to_append], ignore_index=True)
-                df_combined = df_combined.sort_values("Date").reset_index(drop=True)
-                df_combined.to_parquet(out_path, index=False)
+                write_delta(out_path, df_to_append.sort_values("Date").reset_index(drop=True))
                 appended_rows = len(df_to_append)
             else:
                 # Create new file
@@ -414,6 +418,13 @@ def download_recent_data(
                 if progress_cb:
                     progress_cb({"type": "ticker_skipped", "ticker": ticker, "reason": str(e)[:200]})
 
+    try:
+        if update_catalog is not None:
+            update_catalog(out_root, out_paths)
+    except OSError as e:
+        if progress_cb:
+            progress_cb({"type": "warning", "message": f"catalog update failed: {str(e)[:100]}"})
+
     if progress_cb:
         progress_cb({"type": "done", "saved": len(out_paths), "total": len(tickers_list)})
 
@@ -610,6 +621,13 @@ def download_to_parquet_tiingo_only(
         if i < len(tickers_list):
             time.sleep(cfg.sleep_seconds + random.uniform(0.0, 0.1))
 
+    try:
+        if update_catalog is not None:
+            update_catalog(out_root, out_paths)
+    except OSError as e:
+        if progress_cb:
+            progress_cb({"type": "warning", "message": f"catalog update failed: {str(e)[:100]}"})
+
     if progress_cb:
         progress_cb({"type": "done", "saved": len(out_paths), "total": len(tickers_list)})
 
@@ -750,6 +768,13 @@ def download_to_parquet(
         if i < len(batches):
             time.sleep(cfg.sleep_seconds + random.uniform(0.0, 0.5))
 
+    try:
+        if update_catalog is not None:
+            update_catalog(out_root, out_paths)
+    except OSError as e:
+        if progress_cb:
+            progress_cb({"type": "warning", "message": f"catalog update failed: {str(e)[:100]}"})
+
     if progress_cb:
         progress_cb({"type": "done", "saved": len(out_paths), "total": len(tickers_list)})
 